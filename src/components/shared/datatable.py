@@ -1,5 +1,6 @@
 import flet as ft
 from assets.fontawesome.fontawesome import get_icon
+from data.manager.changes import subscribe, CREATED, UPDATED, DELETED
 
 header_style: dict = {
     "height": 60,
@@ -447,6 +448,65 @@ class DataTable(ft.DataTable):
         except Exception as ex:
             print(f"Error al actualizar paginación: {ex}")
 
+    def _index_of(self, items, key, item_id):
+        for i, item in enumerate(items):
+            if item.get(key) == item_id:
+                return i
+        return None
+
+    def apply_change(self, event, key="id"):
+        """
+        Patch one row (ChangeEvent from data.manager.changes): the data lists are edited in place
+        and only the DataRow of that row is rebuilt, the rest of the page is kept as it is.
+        """
+        start = (self.current_page - 1) * self.page_size
+        end = start + self.page_size
+        if event.kind == CREATED:
+            self.data_values.append(event.row)
+            self.current_data.append(event.row)
+            position = len(self.current_data) - 1
+            if position < start or position >= end:
+                pass
+            elif len(self.current_data) == 1:
+                self.rows = self.create_rows([event.row])  # replaces the "-" placeholder row
+            else:
+                self.rows.append(self.create_rows([event.row])[0])
+        else:
+            index = self._index_of(self.data_values, key, event.id)
+            if index is not None:
+                if event.kind == UPDATED:
+                    self.data_values[index] = event.row
+                else:
+                    del self.data_values[index]
+            position = self._index_of(self.current_data, key, event.id)
+            if position is None:
+                return
+            if event.kind == UPDATED:
+                self.current_data[position] = event.row
+                if start <= position < end:
+                    self.rows[position - start] = self.create_rows([event.row])[0]
+            elif event.kind == DELETED:
+                del self.current_data[position]
+                if position < end:
+                    if self.current_page > self.total_pages():
+                        self.current_page = self.total_pages()  # the last page became empty
+                        self.rows = self.create_rows(self._get_page_items())
+                    elif not self.current_data:
+                        self.rows = self.create_rows([])
+                    else:
+                        # Everything after the deleted row moves up one: drop its DataRow
+                        # (or the first one, for earlier pages) and bring in the next row
+                        self.rows.pop(max(position - start, 0))
+                        if end <= len(self.current_data):
+                            self.rows.append(self.create_rows([self.current_data[end - 1]])[0])
+        if self.page is not None:
+            self.update()
+        try:
+            if hasattr(self, "on_pagination_update") and callable(self.on_pagination_update):
+                self.on_pagination_update()
+        except Exception as ex:
+            print(f"Error al actualizar paginación: {ex}")
+
     def fill_data_table(self, data=None):
         if data is not None:
             self.current_data = list(data)
@@ -465,7 +525,7 @@ class FBDataTable(ft.Container):
                  color_text=ft.Colors.BLACK, bgcolor=ft.Colors.WHITE10,
                  border_width=1, border_color=ft.Colors.BLACK,
                  border_radius=5, sort_as=True, sort_index=0,
-                 actions: list = None, top_actions: list = None):
+                 actions: list = None, top_actions: list = None, entity: str = None, key: str = "id"):
         self.data= data
         self.form = form
         self.actions = actions
@@ -490,6 +550,12 @@ class FBDataTable(ft.Container):
             content=self.content,
             alignment=ft.alignment.top_center,
         )
+        # Writes of the entity (its table name) are applied row by row, no reload needed
+        self.key = key
+        self.unsubscribe = subscribe(entity, self.apply_change) if entity else None
+
+    def apply_change(self, event):
+        self.table.apply_change(event, self.key)
 
     def reload(self, data):
         self.header.datatable.fill_data_table(data)
@@ -3,15 +3,17 @@ import flet as ft
 from components.shared.generic_card import GenericCard
 from components.shared.rotating_boxes_loader import RotatingBoxesLoader
 from assets.fontawesome.fontawesome import get_icon
+from data.manager.changes import subscribe, CREATED, UPDATED, DELETED
 
 
 
 class GenericCardCRUD:
     def __init__(self, page: ft.Page, data, title: str, form, card_content: [], card_actions, top_actions,
-                 top_bar_color=ft.Colors.BLUE_GREY_900, page_size=25, card_width=300, card_height=400, aspect_ratio=0.7):
+                 top_bar_color=ft.Colors.BLUE_GREY_900, page_size=25, card_width=300, card_height=400, aspect_ratio=0.7,
+                 entity: str = None, key: str = "id"):
         self.page = page
         self.title = title
-        self.data = data
+        self.data = self._own(data)
         self.list_item_container = None
         self.page_number = 0
         self.page_size = page_size
@@ -39,6 +41,18 @@ class GenericCardCRUD:
         self.spinner.visible = False
         self.top_bar_color = top_bar_color
         self.form.activate_on_filter(self.filter_list)
+        self._filter = None  # (value, key) of the active filter
+        # Writes of the entity (its table name) are applied card by card, no reload needed
+        self.key = key
+        self.unsubscribe = subscribe(entity, self.apply_change) if entity else None
+
+    @staticmethod
+    def _own(data):
+        """
+        Shallow copy of the rows given: apply_change edits self.data in place and the caller's
+        list or dict may be shared (a cached manager result, another view of the same entity)
+        """
+        return list(data) if isinstance(data, list) else dict(data)
 
     def _materialize_items(self):
         if isinstance(self.data, list):
@@ -50,6 +64,7 @@ class GenericCardCRUD:
         self.more_items = self._total > (self.page_number * self.page_size)
 
     def reset_pagination(self):
+        self._filter = None
         self.page_number = 0
         self.more_items = True
         self.spinner.visible = False
@@ -58,7 +73,7 @@ class GenericCardCRUD:
 
     def reload(self, data = None):
         if data is not None:
-            self.data = data
+            self.data = self._own(data)
         self.list_item_container.controls = []
         self.reset_pagination()
 
@@ -96,6 +111,54 @@ class GenericCardCRUD:
                 self.page.update()
                 self.is_loading = False
 
+    def apply_change(self, event):
+        """
+        Patch one item (ChangeEvent from data.manager.changes): the data is edited in place and only
+        the card of that item is built, the cards already loaded are kept.
+        """
+        if self.list_item_container is None:
+            return
+        if not hasattr(self, "_all_items"):
+            self._materialize_items()
+        items = self._all_items
+        index = next((i for i, item in enumerate(items) if item.get(self.key) == event.id), None)
+        if event.kind == CREATED:
+            items.append(event.row)
+        elif index is None:
+            return
+        elif event.kind == UPDATED:
+            items[index] = event.row
+        else:
+            del items[index]
+        if items is not self.data:
+            # data given as a dict of rows, _all_items is a copy of its values
+            data_key = next((k for k, v in self.data.items() if v.get(self.key) == event.id), event.id)
+            if event.kind == DELETED:
+                self.data.pop(data_key, None)
+            else:
+                self.data[data_key] = event.row
+        self._total = len(items)
+
+        if self._filter is not None:
+            self.filter_list(*self._filter)  # rebuilds only the matching cards
+            return
+        controls = self.list_item_container.controls
+        loaded = len(controls)
+        if event.kind == CREATED:
+            if not self.more_items:
+                controls.append(self.build_item_cards([event.row])[0])
+        elif index < loaded:
+            if event.kind == UPDATED:
+                controls[index] = self.build_item_cards([event.row])[0]
+            else:
+                controls.pop(index)
+                # The first item not loaded yet moves into the loaded range, so the next page starts right
+                if loaded <= len(items):
+                    controls.append(self.build_item_cards([items[loaded - 1]])[0])
+        self.more_items = self._total > len(controls)
+        if self.list_item_container.page:
+            self.list_item_container.update()
+
     def _on_grid_scroll(self, e: ft.OnScrollEvent):
         threshold = 200
         if e.pixels is not None and e.max_scroll_extent is not None:
@@ -116,6 +179,7 @@ class GenericCardCRUD:
         ]
 
     def filter_list(self, value, key):
+        self._filter = (value, key)
         source = getattr(self, "data", []) or []
         filtered = []
 
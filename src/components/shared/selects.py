@@ -1,8 +1,28 @@
 import flet as ft
+import re
 import unicodedata
 import threading
 from abc import ABC, abstractmethod
 
+
+def decode_results(data: dict) -> list:
+    """
+    Result dicts of a select payload: the {"<id>": {...}} map, a plain list of dicts,
+    or the "fields" + row tuples of format=compact.
+    """
+    results = data.get("results", {})
+    fields = data.get("fields")
+    if fields:
+        return [dict(zip(fields, row)) for row in results]
+    return list(results.values()) if isinstance(results, dict) else results
+
+def index_results(data: dict) -> dict:
+    """{"<id>": item} store of a select payload, compact rows are decoded straight into it instead of copied"""
+    fields = data.get("fields")
+    if fields:
+        return {str(row[0]): dict(zip(fields, row)) for row in data.get("results", ())}
+    return {str(item["id"]): dict(item) for item in decode_results(data)}
+
 def _normalize_text(text: str) -> str:
     """Normalize text by removing accents and making it case-insensitive."""
     if not text:
@@ -10,6 +30,16 @@ def _normalize_text(text: str) -> str:
     normalized = unicodedata.normalize("NFD", text.lower().strip())
     return "".join(c for c in normalized if unicodedata.category(c) != "Mn")
 
+def _matches_search(filter_text: str, text: str) -> bool:
+    """
+    Local counterpart of the API search (query_utils.filter_by_name) on normalized text:
+    the filter appears anywhere in the text, or each of its words starts a word of the text.
+    """
+    if filter_text in text:
+        return True
+    words = re.findall(r"\w+", text)
+    return all(any(word.startswith(term) for word in words) for term in re.findall(r"\w+", filter_text))
+
 class _Select(ABC):
     """Base class for Select components with common dropdown and search functionality."""
 
@@ -80,15 +110,21 @@ class _Select(ABC):
         if e.pixels >= e.max_scroll_extent - 10 and self._data["pagination"].get("more") and self.on_load_more_cb:
             skip = len(self._data["results"])
             filter_text = self._search_field.value or ""
+            # The cursor continues the unfiltered list, searches still page by skip
+            cursor = None if filter_text else self._data["pagination"].get("next_cursor")
 
             def bg_load():
                 try:
-                    data = self.on_load_more_cb(skip, self.items_per_load, filter_text)
+                    if cursor:
+                        data = self.on_load_more_cb(skip, self.items_per_load, filter_text, cursor=cursor)
+                    else:
+                        data = self.on_load_more_cb(skip, self.items_per_load, filter_text)
                     if not data or "results" not in data:
                         return
-                    results_list = list(data["results"].values()) if isinstance(data["results"], dict) else data["results"]
-                    more = bool(data.get("pagination", {}).get("more", False))
-                    self.append_data(results_list, more)
+                    results_list = decode_results(data)
+                    pagination = data.get("pagination", {}) or {}
+                    more = bool(pagination.get("more", False))
+                    self.append_data(results_list, more, pagination.get("next_cursor"))
                     self.page.update()
                 except Exception:
                     return
@@ -110,7 +146,7 @@ class _Select(ABC):
                 try:
                     data = self.on_search_api_cb(skip=0, limit=self.items_per_load, filter_text=filter_text)
                     if data and "results" in data:
-                        results_list = list(data["results"].values()) if isinstance(data["results"], dict) else data["results"]
+                        results_list = decode_results(data)
                         more = bool(data.get("pagination", {}).get("more", False))
 
                         # Temporary refresh of results (does not overwrite `_data`)
@@ -123,9 +159,11 @@ class _Select(ABC):
         else:
             self._refresh_options(filter_text)
 
-    def append_data(self, results: list, more: bool = False):
-        """Appends new results to the internal dataset while preserving selection and state."""
-        if isinstance(results, dict):
+    def append_data(self, results: list, more: bool = False, next_cursor: str = None, fields: list = None):
+        """Appends new results to the internal dataset while preserving selection and state, `fields` decodes format=compact rows."""
+        if fields:
+            results = [dict(zip(fields, row)) for row in results]
+        elif isinstance(results, dict):
             results = list(results.values())
         for item in results:
             id_str = str(item["id"])
@@ -136,20 +174,19 @@ class _Select(ABC):
             else:
                 self._data["results"][id_str] = dict(item)
         self._data["pagination"]["more"] = bool(more)
+        self._data["pagination"]["next_cursor"] = next_cursor
         self._refresh_options(self._search_field.value or "")
 
     def set_data(self, data: dict):
-        """Replaces the entire dataset with new results."""
-        results = data.get("results", {})
-        results_list = list(results.values()) if isinstance(results, dict) else results
+        """Replaces the entire dataset with new results (map, list or format=compact payloads)."""
         pagination = data.get("pagination", {}) or {}
-        self._data["results"] = {str(item["id"]): dict(item) for item in results_list}
-        self._data["pagination"] = {"more": bool(pagination.get("more", False))}
+        self._data["results"] = index_results(data)
+        self._data["pagination"] = {"more": bool(pagination.get("more", False)), "next_cursor": pagination.get("next_cursor")}
         self._refresh_options()
 
-        for item in results_list:
+        for item in list(self._data["results"].values()):
             if item.get("selected"):
-                self._select(self._data["results"].get(str(item["id"]), item))
+                self._select(item)
                 if isinstance(self, AutoCompleteSelect):
                     break
 
@@ -226,7 +263,7 @@ class _Select(ABC):
         for item in results_to_show:
             text = str(item.get("text", ""))
             item_id = str(item.get("id", ""))
-            if filter_text and filter_text not in _normalize_text(text):
+            if filter_text and not _matches_search(filter_text, _normalize_text(text)):
                 continue
             disabled = bool(item.get("disabled", False))
             is_selected = self._is_selected(item_id)
@@ -1,8 +1,97 @@
-from passlib.hash import bcrypt
+import asyncio
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cost of new hashes (2^rounds iterations, +1 doubles the time), tune it with `benchmark.py bcrypt`.
+# Hashes with another cost are upgraded the next time their user logs in
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Hashes computed at the same time by the async wrappers, bcrypt releases the GIL so they run in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# bcrypt only uses the first 72 bytes of a password
+MAX_PASSWORD_BYTES = 72
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+
+def is_hash(value: str) -> bool:
+    """True for a bcrypt hash ("$2b$12$..."), False for anything else"""
+    return bool(value) and value.startswith(("$2a$", "$2b$", "$2y$")) and len(value) == 60
+
+
+def hash_rounds(hashed_password: str) -> int:
+    return int(hashed_password[4:6])
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode()
 
-def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.verify(plain_password, hashed_password)
\ No newline at end of file
+    if not is_hash(hashed_password):
+        return False
+    return bcrypt.checkpw(_secret(plain_password), hashed_password.encode())
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """The stored hash is a legacy variant ($2a$, $2y$) or was hashed with another cost than BCRYPT_ROUNDS"""
+    return not hashed_password.startswith("$2b$") or hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+
+def verify_and_update(plain_password: str, stored_password: str):
+    """
+    Check a password against the stored bcrypt hash, returns (valid, new_hash).
+    new_hash is the replacement to store when the password is valid and the stored
+    hash needs a rehash, None otherwise.
+    Rows saved before passwords were hashed hold the plain text: it is compared in constant
+    time once and its hash returned, so the row is upgraded on that login.
+    """
+    if not stored_password:
+        return False, None
+    if not is_hash(stored_password):
+        if hmac.compare_digest(plain_password.encode("utf-8"), stored_password.encode("utf-8")):
+            return True, hash_password(plain_password)
+        return False, None
+    valid = bcrypt.checkpw(_secret(plain_password), stored_password.encode())
+    if valid and needs_rehash(stored_password):
+        return True, hash_password(plain_password)
+    return valid, None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def hash_many(passwords) -> list:
+    """hash_password() of many passwords, spread over the hashing pool"""
+    return list(_pool().map(hash_password, passwords))
+
+
+# Async wrappers: the hashing runs on the bounded pool and the event loop keeps serving other sessions
+
+async def hash_password_async(password: str, rounds: int = None) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_pool(), hash_password, password, rounds)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_pool(), verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_async(plain_password: str, stored_password: str):
+    return await asyncio.get_running_loop().run_in_executor(_pool(), verify_and_update, plain_password, stored_password)
@@ -14,6 +14,9 @@ class ProductControl:
     def get_products_paginated(self, page_number=1, page_size=10, order_by_attr="id", descending=False):
         return self.manager.get_products_paginated(page_number, page_size, order_by_attr, descending)
 
+    def get_products_page(self, page_size=10, order_by_attr="id", descending=False, cursor=None):
+        return self.manager.get_products_page(page_size, order_by_attr, descending, cursor)
+
     def create_product(self, name, code, price, image):
         return self.manager.create_product(code, name, price, image)
 
@@ -1,11 +1,90 @@
 import json
+import threading
+from operator import attrgetter
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used without it
+    orjson = None
+
+
+def dumps(value) -> str:
+    """JSON text of a value, through orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value)
+
+
+def dumpb(value) -> bytes:
+    """Compact UTF-8 JSON of a value, as HTTP responses send it"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class Serializer:
+    """
+    Compiled dict serializer of one model class and field projection.
+    The column names and their attribute getter are resolved once, serializing
+    a row is a single attrgetter call zipped with the names.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        getter = attrgetter(*self.fields) if self.fields else (lambda obj: ())
+        # attrgetter of a single name returns the value, not a 1-tuple
+        self._values = (lambda obj: (getter(obj),)) if len(self.fields) == 1 else getter
+
+    def __call__(self, obj) -> dict:
+        return dict(zip(self.fields, self._values(obj)))
+
+    def many(self, objects) -> list:
+        fields, values = self.fields, self._values
+        return [dict(zip(fields, values(obj))) for obj in objects]
+
+
+_serializers = {}
+_serializers_lock = threading.Lock()
+
 
 class SerializerMixin:
-    def to_dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+    # Columns that are never serialized, whatever include asks for (e.g. User.password)
+    __serializer_exclude__ = ()
+
+    @classmethod
+    def serializer(cls, include=None, exclude=()) -> Serializer:
+        """
+        Serializer of the class for the given projection, compiled on first use and then reused.
+        include picks and orders the columns (all of them by default), exclude drops some.
+        """
+        key = (cls, tuple(include) if include else None, tuple(exclude))
+        serializer = _serializers.get(key)
+        if serializer is None:
+            allowed = [c.key for c in cls.__mapper__.column_attrs if c.key not in cls.__serializer_exclude__]
+            fields = list(include) if include else allowed
+            for name in fields:
+                if name not in allowed:
+                    raise ValueError(f"Atributo '{name}' no existe en {cls.__name__}")
+            serializer = Serializer(cls, [name for name in fields if name not in exclude])
+            with _serializers_lock:
+                serializer = _serializers.setdefault(key, serializer)
+        return serializer
 
-    def to_json(self):
-        return json.dumps(self.to_dict())
+    def to_dict(self, include=None, exclude=()):
+        return type(self).serializer(include, exclude)(self)
+
+    def to_json(self, include=None, exclude=()):
+        return dumps(self.to_dict(include, exclude))
+
+    @classmethod
+    def serialize_many(cls, objects, include=None, exclude=()):
+        """Dicts of many rows with one compiled serializer"""
+        return cls.serializer(include, exclude).many(objects)
+
+    @classmethod
+    def many_to_json(cls, objects, include=None, exclude=()):
+        return dumps(cls.serialize_many(objects, include, exclude))
 
     @classmethod
     def from_dict(cls, data):
@@ -1,39 +1,94 @@
 from data.models.abc import ABC
 from data.manager.db_manager import DatabaseManager
+from data.manager.query_utils import (
+    filter_by_name, order_by_rank, count_by_name, name_page, page_with_cursor, paginate, is_unique_violation
+)
+from data.manager.fts import search_indexes
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.bulk import bulk_write, named_rows, BULK_CHUNK_SIZE
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 
 
 class ABCManager:
+    cache_name = "abc"
+
     def __init__(self):
         self.dbm = DatabaseManager()
 
+    @publishes(CREATED)
+    @invalidates()
     def create(self, name: str, disabled: bool = False):
         """Crear nuevo registro ABC"""
         db = self.dbm.get_session()
         try:
-            # Verificar si ya existe
-            existing = db.query(ABC).filter(ABC.name == name).first()
-            if existing:
-                raise ValueError(f"ABC with name '{name}' already exists")
-
-            abc_item = ABC(name=name, disabled=disabled)
-            db.add(abc_item)
+            # La restricción UNIQUE de name detecta los duplicados
+            abc_item = db.scalars(insert(ABC).values(name=name, disabled=disabled).returning(ABC)).one()
             db.commit()
-            db.refresh(abc_item)
             return abc_item
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError(f"ABC with name '{name}' already exists")
+            raise e
         except Exception as e:
             db.rollback()
             raise e
         finally:
             self.dbm.close_session(db)
 
-    def get_all(self):
-        """Obtener todos los registros ABC"""
+    @cached()
+    def get_all(self, q: str = None, skip: int = 0, limit: int = None):
+        """Obtener los registros ABC, filtrados por nombre y paginados en SQL"""
+        db = self.dbm.get_session()
+        try:
+            indexes = search_indexes(db)
+            query = filter_by_name(db.query(ABC), ABC, q, indexes)
+            query = order_by_rank(query, ABC, q, indexes).order_by(ABC.id)
+            return paginate(query, skip, limit).all()
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def get_page(self, q: str = None, limit: int = 10, cursor: str = None, skip: int = 0):
+        """Una página de la búsqueda por nombre y el cursor de la siguiente (None en la última)"""
+        db = self.dbm.get_session()
+        try:
+            rows = db.execute(name_page(ABC, q, cursor, skip, limit, search_indexes(db))).all()
+            page, next_cursor = page_with_cursor(rows, limit, lambda row: row[1:])
+            return [row[0] for row in page], next_cursor
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def count(self, q: str = None):
+        """Contar los registros ABC que coinciden con el filtro"""
+        db = self.dbm.get_session()
+        try:
+            return db.scalar(count_by_name(ABC, q, search_indexes(db)))
+        finally:
+            self.dbm.close_session(db)
+
+    def exists(self):
+        """Saber si hay al menos un registro ABC"""
         db = self.dbm.get_session()
         try:
-            return db.query(ABC).all()
+            return db.query(db.query(ABC.id).exists()).scalar()
         finally:
             self.dbm.close_session(db)
 
+    @invalidates()
+    def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        """Insertar muchos registros ABC, omitiendo los nombres existentes"""
+        return bulk_write(self.dbm, ABC, named_rows(items), ["name"], chunk_size=chunk_size)
+
+    @invalidates()
+    def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        """Insertar o actualizar muchos registros ABC por nombre"""
+        return bulk_write(self.dbm, ABC, named_rows(items), ["name"], ["disabled"], chunk_size)
+
+    @cached(id_arg="item_id")
     def get_by_id(self, item_id: int):
         """Obtener un registro por ID"""
         db = self.dbm.get_session()
@@ -42,34 +97,39 @@ class ABCManager:
         finally:
             self.dbm.close_session(db)
 
+    @publishes(UPDATED)
+    @invalidates(id_arg="item_id")
     def update(self, item_id: int, name: str = None, disabled: bool = None):
         """Actualizar registro ABC"""
+        values = {k: v for k, v in {"name": name, "disabled": disabled}.items() if v is not None}
         db = self.dbm.get_session()
         try:
-            abc_item = db.query(ABC).filter(ABC.id == item_id).first()
+            # Un solo UPDATE ... RETURNING, la restricción UNIQUE valida el nombre
+            if values:
+                abc_item = db.scalars(
+                    update(ABC).where(ABC.id == item_id).values(**values).returning(ABC)
+                ).first()
+            else:
+                abc_item = db.get(ABC, item_id)
 
             if not abc_item:
                 raise ValueError("ABC item not found")
 
-            if name is not None:
-                # Verificar que el nuevo nombre no exista (excepto para este mismo item)
-                existing = db.query(ABC).filter(ABC.name == name, ABC.id != item_id).first()
-                if existing:
-                    raise ValueError("ABC with this name already exists")
-                abc_item.name = name
-
-            if disabled is not None:
-                abc_item.disabled = disabled
-
             db.commit()
-            db.refresh(abc_item)
             return abc_item
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("ABC with this name already exists")
+            raise e
         except Exception as e:
             db.rollback()
             raise e
         finally:
             self.dbm.close_session(db)
 
+    @publishes(DELETED, id_arg="item_id")
+    @invalidates(id_arg="item_id")
     def delete(self, item_id: int):
         """Eliminar registro ABC"""
         db = self.dbm.get_session()
@@ -0,0 +1,77 @@
+import threading
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from data.manager.db_manager import (
+    DEFAULT_DB_URL, DEFAULT_DB_PROFILE, DEFAULT_POOL_SIZE, DEFAULT_MAX_OVERFLOW, apply_profile
+)
+from data.manager.instrumentation import instrument_engine
+
+# Process-wide registry: async db_url -> (engine, async_sessionmaker)
+_async_registry = {}
+_async_registry_lock = threading.Lock()
+
+
+def to_async_url(db_url: str) -> str:
+    """Translate a sync SQLite URL into its aiosqlite equivalent"""
+    if db_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + db_url[len("sqlite://"):]
+    return db_url
+
+
+def get_async_engine(db_url: str = DEFAULT_DB_URL, pool_size: int = DEFAULT_POOL_SIZE,
+                     max_overflow: int = DEFAULT_MAX_OVERFLOW, profile: str = DEFAULT_DB_PROFILE):
+    """Return the shared (async engine, async_sessionmaker) pair for a database URL"""
+    async_url = to_async_url(db_url)
+    entry = _async_registry.get(async_url)
+    if entry is None:
+        with _async_registry_lock:
+            entry = _async_registry.get(async_url)
+            if entry is None:
+                engine = create_async_engine(
+                    async_url,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow
+                )
+                apply_profile(engine.sync_engine, profile)
+                instrument_engine(engine)
+                # Objects are returned after the session closes, keep them loaded
+                session_factory = async_sessionmaker(
+                    bind=engine,
+                    autoflush=False,
+                    expire_on_commit=False
+                )
+                entry = (engine, session_factory)
+                _async_registry[async_url] = entry
+    return entry
+
+
+async def dispose_async_engines():
+    """Dispose every shared async engine and empty the registry"""
+    entries = list(_async_registry.values())
+    _async_registry.clear()
+    for engine, _ in entries:
+        await engine.dispose()
+
+
+class AsyncDatabaseManager:
+    def __init__(self, db_url: str = DEFAULT_DB_URL, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_overflow: int = DEFAULT_MAX_OVERFLOW, profile: str = DEFAULT_DB_PROFILE):
+        self.db_url = to_async_url(db_url)
+        self.engine, self.SessionLocal = get_async_engine(db_url, pool_size, max_overflow, profile)
+
+    def get_session(self) -> AsyncSession:
+        """Open a new async database session"""
+        try:
+            return self.SessionLocal()
+        except SQLAlchemyError as e:
+            print(f"Error opening session: {e}")
+            return None
+
+    async def close_session(self, db: AsyncSession):
+        """Close an async database session"""
+        try:
+            await db.close()
+        except SQLAlchemyError as e:
+            print(f"Error closing session: {e}")
@@ -0,0 +1,636 @@
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from data.models.abc import ABC
+from data.models.community import Community
+from data.models.country import Country
+from data.models.customer import Customer
+from data.models.person import Person
+from data.models.person_group import PersonGroup
+from data.models.product import Product
+from data.models.user import User
+from controls.encrypt import hash_password_async, verify_and_update_async
+from data.manager.async_db_manager import AsyncDatabaseManager
+from data.manager.query_utils import (
+    filter_by_name, order_by_rank, count_by_name, name_page, keyset, page_with_cursor, paginate, is_unique_violation,
+    projection, rows_of
+)
+from data.manager.fts import search_indexes
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.user_manager import USER_FIELDS
+from data.manager.bulk import async_bulk_write, named_rows, BULK_CHUNK_SIZE
+from data.manager.person_group_manager import (
+    loader_options, MEMBER_TABLES, member_ids_query, existing_ids_query, insert_members, delete_members
+)
+
+
+_product_to_dict = Product.serializer()
+
+
+class _AsyncNamedManager:
+    """
+    Async counterpart of the simple named-entity managers (Country, Person, Community, ABC).
+    Exposes the same create/get_all/get_by_id/update/delete surface as the sync managers.
+    """
+    model = None
+    label = None
+
+    @property
+    def cache_name(self):
+        return self.model.__tablename__
+
+    def __init__(self):
+        self.dbm = AsyncDatabaseManager()
+
+    @publishes(CREATED)
+    @invalidates()
+    async def create(self, name: str, disabled: bool = False):
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(insert(self.model).values(name=name, disabled=disabled).returning(self.model))
+            item = result.one()
+            await db.commit()
+            return item
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError(f"{self.label} already exists")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_all(self, q: str = None, skip: int = 0, limit: int = None):
+        db = self.dbm.get_session()
+        try:
+            indexes = await db.run_sync(search_indexes)
+            query = filter_by_name(select(self.model), self.model, q, indexes)
+            query = order_by_rank(query, self.model, q, indexes).order_by(self.model.id)
+            result = await db.execute(paginate(query, skip, limit))
+            return result.scalars().all()
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_page(self, q: str = None, limit: int = 10, cursor: str = None, skip: int = 0):
+        db = self.dbm.get_session()
+        try:
+            indexes = await db.run_sync(search_indexes)
+            rows = (await db.execute(name_page(self.model, q, cursor, skip, limit, indexes))).all()
+            page, next_cursor = page_with_cursor(rows, limit, lambda row: row[1:])
+            return [row[0] for row in page], next_cursor
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def count(self, q: str = None):
+        db = self.dbm.get_session()
+        try:
+            indexes = await db.run_sync(search_indexes)
+            return (await db.execute(count_by_name(self.model, q, indexes))).scalar()
+        finally:
+            await self.dbm.close_session(db)
+
+    async def exists(self):
+        db = self.dbm.get_session()
+        try:
+            return (await db.execute(select(select(self.model.id).exists()))).scalar()
+        finally:
+            await self.dbm.close_session(db)
+
+    @invalidates()
+    async def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        return await async_bulk_write(self.dbm, self.model, named_rows(items), ["name"], chunk_size=chunk_size)
+
+    @invalidates()
+    async def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        return await async_bulk_write(self.dbm, self.model, named_rows(items), ["name"], ["disabled"], chunk_size)
+
+    @cached(id_arg="item_id")
+    async def get_by_id(self, item_id: int):
+        db = self.dbm.get_session()
+        try:
+            return await db.get(self.model, item_id)
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(UPDATED)
+    @invalidates(id_arg="item_id")
+    async def update(self, item_id: int, name: str = None, disabled: bool = None):
+        values = {k: v for k, v in {"name": name, "disabled": disabled}.items() if v is not None}
+        db = self.dbm.get_session()
+        try:
+            if values:
+                result = await db.scalars(
+                    update(self.model).where(self.model.id == item_id).values(**values).returning(self.model)
+                )
+                item = result.first()
+            else:
+                item = await db.get(self.model, item_id)
+            if not item:
+                raise ValueError(f"{self.label} not found")
+            await db.commit()
+            return item
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError(f"{self.label} already exists")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(DELETED, id_arg="item_id")
+    @invalidates(id_arg="item_id")
+    async def delete(self, item_id: int):
+        db = self.dbm.get_session()
+        try:
+            item = await db.get(self.model, item_id)
+            if not item:
+                raise ValueError(f"{self.label} not found")
+            await db.delete(item)
+            await db.commit()
+            return True
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+
+class AsyncCountryManager(_AsyncNamedManager):
+    model = Country
+    label = "Country"
+
+
+class AsyncPersonManager(_AsyncNamedManager):
+    model = Person
+    label = "Person"
+
+
+class AsyncCommunityManager(_AsyncNamedManager):
+    model = Community
+    label = "Community"
+
+
+class AsyncABCManager(_AsyncNamedManager):
+    model = ABC
+    label = "ABC"
+
+
+class AsyncPersonGroupManager:
+    def __init__(self):
+        self.dbm = AsyncDatabaseManager()
+
+    def _query(self, profile: str = "detail"):
+        return select(PersonGroup).options(*loader_options(profile)).execution_options(populate_existing=True)
+
+    async def _load(self, db, group_id: int, profile: str = "detail"):
+        result = await db.execute(self._query(profile).where(PersonGroup.id == group_id))
+        return result.unique().scalars().first()
+
+    async def create(self, name: str, country_id: int, people_ids=None, community_ids=None):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(select(PersonGroup.id).where(PersonGroup.name == name))
+            if result.first():
+                raise ValueError("PersonGroup already exists")
+
+            group = PersonGroup(name=name, country_id=country_id)
+            db.add(group)
+            await db.flush()
+
+            if people_ids:
+                await self._add_members(db, "people", group.id, people_ids)
+            if community_ids:
+                await self._add_members(db, "communities", group.id, community_ids)
+
+            await db.commit()
+            return await self._load(db, group.id)
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    async def _add_members(self, db, kind: str, group_id: int, ids):
+        ids = set(ids)
+        if not ids:
+            return 0
+        ids &= set(await db.scalars(existing_ids_query(kind, ids)))
+        ids -= set(await db.scalars(member_ids_query(kind, group_id).where(MEMBER_TABLES[kind][1].in_(ids))))
+        if ids:
+            statement, rows = insert_members(kind, group_id, sorted(ids))
+            await db.execute(statement, rows)
+        return len(ids)
+
+    async def _remove_members(self, db, kind: str, group_id: int, ids):
+        ids = set(ids)
+        if not ids:
+            return 0
+        return (await db.execute(delete_members(kind, group_id, ids))).rowcount
+
+    async def _set_members(self, db, kind: str, group_id: int, ids):
+        current = set(await db.scalars(member_ids_query(kind, group_id)))
+        wanted = set(ids)
+        removed = await self._remove_members(db, kind, group_id, current - wanted)
+        added = await self._add_members(db, kind, group_id, wanted - current)
+        return added, removed
+
+    async def _change_members(self, group_id: int, people_ids, community_ids, change):
+        db = self.dbm.get_session()
+        try:
+            if not await db.get(PersonGroup, group_id):
+                raise ValueError("PersonGroup not found")
+            changed = {
+                "people": await change(db, "people", group_id, people_ids or []),
+                "communities": await change(db, "communities", group_id, community_ids or []),
+            }
+            await db.commit()
+            return changed
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    async def add_members(self, group_id: int, people_ids=None, community_ids=None):
+        return await self._change_members(group_id, people_ids, community_ids, self._add_members)
+
+    async def remove_members(self, group_id: int, people_ids=None, community_ids=None):
+        return await self._change_members(group_id, people_ids, community_ids, self._remove_members)
+
+    async def get_all(self, eager: bool = False, profile: str = None):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(self._query(profile or ("detail" if eager else "summary")))
+            return result.unique().scalars().all()
+        finally:
+            await self.dbm.close_session(db)
+
+    async def get_by_id(self, group_id: int, eager: bool = False, profile: str = None):
+        db = self.dbm.get_session()
+        try:
+            return await self._load(db, group_id, profile or ("detail" if eager else "summary"))
+        finally:
+            await self.dbm.close_session(db)
+
+    async def update(self, group_id: int, name: str = None, country_id: int = None,
+                     people_ids=None, community_ids=None):
+        db = self.dbm.get_session()
+        try:
+            group = await self._load(db, group_id, "summary")
+            if not group:
+                raise ValueError("PersonGroup not found")
+
+            if name is not None:
+                group.name = name
+            if country_id is not None:
+                group.country_id = country_id
+            if people_ids is not None:
+                await self._set_members(db, "people", group_id, people_ids)
+            if community_ids is not None:
+                await self._set_members(db, "communities", group_id, community_ids)
+
+            await db.commit()
+            return await self._load(db, group_id)
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    async def delete(self, group_id: int):
+        db = self.dbm.get_session()
+        try:
+            group = await self._load(db, group_id)
+            if not group:
+                raise ValueError("PersonGroup not found")
+            await db.delete(group)
+            await db.commit()
+            return True
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+
+class AsyncProductManager:
+    cache_name = "products"
+
+    def __init__(self):
+        self.dbm = AsyncDatabaseManager()
+
+    @publishes(CREATED)
+    @invalidates()
+    async def create_product(self, code: str, name: str, price: float, image: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(
+                insert(Product).values(code=code, name=name, price=price, image=image).returning(Product)
+            )
+            product = result.one()
+            await db.commit()
+            return _product_to_dict(product)
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Código ya registrado")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(UPDATED)
+    @invalidates(id_arg="id")
+    async def update_product(self, id: int, code: str, name: str, price: float, image: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(
+                update(Product)
+                .where(Product.id == id)
+                .values(code=code, name=name, price=price, image=image)
+                .returning(Product)
+            )
+            product = result.first()
+            if not product:
+                raise ValueError("Producto no encontrado")
+            await db.commit()
+            return _product_to_dict(product)
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Código ya registrado por otro producto")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_all_products(self, fields=None, as_tuples=False):
+        db = self.dbm.get_session()
+        try:
+            query = select(*projection(Product, fields)).order_by(Product.__table__.c.id)
+            return rows_of(await (await db.connection()).execute(query), as_tuples)
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_products_paginated(self, page_number=1, page_size=10, order_by_attr="id", descending=False,
+                                     fields=None, as_tuples=False):
+        db = self.dbm.get_session()
+        try:
+            if order_by_attr not in Product.__table__.c:
+                raise ValueError(f"Atributo '{order_by_attr}' no existe en Product")
+
+            order_column = Product.__table__.c[order_by_attr]
+            if descending:
+                order_column = order_column.desc()
+
+            query = (
+                select(*projection(Product, fields))
+                .order_by(order_column)
+                .offset((page_number - 1) * page_size)
+                .limit(page_size)
+            )
+            return rows_of(await (await db.connection()).execute(query), as_tuples)
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_products_page(self, page_size=10, order_by_attr="id", descending=False, cursor=None):
+        db = self.dbm.get_session()
+        try:
+            if order_by_attr not in Product.__table__.c:
+                raise ValueError(f"Atributo '{order_by_attr}' no existe en Product")
+
+            order = [Product.id] if order_by_attr == "id" else [getattr(Product, order_by_attr), Product.id]
+            query = keyset(select(Product), order, cursor, descending).limit(page_size + 1)
+            rows = _product_to_dict.many((await db.execute(query)).scalars())
+            return page_with_cursor(rows, page_size, lambda row: [row[c.key] for c in order])
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached(id_arg="id")
+    async def get_product_by_id(self, id: int):
+        db = self.dbm.get_session()
+        try:
+            product = await db.get(Product, id)
+            return _product_to_dict(product)
+        finally:
+            await self.dbm.close_session(db)
+
+    async def get_product_by_code(self, code: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(select(Product).where(Product.code == code))
+            return result.scalars().first()
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(DELETED, id_arg="product_id")
+    @invalidates(id_arg="product_id")
+    async def delete_product(self, product_id: int):
+        db = self.dbm.get_session()
+        try:
+            product = await db.get(Product, product_id)
+            if not product:
+                return False
+            await db.delete(product)
+            await db.commit()
+            return True
+        finally:
+            await self.dbm.close_session(db)
+
+
+class AsyncCustomerManager:
+    cache_name = "customers"
+
+    def __init__(self):
+        self.dbm = AsyncDatabaseManager()
+
+    @publishes(CREATED)
+    @invalidates()
+    async def create_customer(self, name: str, last_name: str, phone: str, email: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(
+                insert(Customer).values(name=name, last_name=last_name, phone=phone, email=email).returning(Customer)
+            )
+            customer = result.one()
+            await db.commit()
+            return customer
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(UPDATED)
+    @invalidates(id_arg="customer_id")
+    async def update_customer(self, customer_id: int, name: str, last_name: str, phone: str, email: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(
+                update(Customer)
+                .where(Customer.id == customer_id)
+                .values(name=name, last_name=last_name, phone=phone, email=email)
+                .returning(Customer)
+            )
+            customer = result.first()
+            if not customer:
+                raise ValueError("Customer no encontrado")
+            await db.commit()
+            return customer
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    async def get_customer_by_email(self, email: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(select(Customer).where(Customer.email == email))
+            return result.scalars().first()
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_all_customers(self):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(select(Customer))
+            return result.scalars().all()
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(DELETED, id_arg="customer_id")
+    @invalidates(id_arg="customer_id")
+    async def delete_customer(self, customer_id: int):
+        db = self.dbm.get_session()
+        try:
+            customer = await db.get(Customer, customer_id)
+            if not customer:
+                return False
+            await db.delete(customer)
+            await db.commit()
+            return True
+        finally:
+            await self.dbm.close_session(db)
+
+
+class AsyncUserManager:
+    cache_name = "users"
+
+    def __init__(self):
+        self.dbm = AsyncDatabaseManager()
+
+    @publishes(CREATED)
+    @invalidates()
+    async def create_user(self, name: str, email: str, password: str):
+        password = await hash_password_async(password)
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(insert(User).values(name=name, email=email, password=password).returning(User))
+            user = result.one()
+            await db.commit()
+            return user
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
+
+    async def login_user(self, email: str, password: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(select(User).where(User.email == email))
+            user = result.scalars().first()
+        finally:
+            await self.dbm.close_session(db)
+        if not user:
+            return None
+        # bcrypt runs on the hashing pool, the event loop keeps serving other sessions meanwhile
+        valid, new_hash = await verify_and_update_async(password, user.password)
+        if not valid:
+            return None
+        if new_hash:
+            await self._store_password_hash(user.id, new_hash)
+            user.password = new_hash
+        return user
+
+    @invalidates(id_arg="user_id")
+    async def _store_password_hash(self, user_id: int, password_hash: str):
+        db = self.dbm.get_session()
+        try:
+            await db.execute(update(User).where(User.id == user_id).values(password=password_hash))
+            await db.commit()
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached(id_arg="user_id")
+    async def get_user_by_id(self, user_id: int):
+        db = self.dbm.get_session()
+        try:
+            return await db.get(User, user_id)
+        finally:
+            await self.dbm.close_session(db)
+
+    async def get_user_by_email(self, email: str):
+        db = self.dbm.get_session()
+        try:
+            result = await db.execute(select(User).where(User.email == email))
+            return result.scalars().first()
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(DELETED, id_arg="user_id")
+    @invalidates(id_arg="user_id")
+    async def delete_user(self, user_id: int):
+        db = self.dbm.get_session()
+        try:
+            user = await db.get(User, user_id)
+            if not user:
+                return False
+            await db.delete(user)
+            await db.commit()
+            return True
+        finally:
+            await self.dbm.close_session(db)
+
+    @cached()
+    async def get_all_users(self, fields=None, as_tuples=False):
+        db = self.dbm.get_session()
+        try:
+            query = select(*projection(User, fields, USER_FIELDS)).order_by(User.__table__.c.id)
+            return rows_of(await (await db.connection()).execute(query), as_tuples)
+        finally:
+            await self.dbm.close_session(db)
+
+    @publishes(UPDATED)
+    @invalidates(id_arg="user_id")
+    async def update_user(self, user_id: int, name: str, email: str, password: str):
+        password = await hash_password_async(password)
+        db = self.dbm.get_session()
+        try:
+            result = await db.scalars(
+                update(User).where(User.id == user_id).values(name=name, email=email, password=password).returning(User)
+            )
+            user = result.first()
+            if not user:
+                raise ValueError("Usuario no encontrado")
+            await db.commit()
+            return user
+        except IntegrityError as e:
+            await db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
+        finally:
+            await self.dbm.close_session(db)
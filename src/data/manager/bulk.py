@@ -0,0 +1,70 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+BULK_CHUNK_SIZE = 500
+
+
+def chunked(rows, size: int = BULK_CHUNK_SIZE):
+    """Split a list of rows into lists of at most `size` rows"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def bulk_statements(model, rows, conflict_columns, update_columns=None, chunk_size: int = BULK_CHUNK_SIZE):
+    """
+    Multi-row INSERT statements, one per chunk, returning the written rows.
+    Without update_columns rows that hit a UNIQUE constraint are skipped (ON CONFLICT DO NOTHING),
+    with them the existing row is updated (ON CONFLICT (conflict_columns) DO UPDATE).
+    """
+    returning = [c for c in model.__table__.columns]
+    for chunk in chunked(list(rows), chunk_size):
+        statement = sqlite_insert(model).values(chunk)
+        if update_columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={name: statement.excluded[name] for name in update_columns}
+            )
+        else:
+            statement = statement.on_conflict_do_nothing()
+        yield statement.returning(*returning)
+
+
+def bulk_write(dbm, model, rows, conflict_columns, update_columns=None, chunk_size: int = BULK_CHUNK_SIZE):
+    """Run bulk_statements with one transaction per chunk, return the written rows as dicts"""
+    written = []
+    for statement in bulk_statements(model, rows, conflict_columns, update_columns, chunk_size):
+        db = dbm.get_session()
+        try:
+            written.extend(dict(row) for row in db.execute(statement).mappings())
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            dbm.close_session(db)
+    return written
+
+
+async def async_bulk_write(dbm, model, rows, conflict_columns, update_columns=None, chunk_size: int = BULK_CHUNK_SIZE):
+    """Async counterpart of bulk_write"""
+    written = []
+    for statement in bulk_statements(model, rows, conflict_columns, update_columns, chunk_size):
+        db = dbm.get_session()
+        try:
+            written.extend(dict(row) for row in (await db.execute(statement)).mappings())
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+        finally:
+            await dbm.close_session(db)
+    return written
+
+
+def named_rows(items):
+    """Normalize names or {"name", "disabled"} dicts into insertable rows"""
+    rows = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"name": item}
+        rows.append({"name": item["name"], "disabled": bool(item.get("disabled", False))})
+    return rows
@@ -0,0 +1,260 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from data.manager.db_manager import in_transaction_scope, after_transaction
+
+load_dotenv()
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60.0
+
+
+class EntityCache:
+    """
+    LRU + TTL cache for the reads of one entity.
+    Entries tied to a row id (get_by_id) are dropped when that row is written,
+    list entries (get_all, paged queries, counts) are dropped on any write.
+    """
+
+    def __init__(self, name: str, max_size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, item_id, value)
+        self._keys_by_id = {}  # item_id -> keys, None holds the list entries
+        self._lock = threading.RLock()
+        # Bumped by every invalidation so a read that raced a write is not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _drop(self, key):
+        _, item_id, _ = self._entries.pop(key)
+        keys = self._keys_by_id.get(item_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[item_id]
+
+    def get(self, key):
+        """Return (found, value) and record a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[2]
+                self._drop(key)
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, item_id=None, generation=None):
+        """Store a value, unless the cache was invalidated since `generation` was read"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, item_id, value)
+            self._keys_by_id.setdefault(item_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, item_id=None):
+        """Drop the entries of one row plus every list entry"""
+        with self._lock:
+            stale = set(self._keys_by_id.get(None, ()))
+            if item_id is not None:
+                stale |= self._keys_by_id.get(item_id, set())
+            for key in stale:
+                self._drop(key)
+            self.generation += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Process-wide caches, one per entity; entities without one are not cached
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def enable_cache(name: str, max_size: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL) -> EntityCache:
+    """Turn on caching for an entity (its table name)"""
+    with _caches_lock:
+        _caches[name] = EntityCache(name, max_size, ttl)
+        return _caches[name]
+
+
+def disable_cache(name: str):
+    with _caches_lock:
+        _caches.pop(name, None)
+
+
+def get_cache(name: str):
+    return _caches.get(name)
+
+
+def cache_stats():
+    """Counters of every enabled cache, keyed by entity"""
+    return {name: cache.stats() for name, cache in list(_caches.items())}
+
+
+def _configure_from_env():
+    """ENTITY_CACHE="countries=1000:60,products=500:30" (entity=max_size:ttl_seconds)"""
+    for spec in filter(None, (s.strip() for s in os.getenv("ENTITY_CACHE", "").split(","))):
+        name, _, sizing = spec.partition("=")
+        max_size, _, ttl = sizing.partition(":")
+        enable_cache(name.strip(), int(max_size or DEFAULT_CACHE_SIZE), float(ttl or DEFAULT_CACHE_TTL))
+
+
+_configure_from_env()
+
+
+def _hashable(value):
+    """Lists (e.g. fields=[...]) are keyed as tuples"""
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _cache_key(manager, method, args, kwargs):
+    # The sync and async managers of an entity share its cache but not their entries
+    return (
+        type(manager).__name__,
+        method.__name__,
+        tuple(_hashable(arg) for arg in args),
+        tuple(sorted((name, _hashable(value)) for name, value in kwargs.items())),
+    )
+
+
+def _copy(value):
+    """
+    Copy of a cached value, so callers that edit what they get do not edit the cache:
+    lists, tuples and dicts are copied recursively, ORM rows become transient copies of their columns.
+    """
+    if type(value) in (list, tuple):  # Core rows are immutable and returned as they are
+        return type(value)(_copy(item) for item in value)
+    if type(value) is dict:
+        return {key: _copy(item) for key, item in value.items()}
+    mapper = getattr(type(value), "__mapper__", None)
+    if mapper is not None:
+        return type(value)(**{attr.key: getattr(value, attr.key) for attr in mapper.column_attrs})
+    return value
+
+
+def _item_id(signature, self, args, kwargs, id_arg):
+    """Value of the row id argument, however it was passed"""
+    if id_arg is None:
+        return None
+    return signature.bind(self, *args, **kwargs).arguments.get(id_arg)
+
+
+def cached(id_arg: str = None):
+    """
+    Read-through caching for a manager read method, keyed by its manager class and arguments.
+    The manager declares `cache_name`; id_arg names the row id argument of by-id reads.
+    Values are stored and returned as copies (see _copy), every caller gets its own.
+    Works for sync and async methods.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                cache = get_cache(self.cache_name)
+                if cache is None:
+                    return await method(self, *args, **kwargs)
+                key = _cache_key(self, method, args, kwargs)
+                generation = cache.generation
+                found, value = cache.get(key)
+                if found:
+                    return _copy(value)
+                value = await method(self, *args, **kwargs)
+                cache.put(key, _copy(value), _item_id(signature, self, args, kwargs, id_arg), generation)
+                return value
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = get_cache(self.cache_name)
+            if cache is None:
+                return method(self, *args, **kwargs)
+            key = _cache_key(self, method, args, kwargs)
+            generation = cache.generation
+            found, value = cache.get(key)
+            if found:
+                return _copy(value)
+            value = method(self, *args, **kwargs)
+            cache.put(key, _copy(value), _item_id(signature, self, args, kwargs, id_arg), generation)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(id_arg: str = None):
+    """
+    Invalidate the manager's cache once a write method returns or fails.
+    id_arg names the written row id argument, creates only drop the list entries.
+    Inside a transaction_scope() the entries are dropped again when it ends: reads of the
+    batch may have cached rows it had not committed yet, or rolled back.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        def invalidate(self, args, kwargs):
+            cache = get_cache(self.cache_name)
+            if cache is not None:
+                item_id = _item_id(signature, self, args, kwargs, id_arg)
+                cache.invalidate(item_id)
+                if in_transaction_scope():
+                    after_transaction(lambda: cache.invalidate(item_id), on_rollback=True)
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                try:
+                    return await method(self, *args, **kwargs)
+                finally:
+                    invalidate(self, args, kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                invalidate(self, args, kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,119 @@
+import functools
+import inspect
+import threading
+import weakref
+from dataclasses import dataclass
+
+from data.manager.db_manager import after_transaction
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    entity: str  # table name, same as the manager's cache_name
+    kind: str  # CREATED, UPDATED or DELETED
+    id: int
+    row: dict = None  # serialized row, None for deletes
+
+
+class ChangeBus:
+    """
+    In-process publish/subscribe of row changes, so views patch the rows they show
+    instead of re-querying and re-rendering the whole list.
+    Callbacks run in the thread of the write. Bound methods are held weakly,
+    a component that goes away stops receiving events without unsubscribing.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # entity -> list of callback references
+        self._lock = threading.Lock()
+
+    def subscribe(self, entity: str, callback):
+        """Call callback(event) for every change of entity, returns a function that unsubscribes"""
+        ref = weakref.WeakMethod(callback) if inspect.ismethod(callback) else (lambda: callback)
+        with self._lock:
+            self._subscribers.setdefault(entity, []).append(ref)
+
+        def unsubscribe():
+            with self._lock:
+                refs = self._subscribers.get(entity, [])
+                if ref in refs:
+                    refs.remove(ref)
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent):
+        with self._lock:
+            refs = list(self._subscribers.get(event.entity, ()))
+        dead = []
+        for ref in refs:
+            callback = ref()
+            if callback is None:
+                dead.append(ref)
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                # A broken view must not fail the write that already committed
+                print(f"Error applying {event.kind} of {event.entity} {event.id}: {e}")
+        if dead:
+            with self._lock:
+                live = self._subscribers.get(event.entity, [])
+                self._subscribers[event.entity] = [ref for ref in live if ref not in dead]
+
+
+bus = ChangeBus()
+
+
+def subscribe(entity: str, callback):
+    return bus.subscribe(entity, callback)
+
+
+def _as_row(result):
+    """Serialized row of a write result: manager dicts as they are, models through to_dict()"""
+    if isinstance(result, dict):
+        return result
+    to_dict = getattr(result, "to_dict", None)
+    return to_dict() if to_dict else None
+
+
+def publishes(kind: str, id_arg: str = None):
+    """
+    Publish a change event once a write method of a manager returns.
+    Creates and updates publish the row they return; deletes publish the id_arg
+    argument, unless the method returned False (nothing deleted). Failed writes publish nothing.
+    Bulk writes do not publish, views reload after them. Works for sync and async methods.
+    Inside a transaction_scope() (POST /batch) events wait for its commit and are dropped on rollback.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        def publish(self, args, kwargs, result):
+            if kind == DELETED:
+                if result is False:
+                    return
+                event = ChangeEvent(self.cache_name, kind, signature.bind(self, *args, **kwargs).arguments[id_arg])
+            else:
+                row = _as_row(result)
+                if row is None:
+                    return
+                event = ChangeEvent(self.cache_name, kind, row.get("id"), row)
+            after_transaction(lambda: bus.publish(event))
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                result = await method(self, *args, **kwargs)
+                publish(self, args, kwargs, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            publish(self, args, kwargs, result)
+            return result
+        return wrapper
+    return decorator
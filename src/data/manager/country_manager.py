@@ -1,30 +1,83 @@
 from data.models.country import Country
 from data.manager.db_manager import DatabaseManager
+from data.manager.query_utils import (
+    filter_by_name, order_by_rank, count_by_name, name_page, page_with_cursor, paginate, is_unique_violation
+)
+from data.manager.fts import search_indexes
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.bulk import bulk_write, named_rows, BULK_CHUNK_SIZE
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 
 class CountryManager:
+    cache_name = "countries"
+
     def __init__(self):
         self.dbm = DatabaseManager()
 
+    @publishes(CREATED)
+    @invalidates()
     def create(self, name: str, disabled: bool = False):
         db = self.dbm.get_session()
         try:
-            if db.query(Country).filter(Country.name == name).first():
-                raise ValueError("Country already exists")
-            country = Country(name=name, disabled=disabled)
-            db.add(country)
+            # The UNIQUE constraint on name replaces the duplicate pre-check
+            country = db.scalars(insert(Country).values(name=name, disabled=disabled).returning(Country)).one()
             db.commit()
-            db.refresh(country)
             return country
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Country already exists")
+            raise e
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def get_all(self, q: str = None, skip: int = 0, limit: int = None):
+        db = self.dbm.get_session()
+        try:
+            indexes = search_indexes(db)
+            query = filter_by_name(db.query(Country), Country, q, indexes)
+            query = order_by_rank(query, Country, q, indexes).order_by(Country.id)
+            return paginate(query, skip, limit).all()
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def get_page(self, q: str = None, limit: int = 10, cursor: str = None, skip: int = 0):
+        db = self.dbm.get_session()
+        try:
+            rows = db.execute(name_page(Country, q, cursor, skip, limit, search_indexes(db))).all()
+            page, next_cursor = page_with_cursor(rows, limit, lambda row: row[1:])
+            return [row[0] for row in page], next_cursor
         finally:
             self.dbm.close_session(db)
 
-    def get_all(self):
+    @cached()
+    def count(self, q: str = None):
         db = self.dbm.get_session()
         try:
-            return db.query(Country).all()
+            return db.scalar(count_by_name(Country, q, search_indexes(db)))
         finally:
             self.dbm.close_session(db)
 
+    def exists(self):
+        db = self.dbm.get_session()
+        try:
+            return db.query(db.query(Country.id).exists()).scalar()
+        finally:
+            self.dbm.close_session(db)
+
+    @invalidates()
+    def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        return bulk_write(self.dbm, Country, named_rows(items), ["name"], chunk_size=chunk_size)
+
+    @invalidates()
+    def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        return bulk_write(self.dbm, Country, named_rows(items), ["name"], ["disabled"], chunk_size)
+
+    @cached(id_arg="country_id")
     def get_by_id(self, country_id: int):
         db = self.dbm.get_session()
         try:
@@ -32,22 +85,32 @@ class CountryManager:
         finally:
             self.dbm.close_session(db)
 
+    @publishes(UPDATED)
+    @invalidates(id_arg="country_id")
     def update(self, country_id: int, name: str = None, disabled: bool = None):
+        values = {k: v for k, v in {"name": name, "disabled": disabled}.items() if v is not None}
         db = self.dbm.get_session()
         try:
-            country = db.query(Country).filter(Country.id == country_id).first()
+            if values:
+                country = db.scalars(
+                    update(Country).where(Country.id == country_id).values(**values).returning(Country)
+                ).first()
+            else:
+                country = db.get(Country, country_id)
             if not country:
                 raise ValueError("Country not found")
-            if name is not None:
-                country.name = name
-            if disabled is not None:
-                country.disabled = disabled
             db.commit()
-            db.refresh(country)
             return country
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Country already exists")
+            raise e
         finally:
             self.dbm.close_session(db)
 
+    @publishes(DELETED, id_arg="country_id")
+    @invalidates(id_arg="country_id")
     def delete(self, country_id: int):
         db = self.dbm.get_session()
         try:
@@ -1,43 +1,75 @@
 from data.models.customer import Customer
 from data.manager.db_manager import DatabaseManager
+from data.manager.query_utils import is_unique_violation
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.bulk import bulk_write, BULK_CHUNK_SIZE
 
 class CustomerManager:
+    cache_name = "customers"
+
     def __init__(self):
         self.dbm = DatabaseManager()
 
+    @publishes(CREATED)
+    @invalidates()
     def create_customer(self, name: str,last_name: str, phone: str, email: str):
         db = self.dbm.get_session()
         try:
-            if db.query(Customer).filter(Customer.email == email).first():
-                raise ValueError("Email ya registrado")
-
-            customer = Customer(name=name, last_name=last_name, phone=phone, email=email)
-            db.add(customer)
+            # Single INSERT ... RETURNING, the UNIQUE constraint on email rejects duplicates
+            customer = db.scalars(
+                insert(Customer)
+                .values(name=name, last_name=last_name, phone=phone, email=email)
+                .returning(Customer)
+            ).one()
             db.commit()
-            db.refresh(customer)
             return customer
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
         finally:
             self.dbm.close_session(db)
 
+    @publishes(UPDATED)
+    @invalidates(id_arg="customer_id")
     def update_customer(self, customer_id: int, name: str, last_name: str, phone: str, email: str):
         db = self.dbm.get_session()
         try:
-            customer = db.query(Customer).filter(Customer.id == customer_id).first()
+            customer = db.scalars(
+                update(Customer)
+                .where(Customer.id == customer_id)
+                .values(name=name, last_name=last_name, phone=phone, email=email)
+                .returning(Customer)
+            ).first()
             if not customer:
                 raise ValueError("Customer no encontrado")
 
-            customer.name = name
-            customer.last_name = last_name
-            customer.phone = phone
-            customer.email = email
-
             db.commit()
-            db.refresh(customer)
-
             return customer
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
         finally:
             self.dbm.close_session(db)
 
+    @invalidates()
+    def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        """Insert many rows in chunked transactions, rows with an existing email are skipped"""
+        rows = [{c: item.get(c) for c in ("name", "last_name", "phone", "email")} for item in items]
+        return bulk_write(self.dbm, Customer, rows, ["email"], chunk_size=chunk_size)
+
+    @invalidates()
+    def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        """Insert many rows, updating the ones whose email already exists"""
+        rows = [{c: item.get(c) for c in ("name", "last_name", "phone", "email")} for item in items]
+        return bulk_write(self.dbm, Customer, rows, ["email"], ["name", "last_name", "phone"], chunk_size)
+
     def get_customer_by_email(self, email: str):
         db = self.dbm.get_session()
         try:
@@ -45,6 +77,7 @@ class CustomerManager:
         finally:
             self.dbm.close_session(db)
 
+    @cached()
     def get_all_customers(self):
         db = self.dbm.get_session()
         try:
@@ -52,6 +85,8 @@ class CustomerManager:
         finally:
             self.dbm.close_session(db)
 
+    @publishes(DELETED, id_arg="customer_id")
+    @invalidates(id_arg="customer_id")
     def delete_customer(self, customer_id: int):
         db = self.dbm.get_session()
         try:
@@ -1,27 +1,279 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+import os
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool, StaticPool
 
 from data.manager.db_base import Base
+from data.manager.instrumentation import instrument_engine
+from data.manager.fts import ensure_fts
+from data.manager.versions import ensure_versions
+
+load_dotenv()
+
+DEFAULT_DB_URL = os.getenv("DB_URL", "sqlite:///template.db")
+# SQLite defaults unless a deployment opts in, e.g. DB_PROFILE=performance (WAL, see SQLITE_PROFILES)
+DEFAULT_DB_PROFILE = os.getenv("DB_PROFILE", "default")
+DEFAULT_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DEFAULT_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+# Connect-time pragmas for each SQLite profile
+SQLITE_PROFILES = {
+    # SQLite defaults: rollback journal and a full fsync on every commit
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,  # Negative values are KiB, so ~64 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+# Process-wide registry: db_url -> (engine, sessionmaker)
+_registry = {}
+_registry_lock = threading.Lock()
+
+# One scoped_session (thread-local registry) per shared sessionmaker, see thread_scope()
+_scoped_sessions = {}
+# Per thread: scope depth, and {scoped_session: open get_session() calls} of the active scope,
+# plus the engine -> (connection, session) map and deferred callbacks of an active transaction_scope()
+_thread = threading.local()
+
+
+def apply_profile(engine, profile: str):
+    """Run the pragmas of a SQLite profile on every new connection"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}'")
+    pragmas = SQLITE_PROFILES[profile]
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _build_engine(db_url: str, pool_size: int, max_overflow: int, profile: str = DEFAULT_DB_PROFILE):
+    """Create an engine and its sessionmaker for the given URL"""
+    if db_url in ("sqlite://", "sqlite:///:memory:"):
+        # A memory database only lives as long as its single connection
+        engine = create_engine(
+            db_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(
+            db_url,
+            connect_args={"check_same_thread": False},  # Required for SQLite
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow
+        )
+    apply_profile(engine, profile)
+    instrument_engine(engine)
+
+    # Writes return their rows through RETURNING, so commits must not expire them
+    session_factory = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=engine
+    )
+    return engine, session_factory
+
+
+def get_engine(db_url: str = DEFAULT_DB_URL, pool_size: int = DEFAULT_POOL_SIZE,
+               max_overflow: int = DEFAULT_MAX_OVERFLOW, profile: str = DEFAULT_DB_PROFILE):
+    """
+    Return the shared (engine, sessionmaker) pair for a database URL.
+    The pool settings and profile only apply the first time a URL is registered.
+    """
+    entry = _registry.get(db_url)
+    if entry is None:
+        with _registry_lock:
+            entry = _registry.get(db_url)
+            if entry is None:
+                entry = _build_engine(db_url, pool_size, max_overflow, profile)
+                _registry[db_url] = entry
+    return entry
+
+
+def registered_engines():
+    """Return a copy of the registry as {db_url: engine}"""
+    return {url: engine for url, (engine, _) in _registry.items()}
+
+
+def _scoped_for(session_factory) -> scoped_session:
+    scoped = _scoped_sessions.get(session_factory)
+    if scoped is None:
+        with _registry_lock:
+            scoped = _scoped_sessions.setdefault(session_factory, scoped_session(session_factory))
+    return scoped
+
+
+def in_thread_scope() -> bool:
+    return getattr(_thread, "depth", 0) > 0
+
+
+@contextmanager
+def thread_scope():
+    """
+    Give the current thread its own session per database for the duration of the block
+    (scoped_session style): inside it every DatabaseManager.get_session() of this thread returns
+    that session, nested manager calls share it, and it is closed and discarded when the
+    outermost scope ends. Background loaders run in one so sessions never cross threads.
+    """
+    if not in_thread_scope():
+        _thread.depth = 0
+        _thread.sessions = {}
+    _thread.depth += 1
+    try:
+        yield
+    finally:
+        _thread.depth -= 1
+        if _thread.depth == 0:
+            for scoped in _thread.sessions:
+                scoped.remove()
+            _thread.sessions = {}
+
+
+def thread_scoped(fn):
+    """Wrap a thread target so it runs inside thread_scope()"""
+    def run(*args, **kwargs):
+        with thread_scope():
+            return fn(*args, **kwargs)
+    return run
+
+
+def in_transaction_scope() -> bool:
+    return getattr(_thread, "transaction", None) is not None
+
+
+def _begin(engine):
+    """
+    Connection of the engine with its transaction begun. SQLite connections switch to
+    explicit BEGIN (as the index advisor does): with pysqlite's implicit transactions the
+    release of the first savepoint would commit on its own.
+    """
+    connection = engine.connect()
+    isolation_level = False  # nothing to restore
+    if engine.dialect.name == "sqlite":
+        dbapi = connection.connection.driver_connection
+        isolation_level, dbapi.isolation_level = dbapi.isolation_level, None
+        connection.exec_driver_sql("BEGIN")
+    else:
+        connection.begin()
+    return connection, isolation_level
+
+
+def _end(connection, isolation_level, commit: bool):
+    try:
+        if commit:
+            connection.commit()
+        else:
+            connection.rollback()
+    finally:
+        if isolation_level is not False:
+            connection.connection.driver_connection.isolation_level = isolation_level
+        connection.close()
+
+
+@contextmanager
+def transaction_scope():
+    """
+    Run the manager calls of the block in one transaction per database, committed once when it
+    ends and rolled back when it raises. Inside it every DatabaseManager.get_session() of this thread
+    returns the scope's session, joined through savepoints: the commit of a manager call releases its
+    savepoint and its rollback undoes that call alone. Nested scopes join the outer one.
+    Sync managers only, POST /batch runs its operations in one.
+    """
+    if in_transaction_scope():
+        yield
+        return
+    _thread.transaction = {}  # engine -> (connection, isolation_level, session)
+    _thread.after_transaction = []  # (callback, on_rollback)
+    committed = False
+    try:
+        yield
+        committed = True
+    finally:
+        transaction, callbacks = _thread.transaction, _thread.after_transaction
+        _thread.transaction = _thread.after_transaction = None
+        for connection, isolation_level, session in transaction.values():
+            session.close()
+            try:
+                _end(connection, isolation_level, committed)
+            except SQLAlchemyError:
+                committed = False
+                raise
+        for callback, on_rollback in callbacks:
+            if committed or on_rollback:
+                callback()
+
+
+def after_transaction(callback, on_rollback: bool = False):
+    """
+    Defer callback() until the thread's transaction_scope() commits (or rolls back too, with
+    on_rollback), outside one it runs right away. Keeps change events and cache invalidations
+    of a batch from running before its writes are visible.
+    """
+    if in_transaction_scope():
+        _thread.after_transaction.append((callback, on_rollback))
+    else:
+        callback()
+
+
+def dispose_engines():
+    """Dispose every shared engine and empty the registry"""
+    with _registry_lock:
+        for engine, _ in _registry.values():
+            engine.dispose()
+        _registry.clear()
+        _scoped_sessions.clear()
+
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, db_url: str = DEFAULT_DB_URL, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_overflow: int = DEFAULT_MAX_OVERFLOW, shared: bool = True,
+                 profile: str = DEFAULT_DB_PROFILE):
         # Database URL
-        self.db_url = f"sqlite:///template.db"
-        self.engine = create_engine(
-            self.db_url,
-            connect_args={"check_same_thread": False}  # Required for SQLite
-        )
+        self.db_url = db_url
+        self.shared = shared
+        self.profile = profile
 
-        self.SessionLocal = sessionmaker(
-            autocommit=False,
-            autoflush=False,
-            bind=self.engine
-        )
+        # Shared managers reuse the process-wide engine for this URL,
+        # private ones get their own engine and connection pool
+        if shared:
+            self.engine, self.SessionLocal = get_engine(db_url, pool_size, max_overflow, profile)
+        else:
+            self.engine, self.SessionLocal = _build_engine(db_url, pool_size, max_overflow, profile)
+        self.scoped_session = _scoped_for(self.SessionLocal) if shared else scoped_session(self.SessionLocal)
 
     def get_session(self) -> Session:
-        """Open a new database session"""
+        """Open a new database session, or return the thread's one inside transaction_scope() or thread_scope()"""
         try:
+            if in_transaction_scope():
+                entry = _thread.transaction.get(self.engine)
+                if entry is None:
+                    connection, isolation_level = _begin(self.engine)
+                    session = Session(bind=connection, join_transaction_mode="create_savepoint",
+                                      autoflush=False, expire_on_commit=False)
+                    entry = _thread.transaction[self.engine] = (connection, isolation_level, session)
+                return entry[2]
+            if in_thread_scope():
+                db = self.scoped_session()
+                _thread.sessions[self.scoped_session] = _thread.sessions.get(self.scoped_session, 0) + 1
+                return db
             db = self.SessionLocal()
             return db
         except SQLAlchemyError as e:
@@ -29,16 +281,34 @@ class DatabaseManager:
             return None
 
     def close_session(self, db: Session):
-        """Close a database session"""
+        """
+        Close a database session. The thread's scoped session is closed when its last
+        get_session() is closed (its connection goes back to the pool), thread_scope() discards it.
+        """
         try:
+            if in_transaction_scope() and db is _thread.transaction.get(self.engine, (None, None, None))[2]:
+                return  # closed when the transaction scope ends
+            if in_thread_scope() and self.scoped_session in _thread.sessions and db is self.scoped_session():
+                _thread.sessions[self.scoped_session] -= 1
+                if _thread.sessions[self.scoped_session] > 0:
+                    return
             db.close()
         except SQLAlchemyError as e:
             print(f"Error closing session: {e}")
 
+    def dispose(self):
+        """Release the connection pool of a private (non shared) engine"""
+        if not self.shared:
+            self.engine.dispose()
+
     def create_db(self):
         """Create tables if they do not exist"""
         try:
             Base.metadata.create_all(bind=self.engine)
+            # Tables created before the search index and the version triggers existed get them here,
+            # new tables get them from create_all. Building an engine never runs DDL
+            ensure_fts(self.engine)
+            ensure_versions(self.engine)
             print("Database created.")
         except SQLAlchemyError as e:
             print(f"Error creating database: {e}")
@@ -53,9 +323,17 @@ class DatabaseManager:
             print(f"Error resetting database: {e}")
 
     def update_schema(self):
-        """Update schema by creating missing tables"""
+        """
+        Update schema by creating missing tables, and the model indexes, search indexes
+        and version triggers existing tables lack
+        """
         try:
             Base.metadata.create_all(bind=self.engine)
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=self.engine, checkfirst=True)
+            ensure_fts(self.engine)
+            ensure_versions(self.engine)
             print("Schema updated.")
         except SQLAlchemyError as e:
-            print(f"Error updating schema: {e}")
\ No newline at end of file
+            print(f"Error updating schema: {e}")
@@ -0,0 +1,169 @@
+import functools
+import re
+import sqlite3
+import weakref
+
+from sqlalchemy import Table, event, inspect, column, table
+from sqlalchemy.exc import OperationalError
+
+# Tables with an FTS5 shadow index and the columns it covers
+FTS_COLUMNS = {
+    "countries": ("name",),
+    "persons": ("name",),
+    "communities": ("name",),
+    "abc": ("name",),
+    "products": ("code", "name"),
+    "customers": ("name", "last_name", "email"),
+}
+# Case and accent insensitive ("mexico" matches "México"), prefix indexes for short autocomplete terms
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+FTS_PREFIX = "2 3"
+
+FTS_AVAILABLE = ("ENABLE_FTS5",) in sqlite3.connect(":memory:").execute("PRAGMA compile_options").fetchall()
+# Second shadow index for substrings inside words ("xic" in "México") and literal symbols ("a_b%c"),
+# searched with LIKE. The trigram tokenizer folds case but keeps accents (SQLite >= 3.34)
+TRIGRAM_AVAILABLE = FTS_AVAILABLE and sqlite3.sqlite_version_info >= (3, 34, 0)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Shadow indexes found in each database, per engine. Read on the first search, forgotten on any
+# index DDL. A database created before the indexes existed is searched with LIKE until they are built
+_present = weakref.WeakKeyDictionary()
+
+
+def fts_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def trigram_name(table_name: str) -> str:
+    return f"{table_name}_trigram"
+
+
+@functools.lru_cache(maxsize=None)
+def fts_table(table_name: str):
+    """Lightweight construct of the shadow table, for use in queries (one per table so FROMs dedupe)"""
+    name = fts_name(table_name)
+    return table(name, column("rowid"), column("rank"), column(name))
+
+
+@functools.lru_cache(maxsize=None)
+def trigram_table(table_name: str):
+    """Lightweight construct of the trigram index, its columns are the indexed ones"""
+    return table(trigram_name(table_name), column("rowid"), *[column(c) for c in FTS_COLUMNS[table_name]])
+
+
+def _index_ddl(table_name: str, name: str, options: str):
+    columns = FTS_COLUMNS[table_name]
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({cols}, content='{table_name}', content_rowid='id', "
+        f"{options})",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE ON {table_name} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def _index_names(table_name: str):
+    return [fts_name(table_name)] + ([trigram_name(table_name)] if TRIGRAM_AVAILABLE else [])
+
+
+def fts_ddl(table_name: str, name: str = None):
+    """
+    External-content FTS5 tables over the given table (word index, trigram index) plus the triggers
+    that keep them in sync; only the one called name when given
+    """
+    statements = []
+    if name in (None, fts_name(table_name)):
+        statements += _index_ddl(
+            table_name, fts_name(table_name), f"tokenize='{FTS_TOKENIZER}', prefix='{FTS_PREFIX}'")
+    if TRIGRAM_AVAILABLE and name in (None, trigram_name(table_name)):
+        statements += _index_ddl(table_name, trigram_name(table_name), "tokenize='trigram'")
+    return statements
+
+
+def create_fts(conn, table_name: str, names=None):
+    """Create the shadow indexes of a table (or only those in names) and fill them from the rows already there"""
+    for name in names or _index_names(table_name):
+        for statement in fts_ddl(table_name, name):
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+
+
+def drop_fts(conn, table_name: str):
+    """Drop the shadow indexes, their triggers go away with the content table"""
+    for name in (fts_name(table_name), trigram_name(table_name)):
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {name}")
+
+
+def ensure_fts(engine):
+    """Create the missing shadow indexes of existing tables, a no-op once they exist"""
+    if not FTS_AVAILABLE or engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            existing = set(inspect(conn).get_table_names())
+            for table_name in FTS_COLUMNS:
+                missing = [name for name in _index_names(table_name) if name not in existing]
+                if table_name in existing and missing:
+                    create_fts(conn, table_name, missing)
+    except OperationalError as e:
+        print(f"Error creating search index: {e}")
+    _present.clear()
+
+
+def search_indexes(session) -> frozenset:
+    """
+    Names of the shadow indexes present in the session's database, read once per engine.
+    Pass it to the search helpers of query_utils; async sessions call it through run_sync.
+    """
+    connection = session.connection()
+    engine = connection.engine
+    names = _present.get(engine)
+    if names is None:
+        names = frozenset()
+        if FTS_AVAILABLE and engine.dialect.name == "sqlite":
+            rows = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")
+            names = frozenset(row[0] for row in rows if row[0].endswith(("_fts", "_trigram")))
+        _present[engine] = names
+    return names
+
+
+@event.listens_for(Table, "after_create")
+def _create_fts_after_table(target, connection, **kw):
+    if FTS_AVAILABLE and connection.dialect.name == "sqlite" and target.name in FTS_COLUMNS:
+        create_fts(connection, target.name)
+        _present.clear()
+
+
+@event.listens_for(Table, "before_drop")
+def _drop_fts_before_table(target, connection, **kw):
+    if connection.dialect.name == "sqlite" and target.name in FTS_COLUMNS:
+        drop_fts(connection, target.name)
+        _present.clear()
+
+
+def match_expression(q: str):
+    """
+    FTS5 query matching every word of q as a prefix ("cost ri" -> "cost"* "ri"*),
+    None when q has no word characters.
+    """
+    tokens = _TOKEN.findall(q or "")
+    if not tokens:
+        return None
+    return " ".join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+
+def has_fts(model, indexes=()) -> bool:
+    """Whether the word index of the model's table is among `indexes` (see search_indexes)"""
+    return model.__tablename__ in FTS_COLUMNS and fts_name(model.__tablename__) in indexes
+
+
+def has_trigram(model, indexes=()) -> bool:
+    return model.__tablename__ in FTS_COLUMNS and trigram_name(model.__tablename__) in indexes
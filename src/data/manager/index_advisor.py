@@ -0,0 +1,120 @@
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from data.manager.query_plan import full_scans, table_aliases
+
+_LOWER = re.compile(r"\blower\((\w+)\.(\w+)\)\s*(?:=|IN\b)", re.IGNORECASE)
+_COMPARED = re.compile(r"(?<![\w.(])(\w+)\.(\w+)\s*(?:=|IN\b|<|>|BETWEEN\b|IS\b)", re.IGNORECASE)
+_ORDERED = re.compile(r"\bORDER BY\s+(\w+)\.(\w+)", re.IGNORECASE)
+
+
+@dataclass
+class IndexProposal:
+    table: str
+    expression: str  # column name or "lower(column)"
+    statements: Counter = field(default_factory=Counter)  # statement -> times seen in the log
+    plan_before: list = field(default_factory=list)
+    plan_after: list = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        # Same name SQLAlchemy gives Column(index=True), so declaring it later on the model is a no-op
+        return f"ix_{self.table}_" + re.sub(r"\W+", "_", self.expression).strip("_")
+
+    @property
+    def ddl(self) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table} ({self.expression})"
+
+
+def read_query_log(path: str) -> Counter:
+    """Statements of a SQL_QUERY_LOG file with the number of times each one ran"""
+    statements = Counter()
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            if line.strip():
+                statements[json.loads(line)["sql"]] += 1
+    return statements
+
+
+def _plan_cost(details, names) -> int:
+    """2 for a plain scan of the table (any of its names), 1 for a full index walk or a temporary sort, summed"""
+    cost = 0
+    for detail in details:
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and match.group(1) in names:
+            cost += 1 if "INDEX" in detail else 2
+        elif detail.startswith("USE TEMP B-TREE"):
+            cost += 1
+    return cost
+
+
+def _names(statement: str, table: str):
+    """The table name plus its aliases in the statement"""
+    return {table} | {alias for alias, name in table_aliases(statement).items() if name == table}
+
+
+def _candidates(statement: str, table: str):
+    """Indexable expressions of `table` in a statement, filters first then ORDER BY"""
+    names = _names(statement, table)
+    found = []
+    for pattern, wrap in ((_LOWER, "lower({})"), (_COMPARED, "{}"), (_ORDERED, "{}")):
+        for owner, column in pattern.findall(statement):
+            expression = wrap.format(column)
+            if owner in names and column != "id" and expression not in found:
+                found.append(expression)
+    return found
+
+
+def advise(engine, statements, tables):
+    """
+    Propose single-expression indexes for the statements whose plan scans one of `tables`.
+    Each candidate is created inside a transaction that is rolled back, and only kept
+    when the statement's plan gets cheaper with it.
+    """
+    proposals = {}
+    raw = engine.raw_connection()
+    dbapi = raw.driver_connection
+    isolation_level = dbapi.isolation_level
+    try:
+        dbapi.isolation_level = None  # BEGIN/ROLLBACK are issued by hand so the DDL can be undone
+        cursor = dbapi.cursor()
+
+        def plan(statement):
+            parameters = [None] * statement.count("?")
+            return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+        for statement, seen in statements.items():
+            try:
+                before = plan(statement)
+            except Exception:
+                continue  # written for a schema this database no longer has
+            for table in dict.fromkeys(full_scans(before, tables, statement)):
+                names = _names(statement, table)
+                for expression in _candidates(statement, table):
+                    proposal = IndexProposal(table, expression)
+                    cursor.execute("BEGIN")
+                    try:
+                        cursor.execute(proposal.ddl)
+                        after = plan(statement)
+                    finally:
+                        cursor.execute("ROLLBACK")
+                    if _plan_cost(after, names) < _plan_cost(before, names):
+                        proposal = proposals.setdefault(proposal.name, proposal)
+                        proposal.statements[statement] += seen
+                        proposal.plan_before, proposal.plan_after = before, after
+                        break
+        cursor.close()
+    finally:
+        # The connection goes back to the pool, with the mode the engine set on it
+        dbapi.isolation_level = isolation_level
+        raw.close()
+    return sorted(proposals.values(), key=lambda p: sum(p.statements.values()), reverse=True)
+
+
+def apply_indexes(engine, proposals):
+    """Create the proposed indexes, indexes that already exist are left alone"""
+    with engine.begin() as conn:
+        for proposal in proposals:
+            conn.exec_driver_sql(proposal.ddl)
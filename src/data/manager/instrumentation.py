@@ -0,0 +1,225 @@
+import contextvars
+import functools
+import heapq
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+# Record statements run outside an operation() too, under the calling manager method
+ENABLED = os.getenv("SQL_INSTRUMENTATION", "0") == "1"
+# Raise QueryBudgetExceeded instead of printing a warning
+STRICT = os.getenv("SQL_STRICT", "0") == "1"
+# The same statement run this many times in one operation is an N+1 candidate
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 5))
+# Append every SELECT (SQL text and time, never parameters) to this JSON lines file,
+# the input of `init_db.py advise_indexes`
+QUERY_LOG = os.getenv("SQL_QUERY_LOG")
+SLOWEST_KEPT = 5
+UNSCOPED = "<unscoped>"
+# Helpers that run statements for a manager, never reported as the caller
+_INFRASTRUCTURE = {
+    __name__, "data.manager.db_manager", "data.manager.async_db_manager",
+    "data.manager.bulk", "data.manager.cache",
+}
+
+# Operations in progress for the current request, thread or task (outermost first)
+_active = contextvars.ContextVar("sql_operations", default=())
+_stats = {}
+_stats_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """An operation ran more statements or took longer than its budget, or looked like an N+1"""
+
+
+class _Scope:
+    """Statements of one run of an operation"""
+
+    def __init__(self, name: str, max_statements: int = None, max_ms: float = None):
+        self.name = name
+        self.max_statements = max_statements
+        self.max_ms = max_ms
+        self.statements = []  # (sql, elapsed ms)
+
+    def repeated(self):
+        """Statements run at least N_PLUS_ONE_THRESHOLD times, with their count"""
+        counts = {}
+        for sql, _ in self.statements:
+            counts[sql] = counts.get(sql, 0) + 1
+        return {sql: n for sql, n in counts.items() if n >= N_PLUS_ONE_THRESHOLD}
+
+    def problems(self):
+        """Human readable list of budget overruns and N+1 candidates"""
+        found = []
+        total_ms = sum(ms for _, ms in self.statements)
+        if self.max_statements is not None and len(self.statements) > self.max_statements:
+            found.append(f"{len(self.statements)} statements, budget is {self.max_statements}")
+        if self.max_ms is not None and total_ms > self.max_ms:
+            found.append(f"{total_ms:.1f} ms in SQL, budget is {self.max_ms} ms")
+        for sql, n in self.repeated().items():
+            found.append(f"N+1 candidate, run {n} times: {sql}")
+        return found
+
+
+class OperationStats:
+    """Accumulated SQL activity of a manager method or endpoint"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.statements = 0
+        self.total_ms = 0.0
+        self.max_statements = 0
+        self.slowest = []  # min-heap of (elapsed ms, sql)
+        self.n_plus_one = {}  # sql -> highest repeat count seen in one call
+
+    def add(self, scope: _Scope):
+        self.calls += 1
+        self.statements += len(scope.statements)
+        self.max_statements = max(self.max_statements, len(scope.statements))
+        for sql, ms in scope.statements:
+            self.total_ms += ms
+            if len(self.slowest) < SLOWEST_KEPT:
+                heapq.heappush(self.slowest, (ms, sql))
+            elif ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (ms, sql))
+        for sql, n in scope.repeated().items():
+            self.n_plus_one[sql] = max(n, self.n_plus_one.get(sql, 0))
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "statements": self.statements,
+            "statements_per_call": self.statements / self.calls if self.calls else 0.0,
+            "max_statements": self.max_statements,
+            "total_ms": round(self.total_ms, 3),
+            "slowest": [{"ms": round(ms, 3), "sql": sql} for ms, sql in sorted(self.slowest, reverse=True)],
+            "n_plus_one": self.n_plus_one,
+        }
+
+
+def _record(scope: _Scope):
+    with _stats_lock:
+        stats = _stats.get(scope.name)
+        if stats is None:
+            stats = _stats[scope.name] = OperationStats(scope.name)
+        stats.add(scope)
+
+
+def _caller_name():
+    """Class.method of the manager running the statement, UNSCOPED when not found"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("data.manager.") and module not in _INFRASTRUCTURE and "self" in frame.f_locals:
+            return f"{type(frame.f_locals['self']).__name__}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return UNSCOPED
+
+
+def _log_statement(statement: str, elapsed: float):
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return
+    line = json.dumps({"sql": statement, "ms": round(elapsed, 3)})
+    with _log_lock, open(QUERY_LOG, "a", encoding="utf-8") as log:
+        log.write(line + "\n")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if ENABLED or QUERY_LOG or _active.get():
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = (time.perf_counter() - starts.pop()) * 1000
+    if QUERY_LOG:
+        _log_statement(statement, elapsed)
+    scopes = _active.get()
+    if scopes:
+        for scope in scopes:
+            scope.statements.append((statement, elapsed))
+    else:
+        scope = _Scope(_caller_name())
+        scope.statements.append((statement, elapsed))
+        _record(scope)
+
+
+def instrument_engine(engine):
+    """Attach the timing hooks to an engine (sync or async), once"""
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def operation(name: str, max_statements: int = None, max_ms: float = None, strict: bool = None):
+    """
+    Group the statements run inside the block under `name`.
+    Nested operations also count towards the enclosing ones.
+    When the budget is exceeded or an N+1 is detected a warning is printed,
+    in strict mode (strict=True or SQL_STRICT=1) QueryBudgetExceeded is raised.
+    Yields the scope, its `name` may be changed before the block ends.
+    """
+    scope = _Scope(name, max_statements, max_ms)
+    token = _active.set(_active.get() + (scope,))
+    try:
+        yield scope
+    finally:
+        _active.reset(token)
+        _record(scope)
+    problems = scope.problems()
+    if problems:
+        message = f"{scope.name}: " + "; ".join(problems)
+        if STRICT if strict is None else strict:
+            raise QueryBudgetExceeded(message)
+        print(f"[sql] {message}")
+
+
+def instrumented(name: str = None, max_statements: int = None, max_ms: float = None, strict: bool = None):
+    """Run a method inside operation(), named Class.method unless given; sync and async"""
+    def decorator(method):
+        def operation_name(args):
+            if name:
+                return name
+            owner = type(args[0]).__name__ + "." if args else ""
+            return owner + method.__name__
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                with operation(operation_name(args), max_statements, max_ms, strict):
+                    return await method(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with operation(operation_name(args), max_statements, max_ms, strict):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def query_report():
+    """Stats of every operation seen, the most expensive first"""
+    with _stats_lock:
+        stats = sorted(_stats.values(), key=lambda s: s.total_ms, reverse=True)
+        return {s.name: s.as_dict() for s in stats}
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
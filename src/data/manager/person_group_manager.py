@@ -1,9 +1,78 @@
-from data.models.person_group import PersonGroup
+from data.models.person_group import PersonGroup, person_group_people, person_group_communities
 from data.models.person import Person
 from data.models.community import Community
 from data.models.country import Country
 from data.manager.db_manager import DatabaseManager
-from sqlalchemy.orm import joinedload
+from data.manager.query_utils import filter_by_name, paginate
+from data.manager.instrumentation import instrumented
+from sqlalchemy import select, func, insert, delete
+from sqlalchemy.orm import joinedload, selectinload, raiseload, load_only
+
+# Named relationship loader strategies for PersonGroup.
+# Collections use selectin loading (one extra IN query each) so a group
+# with P people and C communities never turns into P x C joined rows.
+LOADER_PROFILES = {
+    # Group and country, member collections are not loaded
+    "summary": lambda: [
+        joinedload(PersonGroup.country),
+        raiseload(PersonGroup.people),
+        raiseload(PersonGroup.communities),
+    ],
+    # Group, country and full member rows
+    "detail": lambda: [
+        joinedload(PersonGroup.country),
+        selectinload(PersonGroup.people),
+        selectinload(PersonGroup.communities),
+    ],
+    # Group columns plus member ids only
+    "ids": lambda: [
+        load_only(PersonGroup.id, PersonGroup.name, PersonGroup.country_id),
+        raiseload(PersonGroup.country),
+        selectinload(PersonGroup.people).load_only(Person.id),
+        selectinload(PersonGroup.communities).load_only(Community.id),
+    ],
+}
+
+
+def loader_options(profile: str):
+    """Return the loader options of a named profile"""
+    if profile not in LOADER_PROFILES:
+        raise ValueError(f"Unknown loader profile '{profile}'")
+    return LOADER_PROFILES[profile]()
+
+
+#---------------------------------------
+# Membership statements on the association tables
+#---------------------------------------
+MEMBER_TABLES = {
+    "people": (person_group_people, person_group_people.c.person_id, Person),
+    "communities": (person_group_communities, person_group_communities.c.community_id, Community),
+}
+
+
+def member_ids_query(kind: str, group_id: int):
+    """Ids currently linked to a group"""
+    table, member_column, _ = MEMBER_TABLES[kind]
+    return select(member_column).where(table.c.person_group_id == group_id)
+
+
+def existing_ids_query(kind: str, ids):
+    """Those of `ids` that exist in the member table"""
+    _, _, model = MEMBER_TABLES[kind]
+    return select(model.id).where(model.id.in_(ids))
+
+
+def insert_members(kind: str, group_id: int, ids):
+    """(statement, rows) inserting one association row per id"""
+    table, member_column, _ = MEMBER_TABLES[kind]
+    return insert(table), [{"person_group_id": group_id, member_column.name: i} for i in ids]
+
+
+def delete_members(kind: str, group_id: int, ids):
+    """Statement deleting the association rows of `ids`"""
+    table, member_column, _ = MEMBER_TABLES[kind]
+    return delete(table).where(table.c.person_group_id == group_id, member_column.in_(ids))
+
 
 class PersonGroupManager:
     def __init__(self):
@@ -16,40 +85,166 @@ class PersonGroupManager:
                 raise ValueError("PersonGroup already exists")
 
             group = PersonGroup(name=name, country_id=country_id)
+            db.add(group)
+            db.flush()
 
             if people_ids:
-                people = db.query(Person).filter(Person.id.in_(people_ids)).all()
-                group.people = people
-
+                self._add_members(db, "people", group.id, people_ids)
             if community_ids:
-                communities = db.query(Community).filter(Community.id.in_(community_ids)).all()
-                group.communities = communities
+                self._add_members(db, "communities", group.id, community_ids)
 
-            db.add(group)
             db.commit()
-            db.refresh(group)
-            return group
+            return self._load(db, group.id, "detail")
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            self.dbm.close_session(db)
+
+    def _add_members(self, db, kind: str, group_id: int, ids):
+        """Bulk insert the links to `ids` that exist and are not linked yet"""
+        ids = set(ids)
+        if not ids:
+            return 0
+        ids &= set(db.scalars(existing_ids_query(kind, ids)))
+        ids -= set(db.scalars(member_ids_query(kind, group_id).where(MEMBER_TABLES[kind][1].in_(ids))))
+        if ids:
+            statement, rows = insert_members(kind, group_id, sorted(ids))
+            db.execute(statement, rows)
+        return len(ids)
+
+    def _remove_members(self, db, kind: str, group_id: int, ids):
+        """Bulk delete the links to `ids`"""
+        ids = set(ids)
+        if not ids:
+            return 0
+        return db.execute(delete_members(kind, group_id, ids)).rowcount
+
+    def _set_members(self, db, kind: str, group_id: int, ids):
+        """Make the group's links equal to `ids`, touching only the rows that change"""
+        current = set(db.scalars(member_ids_query(kind, group_id)))
+        wanted = set(ids)
+        removed = self._remove_members(db, kind, group_id, current - wanted)
+        added = self._add_members(db, kind, group_id, wanted - current)
+        return added, removed
+
+    def _load(self, db, group_id: int, profile: str):
+        """Load one group with the given loader profile, refreshing any cached instance"""
+        return (
+            db.query(PersonGroup)
+            .options(*loader_options(profile))
+            .populate_existing()
+            .filter(PersonGroup.id == group_id)
+            .first()
+        )
+
+    def _page_query(self, q: str = None, skip: int = 0, limit: int = None):
+        """Select of the ids of one page of groups, filtered and paged in SQL"""
+        return paginate(filter_by_name(select(PersonGroup.id), PersonGroup, q).order_by(PersonGroup.id), skip, limit)
+
+    def _page_ids(self, db, q: str = None, skip: int = 0, limit: int = None):
+        """Ids of one page of groups"""
+        return list(db.scalars(self._page_query(q, skip, limit)))
+
+    def _members(self, db, association, member_column, model, group_ids, limit: int = None):
+        """
+        Members of each group as {group_id: ([{"id", "name"}], total)}.
+        At most `limit` members per group are returned, the total is counted in the same query.
+        """
+        group_column = association.c.person_group_id
+        ranked = (
+            select(
+                group_column.label("group_id"),
+                model.id,
+                model.name,
+                func.row_number().over(partition_by=group_column, order_by=model.id).label("rn"),
+                func.count().over(partition_by=group_column).label("total"),
+            )
+            .join(model, model.id == member_column)
+            .where(group_column.in_(group_ids))
+            .subquery()
+        )
+        query = select(ranked.c.group_id, ranked.c.id, ranked.c.name, ranked.c.total)
+        if limit is not None:
+            query = query.where(ranked.c.rn <= limit)
+
+        members = {group_id: ([], 0) for group_id in group_ids}
+        for row in db.execute(query.order_by(ranked.c.group_id, ranked.c.rn)):
+            items, _ = members[row.group_id]
+            items.append({"id": row.id, "name": row.name})
+            members[row.group_id] = (items, row.total)
+        return members
+
+    # Groups (the page of ids is a subquery of the same statement) plus one selectin query
+    # per member collection the profile loads
+    @instrumented(max_statements=3)
+    def get_all(self, eager: bool = False, q: str = None, skip: int = 0, limit: int = None, profile: str = None):
+        """Groups loaded with `profile` ("detail" when eager, "summary" otherwise)"""
+        db = self.dbm.get_session()
+        try:
+            query = db.query(PersonGroup).options(*loader_options(profile or ("detail" if eager else "summary")))
+            if q or skip or limit is not None:
+                # Page the ids first so relations are only loaded for that page
+                query = query.filter(PersonGroup.id.in_(self._page_query(q, skip, limit)))
+            return query.order_by(PersonGroup.id).all()
         finally:
             self.dbm.close_session(db)
 
-    def get_all(self, eager: bool = False):
+    def count(self, q: str = None):
         db = self.dbm.get_session()
         try:
-            query = db.query(PersonGroup)
-            if eager:
-                query = query.options(
-                    joinedload(PersonGroup.people),
-                    joinedload(PersonGroup.communities),
-                    joinedload(PersonGroup.country)
-                )
-            return query.all()
+            return filter_by_name(db.query(func.count(PersonGroup.id)), PersonGroup, q).scalar()
         finally:
             self.dbm.close_session(db)
 
-    def get_by_id(self, group_id: int):
+    # Page query, group rows and one windowed query per member list, whatever the page size
+    @instrumented(max_statements=4)
+    def get_page(self, q: str = None, skip: int = 0, limit: int = None, members_limit: int = None,
+                 members=("people", "communities")):
+        """
+        One page of groups as plain dicts, without loading ORM relations.
+        Each member list holds at most `members_limit` entries plus its total size.
+        Only the member lists named in `members` are queried, the keys of the others are left out.
+        """
         db = self.dbm.get_session()
         try:
-            return db.query(PersonGroup).filter(PersonGroup.id == group_id).first()
+            group_ids = self._page_ids(db, q, skip, limit)
+            if not group_ids:
+                return []
+
+            groups = db.execute(
+                select(PersonGroup.id, PersonGroup.name, Country.id.label("country_id"), Country.name.label("country_name"))
+                .outerjoin(Country, Country.id == PersonGroup.country_id)
+                .where(PersonGroup.id.in_(group_ids))
+                .order_by(PersonGroup.id)
+            ).all()
+            lists = {}
+            if "people" in members:
+                lists["people"] = self._members(db, person_group_people, person_group_people.c.person_id,
+                                                Person, group_ids, members_limit)
+            if "communities" in members:
+                lists["communities"] = self._members(db, person_group_communities,
+                                                     person_group_communities.c.community_id,
+                                                     Community, group_ids, members_limit)
+
+            page = []
+            for g in groups:
+                row = {
+                    "id": g.id,
+                    "name": g.name,
+                    "country": {"id": g.country_id, "name": g.country_name} if g.country_id is not None else None,
+                }
+                for name, found in lists.items():
+                    row[name], row[f"{name}_total"] = found[g.id]
+                page.append(row)
+            return page
+        finally:
+            self.dbm.close_session(db)
+
+    def get_by_id(self, group_id: int, eager: bool = False, profile: str = None):
+        db = self.dbm.get_session()
+        try:
+            return self._load(db, group_id, profile or ("detail" if eager else "summary"))
         finally:
             self.dbm.close_session(db)
 
@@ -57,11 +252,7 @@ class PersonGroupManager:
                people_ids=None, community_ids=None):
         db = self.dbm.get_session()
         try:
-            group = db.query(PersonGroup).options(
-                joinedload(PersonGroup.people),
-                joinedload(PersonGroup.communities),
-                joinedload(PersonGroup.country)
-            ).filter(PersonGroup.id == group_id).first()
+            group = self._load(db, group_id, "summary")
 
             if not group:
                 raise ValueError("PersonGroup not found")
@@ -70,19 +261,45 @@ class PersonGroupManager:
                 group.name = name
             if country_id is not None:
                 group.country_id = country_id
+            # Only the added and removed links are written
             if people_ids is not None:
-                group.people.clear()
-                group.people.extend(db.query(Person).filter(Person.id.in_(people_ids)).all())
+                self._set_members(db, "people", group_id, people_ids)
             if community_ids is not None:
-                group.communities.clear()
-                group.communities.extend(db.query(Community).filter(Community.id.in_(community_ids)).all())
+                self._set_members(db, "communities", group_id, community_ids)
 
             db.commit()
-            db.refresh(group)
-            return group
+            return self._load(db, group_id, "detail")
+        except Exception as e:
+            db.rollback()
+            raise e
         finally:
             self.dbm.close_session(db)
 
+    def _change_members(self, group_id: int, people_ids, community_ids, change):
+        db = self.dbm.get_session()
+        try:
+            if not db.get(PersonGroup, group_id):
+                raise ValueError("PersonGroup not found")
+            changed = {
+                "people": change(db, "people", group_id, people_ids or []),
+                "communities": change(db, "communities", group_id, community_ids or []),
+            }
+            db.commit()
+            return changed
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            self.dbm.close_session(db)
+
+    def add_members(self, group_id: int, people_ids=None, community_ids=None):
+        """Link people/communities to a group, returns the number of links added per kind"""
+        return self._change_members(group_id, people_ids, community_ids, self._add_members)
+
+    def remove_members(self, group_id: int, people_ids=None, community_ids=None):
+        """Unlink people/communities from a group, returns the number of links removed per kind"""
+        return self._change_members(group_id, people_ids, community_ids, self._remove_members)
+
     def delete(self, group_id: int):
         db = self.dbm.get_session()
         try:
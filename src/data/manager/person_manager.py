@@ -1,31 +1,83 @@
 from data.models.person import Person
 from data.manager.db_manager import DatabaseManager
+from data.manager.query_utils import (
+    filter_by_name, order_by_rank, count_by_name, name_page, page_with_cursor, paginate, is_unique_violation
+)
+from data.manager.fts import search_indexes
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.bulk import bulk_write, named_rows, BULK_CHUNK_SIZE
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 
 class PersonManager:
+    cache_name = "persons"
+
     def __init__(self):
         self.dbm = DatabaseManager()
 
+    @publishes(CREATED)
+    @invalidates()
     def create(self, name: str, disabled: bool = False):
         db = self.dbm.get_session()
         try:
-            if db.query(Person).filter(Person.name == name).first():
-                raise ValueError("Person already exists")
-            person = Person(name=name, disabled=disabled)
-            db.add(person)
+            # The UNIQUE constraint on name replaces the duplicate pre-check
+            person = db.scalars(insert(Person).values(name=name, disabled=disabled).returning(Person)).one()
             db.commit()
-            db.refresh(person)
             return person
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Person already exists")
+            raise e
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def get_all(self, eager: bool = False, q: str = None, skip: int = 0, limit: int = None):
+        db = self.dbm.get_session()
+        try:
+            indexes = search_indexes(db)
+            query = filter_by_name(db.query(Person), Person, q, indexes)
+            query = order_by_rank(query, Person, q, indexes).order_by(Person.id)
+            return paginate(query, skip, limit).all()
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def get_page(self, q: str = None, limit: int = 10, cursor: str = None, skip: int = 0):
+        db = self.dbm.get_session()
+        try:
+            rows = db.execute(name_page(Person, q, cursor, skip, limit, search_indexes(db))).all()
+            page, next_cursor = page_with_cursor(rows, limit, lambda row: row[1:])
+            return [row[0] for row in page], next_cursor
         finally:
             self.dbm.close_session(db)
 
-    def get_all(self, eager: bool = False):
+    @cached()
+    def count(self, q: str = None):
         db = self.dbm.get_session()
         try:
-            query = db.query(Person)
-            return query.all()
+            return db.scalar(count_by_name(Person, q, search_indexes(db)))
         finally:
             self.dbm.close_session(db)
 
+    def exists(self):
+        db = self.dbm.get_session()
+        try:
+            return db.query(db.query(Person.id).exists()).scalar()
+        finally:
+            self.dbm.close_session(db)
+
+    @invalidates()
+    def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        return bulk_write(self.dbm, Person, named_rows(items), ["name"], chunk_size=chunk_size)
+
+    @invalidates()
+    def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        return bulk_write(self.dbm, Person, named_rows(items), ["name"], ["disabled"], chunk_size)
+
+    @cached(id_arg="person_id")
     def get_by_id(self, person_id: int):
         db = self.dbm.get_session()
         try:
@@ -33,22 +85,32 @@ class PersonManager:
         finally:
             self.dbm.close_session(db)
 
+    @publishes(UPDATED)
+    @invalidates(id_arg="person_id")
     def update(self, person_id: int, name: str = None, disabled: bool = None):
+        values = {k: v for k, v in {"name": name, "disabled": disabled}.items() if v is not None}
         db = self.dbm.get_session()
         try:
-            person = db.query(Person).filter(Person.id == person_id).first()
+            if values:
+                person = db.scalars(
+                    update(Person).where(Person.id == person_id).values(**values).returning(Person)
+                ).first()
+            else:
+                person = db.get(Person, person_id)
             if not person:
                 raise ValueError("Person not found")
-            if name is not None:
-                person.name = name
-            if disabled is not None:
-                person.disabled = disabled
             db.commit()
-            db.refresh(person)
             return person
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Person already exists")
+            raise e
         finally:
             self.dbm.close_session(db)
 
+    @publishes(DELETED, id_arg="person_id")
+    @invalidates(id_arg="person_id")
     def delete(self, person_id: int):
         db = self.dbm.get_session()
         try:
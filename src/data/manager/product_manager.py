@@ -1,126 +1,143 @@
 from data.models.product import Product
 from data.manager.db_manager import DatabaseManager
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.bulk import bulk_write, BULK_CHUNK_SIZE
 from controls.utils import random_image_url
+from data.manager.query_utils import is_unique_violation, keyset, page_with_cursor, projection, rows_of
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+
+PRODUCT_COLUMNS = (Product.id, Product.code, Product.name, Product.price, Product.image)
 
 class ProductManager:
+    cache_name = "products"
+
     def __init__(self):
         self.dbm = DatabaseManager()
 
+    @publishes(CREATED)
+    @invalidates()
     def create_product(self, code: str, name: str, price: float, image: str):
         db = self.dbm.get_session()
         try:
-            if db.query(Product).filter(Product.code == code).first():
-                raise ValueError("Código ya registrado")
-
-            product = Product(code=code, name=name, price=price, image=image)
-            db.add(product)
+            # Single INSERT ... RETURNING, the UNIQUE constraint on code rejects duplicates
+            product = db.execute(
+                insert(Product)
+                .values(code=code, name=name, price=price, image=image)
+                .returning(*PRODUCT_COLUMNS)
+            ).mappings().one()
             db.commit()
-            db.refresh(product)
-
-            return {
-                "id": product.id,
-                "code": product.code,
-                "name": product.name,
-                "price": product.price,
-                "image": product.image
-            }
+            return dict(product)
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Código ya registrado")
+            raise e
         finally:
             self.dbm.close_session(db)
 
+    @publishes(UPDATED)
+    @invalidates(id_arg="id")
     def update_product(self, id: int, code: str, name: str, price: float, image: str):
         db = self.dbm.get_session()
         try:
-            product = db.query(Product).filter(Product.id == id).first()
+            product = db.execute(
+                update(Product)
+                .where(Product.id == id)
+                .values(code=code, name=name, price=price, image=image)
+                .returning(*PRODUCT_COLUMNS)
+            ).mappings().first()
             if not product:
                 raise ValueError("Producto no encontrado")
 
-            existing = db.query(Product).filter(Product.code == code, Product.id != id).first()
-            if existing:
-                raise ValueError("Código ya registrado por otro producto")
-
-            product.code = code
-            product.name = name
-            product.price = price
-            product.image = image
-
             db.commit()
-            db.refresh(product)
-
-            return {
-                "id": product.id,
-                "code": product.code,
-                "name": product.name,
-                "price": product.price,
-                "image": product.image
-            }
+            return dict(product)
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Código ya registrado por otro producto")
+            raise e
         finally:
             self.dbm.close_session(db)
 
-    def get_all_products(self):
+    @invalidates()
+    def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        """Insert many rows in chunked transactions, rows with an existing code are skipped"""
+        rows = [{c: item.get(c) for c in ("code", "name", "price", "image")} for item in items]
+        return bulk_write(self.dbm, Product, rows, ["code"], chunk_size=chunk_size)
+
+    @invalidates()
+    def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        """Insert many rows, updating the ones whose code already exists"""
+        rows = [{c: item.get(c) for c in ("code", "name", "price", "image")} for item in items]
+        return bulk_write(self.dbm, Product, rows, ["code"], ["name", "price", "image"], chunk_size)
+
+    @cached()
+    def get_all_products(self, fields=None, as_tuples=False):
+        """
+        Listado de solo lectura: selecciona únicamente las columnas pedidas (todas por defecto)
+        y devuelve dicts, o tuplas en el orden de fields con as_tuples, sin instanciar modelos.
+        """
         db = self.dbm.get_session()
         try:
-            products = db.query(Product).all()
-            products_list = [
-                {
-                    "id": p.id,
-                    "code": p.code,
-                    "name": p.name,
-                    "price": p.price,
-                    "image": p.image
-                }
-                for p in products
-            ]
-            return products_list
+            query = select(*projection(Product, fields)).order_by(Product.__table__.c.id)
+            return rows_of(db.connection().execute(query), as_tuples)
         finally:
             self.dbm.close_session(db)
 
-    def get_products_paginated(self, page_number=1, page_size=10, order_by_attr="id", descending=False):
+    @cached()
+    def get_products_paginated(self, page_number=1, page_size=10, order_by_attr="id", descending=False,
+                               fields=None, as_tuples=False):
         db = self.dbm.get_session()
         try:
             # Verifica que el atributo exista en el modelo
-            if not hasattr(Product, order_by_attr):
+            if order_by_attr not in Product.__table__.c:
                 raise ValueError(f"Atributo '{order_by_attr}' no existe en Product")
 
-            order_column = getattr(Product, order_by_attr)
+            order_column = Product.__table__.c[order_by_attr]
             if descending:
                 order_column = order_column.desc()
 
             # Calcular el offset (paginación)
             offset_value = (page_number - 1) * page_size
 
-            products = (
-                db.query(Product)
+            query = (
+                select(*projection(Product, fields))
                 .order_by(order_column)
                 .offset(offset_value)
                 .limit(page_size)
-                .all()
             )
+            return rows_of(db.connection().execute(query), as_tuples)
+        finally:
+            self.dbm.close_session(db)
+
+    @cached()
+    def get_products_page(self, page_size=10, order_by_attr="id", descending=False, cursor=None):
+        """
+        Página por cursor (keyset): devuelve (productos, next_cursor), next_cursor es None en la última.
+        A diferencia de get_products_paginated, el costo no crece con la profundidad
+        y no se saltan ni repiten filas si los datos cambian entre páginas.
+        """
+        db = self.dbm.get_session()
+        try:
+            if order_by_attr not in Product.__table__.c:
+                raise ValueError(f"Atributo '{order_by_attr}' no existe en Product")
 
-            return [
-                {
-                    "id": p.id,
-                    "code": p.code,
-                    "name": p.name,
-                    "price": p.price,
-                    "image": p.image
-                }
-                for p in products
-            ]
+            # El id desempata los valores repetidos de la columna de orden
+            order = [Product.id] if order_by_attr == "id" else [getattr(Product, order_by_attr), Product.id]
+            query = keyset(select(*PRODUCT_COLUMNS), order, cursor, descending).limit(page_size + 1)
+            rows = [dict(row) for row in db.execute(query).mappings()]
+            return page_with_cursor(rows, page_size, lambda row: [row[c.key] for c in order])
         finally:
             self.dbm.close_session(db)
 
+    @cached(id_arg="id")
     def get_product_by_id(self, id: int):
         db = self.dbm.get_session()
         try:
             product = db.query(Product).filter(Product.id == id).first()
-            product_dict = {
-                "id": product.id,
-                "code": product.code,
-                "name": product.name,
-                "price": product.price,
-                "image": product.image
-            }
-            return product_dict
+            return product.to_dict()
         finally:
             self.dbm.close_session(db)
 
@@ -131,6 +148,8 @@ class ProductManager:
         finally:
             self.dbm.close_session(db)
 
+    @publishes(DELETED, id_arg="product_id")
+    @invalidates(id_arg="product_id")
     def delete_product(self, product_id: int):
         db = self.dbm.get_session()
         try:
@@ -0,0 +1,52 @@
+import re
+
+from sqlalchemy import event
+
+# "SCAN products", "SCAN p USING INDEX ...", "SCAN products USING COVERING INDEX ..."
+_SCAN = re.compile(r"^SCAN (\w+)")
+_TABLE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+AS\s+(\w+))?", re.IGNORECASE)
+
+
+def explain(conn, statement: str, parameters=()):
+    """EXPLAIN QUERY PLAN of a SQLite statement, as the list of plan details"""
+    return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def table_aliases(statement: str):
+    """{alias: table} of the FROM/JOIN clauses of a statement, plans name tables by alias"""
+    return {alias: table for table, alias in _TABLE.findall(statement) if alias}
+
+
+def full_scans(details, tables, statement: str = ""):
+    """Tables of `tables` the plan reads end to end (subqueries and CTEs are ignored)"""
+    aliases = table_aliases(statement)
+    scanned = []
+    for detail in details:
+        match = _SCAN.match(detail)
+        table = match and aliases.get(match.group(1), match.group(1))
+        if table in tables:
+            scanned.append(table)
+    return scanned
+
+
+def capture_selects(engine):
+    """Record (statement, parameters) of every SELECT run on the engine, returns (statements, stop)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def plans_of(engine, fn):
+    """Run fn and return [(statement, plan details)] for each SELECT it ran"""
+    statements, stop = capture_selects(engine)
+    try:
+        fn()
+    finally:
+        stop()
+    with engine.connect() as conn:
+        return [(statement, explain(conn, statement, parameters)) for statement, parameters in statements]
@@ -0,0 +1,195 @@
+import base64
+import json
+
+from sqlalchemy import select, func, tuple_, or_, case, union
+
+from data.manager.fts import fts_table, trigram_table, has_fts, has_trigram, match_expression
+
+
+def escape_like(value: str) -> str:
+    """Escape the LIKE wildcards so user input is matched literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _name_like(model, q: str):
+    """LIKE substring match of q on model.name, with the wildcards of q matched literally"""
+    return model.name.like(f"%{escape_like(q)}%", escape="\\")
+
+
+def _prefix_ids(model, q: str):
+    """Ids whose indexed words start with the words of q, accent and case insensitive; None when q has no words"""
+    expression = match_expression(q)
+    if not expression:
+        return None
+    fts = fts_table(model.__tablename__)
+    return select(fts.c.rowid).where(fts.c[fts.name].match(expression))
+
+
+def _substring_ids(model, q: str):
+    """Ids whose indexed columns contain q anywhere (inside words, symbols included), case insensitive"""
+    trigram = trigram_table(model.__tablename__)
+    escaped = escape_like(q)
+    columns = [c for c in trigram.c if c.key != "rowid"]
+    if escaped == q:
+        condition = or_(*[c.like(f"%{q}%") for c in columns])
+    else:  # an ESCAPE clause keeps LIKE off the trigram index, the index is scanned instead of the table
+        condition = or_(*[c.like(f"%{escaped}%", escape="\\") for c in columns])
+    return select(trigram.c.rowid).where(condition)
+
+
+def _search_ids(model, q: str, indexes):
+    """Ids of the rows filter_by_name matches on a table with shadow indexes, None without the trigram index"""
+    if not has_trigram(model, indexes):
+        return None
+    prefix = _prefix_ids(model, q)
+    substring = _substring_ids(model, q)
+    return substring if prefix is None else union(prefix, substring)
+
+
+def filter_by_name(query, model, q: str = None, indexes=()):
+    """
+    Apply a name search.
+    Tables whose FTS5 shadow indexes (data.manager.fts) are in `indexes`, the search_indexes() of the
+    session, match rows whose words start with the words of q, accent and case insensitive ("mexico"
+    finds "México"), plus rows containing q anywhere ("xic" finds "México", "_" finds "a_b%c") like
+    the substring filter of the selects.
+    Other tables fall back to a LIKE substring match on model.name.
+    Works for both ORM queries and Core select() statements.
+    """
+    if not q:
+        return query
+    if not has_fts(model, indexes):
+        return query.filter(_name_like(model, q))
+    ids = _search_ids(model, q, indexes)
+    if ids is not None:
+        return query.filter(model.id.in_(ids))
+    prefix = _prefix_ids(model, q)
+    if prefix is None:
+        return query.filter(_name_like(model, q))
+    return query.filter(or_(model.id.in_(prefix), _name_like(model, q)))
+
+
+def search_rank(model, q: str):
+    """Sort key of a search: 0 for rows whose words start with the words of q, 1 for the other matches"""
+    return case((model.id.in_(_prefix_ids(model, q)), 0), else_=1)
+
+
+def _ranked(model, q: str = None, indexes=()) -> bool:
+    return bool(q) and has_fts(model, indexes) and match_expression(q) is not None
+
+
+def order_by_rank(query, model, q: str = None, indexes=()):
+    """Word prefix matches first, then by name, when filter_by_name searched the shadow indexes, unchanged otherwise"""
+    if _ranked(model, q, indexes):
+        return query.order_by(search_rank(model, q), model.name)
+    return query
+
+
+def count_by_name(model, q: str = None, indexes=()):
+    """
+    COUNT statement of the rows filter_by_name would return.
+    With the shadow indexes the matches are counted in them directly, without reading the table.
+    """
+    ids = _search_ids(model, q, indexes) if q and has_fts(model, indexes) else None
+    if ids is not None:
+        return select(func.count()).select_from(ids.subquery())
+    return filter_by_name(select(func.count(model.id)), model, q, indexes)
+
+
+def name_page(model, q: str = None, cursor: str = None, skip: int = 0, limit: int = 10, indexes=()):
+    """
+    Statement for one keyset page of a name search, selecting (model, *sort key) and limit + 1 rows.
+    Searches on the shadow indexes are keyed by (search_rank, name, id), everything else by id.
+    Every part of the key comes from the row itself, so writes to other rows between two pages
+    never move the cursor (a bm25 score would change with every insert or delete).
+    skip is only honoured without a cursor, for clients that still page by offset.
+    """
+    order = [model.id]
+    if _ranked(model, q, indexes):
+        order = [search_rank(model, q), model.name, model.id]
+    query = keyset(filter_by_name(select(model, *order), model, q, indexes), order, cursor)
+    if skip and not cursor:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+
+def projection(model, fields=None, allowed=None):
+    """
+    Table columns for the field names requested, in that order; all `allowed` names (default
+    every column) when fields is empty. Unknown or disallowed names raise ValueError.
+    """
+    table = model.__table__
+    allowed = allowed or table.c.keys()
+    fields = fields or allowed
+    for name in fields:
+        if name not in allowed:
+            raise ValueError(f"Atributo '{name}' no existe en {model.__name__}")
+    return [table.c[name] for name in fields]
+
+
+def rows_of(result, as_tuples: bool = False):
+    """
+    Rows of a Core select of plain columns as dicts, or as tuples in column order.
+    Run it on the session's connection so nothing goes through the ORM: no instances, identity map or state.
+    """
+    if as_tuples:
+        return [tuple(row) for row in result]
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def paginate(query, skip: int = 0, limit: int = None):
+    """Apply OFFSET/LIMIT to a query when given"""
+    if skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def encode_cursor(values) -> str:
+    """Opaque, URL-safe cursor holding the sort key of the last row of a page"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Sort key stored in a cursor, ValueError when it was not produced for a key of `size` columns"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(
+            isinstance(v, (str, int, float)) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset(query, order_columns, cursor: str = None, descending: bool = False):
+    """
+    Keyset pagination: rows strictly after the cursor in (order_columns) order.
+    The last column must be unique (the id) so ties on the first ones are never skipped or repeated,
+    and with an index on the first column each page is an index seek whatever its depth.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(order_columns))
+        key = tuple_(*order_columns) if len(order_columns) > 1 else order_columns[0]
+        bound = tuple_(*values) if len(values) > 1 else values[0]
+        query = query.filter(key < bound if descending else key > bound)
+    return query.order_by(*[c.desc() if descending else c for c in order_columns])
+
+
+def page_with_cursor(rows, limit: int, sort_key):
+    """
+    Split the limit + 1 rows of a keyset query into the page and the cursor of the next one
+    (None on the last page). sort_key(row) returns the values of the order columns.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_key(rows[-1]))
+
+
+def is_unique_violation(error) -> bool:
+    """True when an IntegrityError was raised by a UNIQUE constraint"""
+    return "UNIQUE constraint failed" in str(getattr(error, "orig", error))
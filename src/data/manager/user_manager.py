@@ -1,38 +1,87 @@
 from data.models.user import User
-from controls.encrypt import verify_password
+from controls.encrypt import hash_password, hash_many, verify_and_update
 from data.manager.db_manager import DatabaseManager
+from data.manager.query_utils import is_unique_violation, projection, rows_of
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+from data.manager.cache import cached, invalidates
+from data.manager.changes import publishes, CREATED, UPDATED, DELETED
+from data.manager.bulk import bulk_write, BULK_CHUNK_SIZE
+
+# Columnas que se pueden listar, el password queda fuera
+USER_FIELDS = ("name", "email", "id")
 
 class UserManager:
+    cache_name = "users"
+
     def __init__(self):
         self.dbm = DatabaseManager()
 
-    # Crear usuario
+    # Crear usuario (la restricción UNIQUE de email detecta duplicados)
+    @publishes(CREATED)
+    @invalidates()
     def create_user(self, name: str, email: str, password: str):
         db = self.dbm.get_session()
         try:
-            if db.query(User).filter(User.email == email).first():
-                raise ValueError("Email ya registrado")
-
-            user = User(name=name, email=email, password=password)
-            db.add(user)
+            user = db.scalars(
+                insert(User).values(name=name, email=email, password=hash_password(password)).returning(User)
+            ).one()
             db.commit()
-            db.refresh(user)
             return user
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
         finally:
             self.dbm.close_session(db)
 
-    # Autenticar usuario
+    # Crear usuarios en bloque (omite los emails ya registrados), los passwords se hashean en paralelo
+    @invalidates()
+    def bulk_create(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        rows = [{c: item.get(c) for c in ("name", "email", "password")} for item in items]
+        for row, hashed in zip(rows, hash_many(row["password"] for row in rows)):
+            row["password"] = hashed
+        return bulk_write(self.dbm, User, rows, ["email"], chunk_size=chunk_size)
+
+    # Crear o actualizar usuarios en bloque por email
+    @invalidates()
+    def bulk_upsert(self, items, chunk_size: int = BULK_CHUNK_SIZE):
+        rows = [{c: item.get(c) for c in ("name", "email", "password")} for item in items]
+        for row, hashed in zip(rows, hash_many(row["password"] for row in rows)):
+            row["password"] = hashed
+        return bulk_write(self.dbm, User, rows, ["email"], ["name", "password"], chunk_size)
+
+    # Autenticar usuario; si el hash guardado usa otro costo, o la fila guarda la contraseña en texto plano
+    # (usuarios anteriores al hash), se reemplaza por un hash con BCRYPT_ROUNDS.
+    # Bloquea mientras corre bcrypt: los handlers async (POST /login) usan AsyncUserManager.login_user
     def login_user(self, email: str, password: str):
         db = self.dbm.get_session()
         try:
             user = db.query(User).filter(User.email == email).first()
-            if not user or not verify_password(password, user.password_hash):
-                return None
-            return user
+        finally:
+            self.dbm.close_session(db)
+        if not user:
+            return None
+        valid, new_hash = verify_and_update(password, user.password)
+        if not valid:
+            return None
+        if new_hash:
+            self._store_password_hash(user.id, new_hash)
+            user.password = new_hash
+        return user
+
+    @invalidates(id_arg="user_id")
+    def _store_password_hash(self, user_id: int, password_hash: str):
+        db = self.dbm.get_session()
+        try:
+            db.execute(update(User).where(User.id == user_id).values(password=password_hash))
+            db.commit()
         finally:
             self.dbm.close_session(db)
 
     # Leer por ID
+    @cached(id_arg="user_id")
     def get_user_by_id(self, user_id: int):
         db = self.dbm.get_session()
         try:
@@ -49,6 +98,8 @@ class UserManager:
             self.dbm.close_session(db)
 
     # Eliminar usuario
+    @publishes(DELETED, id_arg="user_id")
+    @invalidates(id_arg="user_id")
     def delete_user(self, user_id: int):
         db = self.dbm.get_session()
         try:
@@ -61,39 +112,38 @@ class UserManager:
         finally:
             self.dbm.close_session(db)
 
-    # Leer todos los usuarios
-    def get_all_users(self):
+    # Leer todos los usuarios (solo las columnas pedidas, nunca el password)
+    @cached()
+    def get_all_users(self, fields=None, as_tuples=False):
         db = self.dbm.get_session()
         try:
-            data = db.query(User).all()
-            results = [
-                {
-                    "name": user.name,
-                    "email": user.email,
-                    "id": user.id,
-                }
-                for user in data
-            ]
-            return results
+            query = select(*projection(User, fields, USER_FIELDS)).order_by(User.__table__.c.id)
+            return rows_of(db.connection().execute(query), as_tuples)
         finally:
             self.dbm.close_session(db)
 
     # Actualizar usuario
+    @publishes(UPDATED)
+    @invalidates(id_arg="user_id")
     def update_user(self, user_id: int, name: str, email: str, password: str):
         db = self.dbm.get_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = db.scalars(
+                update(User)
+                .where(User.id == user_id)
+                .values(name=name, email=email, password=hash_password(password))
+                .returning(User)
+            ).first()
             if not user:
                 raise ValueError("Usuario no encontrado")
 
-            user.name = name
-            user.email = email
-            user.password = password
-
             db.commit()
-            db.refresh(user)
-
             return user
+        except IntegrityError as e:
+            db.rollback()
+            if is_unique_violation(e):
+                raise ValueError("Email ya registrado")
+            raise e
         finally:
             self.dbm.close_session(db)
 
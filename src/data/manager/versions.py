@@ -0,0 +1,87 @@
+import hashlib
+from email.utils import formatdate
+
+from sqlalchemy import Table, event, inspect, select, column, table
+from sqlalchemy.exc import OperationalError
+
+from data.manager.db_base import Base
+
+# One row per table: a counter bumped by triggers on every written row, and when it last moved.
+# Kept out of Base.metadata so reset_db() does not restart the counters, and the row of a table is
+# bumped again whenever the table is (re)created: an emptied table must never match an old ETag
+VERSIONS_TABLE = "table_versions"
+
+_versions = table(VERSIONS_TABLE, column("name"), column("version"), column("modified_at"))
+_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def versions_ddl(table_name: str):
+    """
+    Version row of a table, bumped when it already exists, plus the triggers that bump it on
+    insert, update and delete
+    """
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} ("
+        f"name TEXT PRIMARY KEY, version INTEGER NOT NULL, modified_at INTEGER NOT NULL)",
+        f"INSERT INTO {VERSIONS_TABLE} (name, version, modified_at) VALUES ('{table_name}', 1, {_NOW}) "
+        f"ON CONFLICT(name) DO UPDATE SET version = version + 1, modified_at = {_NOW}",
+    ]
+    for suffix, operation in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS {table_name}_version_{suffix} AFTER {operation} ON {table_name} BEGIN "
+            f"UPDATE {VERSIONS_TABLE} SET version = version + 1, modified_at = {_NOW} "
+            f"WHERE name = '{table_name}'; END"
+        )
+    return statements
+
+
+def create_versioning(conn, table_name: str):
+    for statement in versions_ddl(table_name):
+        conn.exec_driver_sql(statement)
+
+
+def ensure_versions(engine):
+    """Add the version triggers to existing model tables that lack them, a no-op once they exist"""
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            existing = set(inspect(conn).get_table_names())
+            triggers = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+            for table_name in Base.metadata.tables:
+                if table_name in existing and f"{table_name}_version_ai" not in triggers:
+                    create_versioning(conn, table_name)
+    except OperationalError as e:
+        print(f"Error creating table versions: {e}")
+
+
+@event.listens_for(Table, "after_create")
+def _create_versioning_after_table(target, connection, **kw):
+    if connection.dialect.name == "sqlite" and target.name in Base.metadata.tables:
+        create_versioning(connection, target.name)
+
+
+def read_versions(conn, tables):
+    """{table: (version, modified_at)} of the given tables, None when one of them is not versioned"""
+    try:
+        rows = conn.execute(select(_versions).where(_versions.c.name.in_(tables))).all()
+    except OperationalError:
+        return None  # database without the versions table
+    found = {name: (version, modified_at) for name, version, modified_at in rows}
+    return found if len(found) == len(set(tables)) else None
+
+
+def read_engine_versions(engine, tables):
+    with engine.connect() as conn:
+        return read_versions(conn, tables)
+
+
+def etag(versions) -> str:
+    """Weak ETag of a response built from tables at these versions"""
+    token = ",".join(f"{name}:{versions[name][0]}" for name in sorted(versions))
+    return 'W/"' + hashlib.sha1(token.encode()).hexdigest()[:20] + '"'
+
+
+def last_modified(versions) -> str:
+    """HTTP date of the latest write to any of the tables"""
+    return formatdate(max(modified_at for _, modified_at in versions.values()), usegmt=True)
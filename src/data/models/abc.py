@@ -1,7 +1,8 @@
 from sqlalchemy import Column, Integer, String, Boolean
 from data.manager.db_base import Base
+from controls.serializer import SerializerMixin
 
-class ABC(Base):
+class ABC(Base, SerializerMixin):
     __tablename__ = "abc"  # Nombre de la tabla
 
     id = Column(Integer, primary_key=True, index=True)
@@ -1,9 +1,10 @@
 from sqlalchemy import Column, Integer, String, Boolean
 from data.manager.db_base import Base
+from controls.serializer import SerializerMixin
 from sqlalchemy.orm import relationship
 from data.models.person_group import PersonGroup
 
-class Person(Base):
+class Person(Base, SerializerMixin):
     __tablename__ = "persons"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, Table
 from sqlalchemy.orm import relationship
 from data.manager.db_base import Base
+from controls.serializer import SerializerMixin
 
 #---------------------------------------
 # Intermediate tables
@@ -19,7 +20,9 @@ person_group_communities = Table(
     Column("community_id", ForeignKey("communities.id", ondelete="CASCADE"), primary_key=True),
 )
 
-class PersonGroup(Base):
+# Relationships use the default lazy loading, queries pick a loader
+# profile from data.manager.person_group_manager.LOADER_PROFILES
+class PersonGroup(Base, SerializerMixin):
     __tablename__ = "person_groups"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -28,8 +31,7 @@ class PersonGroup(Base):
     country_id = Column(Integer, ForeignKey("countries.id"))
     country = relationship(
         "Country",
-        back_populates="person_groups",
-        lazy="joined"
+        back_populates="person_groups"
     )
 
     people = relationship(
@@ -37,8 +39,7 @@ class PersonGroup(Base):
         secondary=person_group_people,
         back_populates="person_groups",
         cascade="all",
-        passive_deletes=False,
-        lazy="joined"
+        passive_deletes=False
     )
 
     communities = relationship(
@@ -46,6 +47,5 @@ class PersonGroup(Base):
         secondary=person_group_communities,
         back_populates="person_groups",
         cascade="all",
-        passive_deletes=False,
-        lazy="joined"
+        passive_deletes=False
     )
\ No newline at end of file
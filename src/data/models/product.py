@@ -1,13 +1,14 @@
 from sqlalchemy import Column, Integer, String, Float
 # Base declarative
 from data.manager.db_base import Base
+from controls.serializer import SerializerMixin
 
 
-class Product(Base):
+class Product(Base, SerializerMixin):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True)
     code = Column(String, unique=True, nullable=False)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)  # get_products_paginated(order_by_attr="name")
     price = Column(Float, nullable=False)
     image = Column(String, nullable=False)
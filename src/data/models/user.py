@@ -3,9 +3,11 @@ from sqlalchemy import Column, Integer, String
 
 # Base declarative
 from data.manager.db_base import Base
+from controls.serializer import SerializerMixin
 
-class User(Base):
+class User(Base, SerializerMixin):
     __tablename__ = "users"
+    __serializer_exclude__ = ("password",)
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -1,14 +1,37 @@
-from fastapi import FastAPI, Query, HTTPException, Path
+from fastapi import FastAPI, Query, HTTPException, Path, Request, Response
 from data.manager.country_manager import CountryManager
 from data.manager.person_manager import PersonManager
 from data.manager.community_manager import CommunityManager
 from data.manager.person_group_manager import PersonGroupManager
 from data.manager.abc_manager import ABCManager
-from scripts.crud_router import create_crud_router
+from data.manager.async_managers import (
+    AsyncCountryManager, AsyncPersonManager, AsyncCommunityManager, AsyncABCManager, AsyncUserManager
+)
+from data.manager.cache import cache_stats
+from data.manager import instrumentation
+from data.manager.versions import read_engine_versions, ensure_versions
+from data.manager.fts import ensure_fts
+from scripts.crud_router import create_crud_router, validators, not_modified, parse_fields, shape_results, RESULT_FORMATS
+from scripts.response_cache import ResponseCache, RESPONSE_CACHE_SIZE
+from scripts.responses import FastJSONResponse, CompressionMiddleware
+from scripts.batch_router import create_batch_router
 from pydantic import BaseModel
 from typing import List, Optional
 
-app = FastAPI()
+# Responses are encoded by orjson when installed and compressed (brotli or gzip) past COMPRESSION_MIN_SIZE bytes
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware)
+
+if instrumentation.ENABLED:
+    @app.middleware("http")
+    async def sql_per_endpoint(request: Request, call_next):
+        """Group the SQL of each request under its route, e.g. 'GET /countries/{item_id}'"""
+        with instrumentation.operation(f"{request.method} {request.url.path}") as scope:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            if route is not None:
+                scope.name = f"{request.method} {route.path}"
+            return response
 
 country_manager = CountryManager()
 person_manager = PersonManager()
@@ -16,13 +39,17 @@ community_manager = CommunityManager()
 person_group_manager = PersonGroupManager()
 abc_manager = ABCManager()
 
+# Encoded list responses, keyed by path and normalized query and dropped once their tables are written
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE) if RESPONSE_CACHE_SIZE else None
+
 # -----------------------------
 # Generic endpoints
+# Served by the async managers so select searches are not bound to the threadpool size
 # -----------------------------
-app.include_router(create_crud_router("countries", country_manager))
-app.include_router(create_crud_router("persons", person_manager))
-app.include_router(create_crud_router("communities", community_manager))
-app.include_router(create_crud_router("abc", abc_manager))
+app.include_router(create_crud_router("countries", AsyncCountryManager(), response_cache))
+app.include_router(create_crud_router("persons", AsyncPersonManager(), response_cache))
+app.include_router(create_crud_router("communities", AsyncCommunityManager(), response_cache))
+app.include_router(create_crud_router("abc", AsyncABCManager(), response_cache))
 
 # -----------------------------
 # PersonGroup endpoints
@@ -33,38 +60,64 @@ class PersonGroupSchema(BaseModel):
     people_ids: Optional[List[int]] = []
     community_ids: Optional[List[int]] = []
 
+def serialize_group(group, profile: str = "detail"):
+    """Serialize a PersonGroup loaded with the given loader profile"""
+    data = {"id": group.id, "nombre": group.name}
+    if profile == "ids":
+        data["Persons"] = [{"id": p.id} for p in group.people]
+        data["Communities"] = [{"id": c.id} for c in group.communities]
+        data["Country"] = {"id": group.country_id} if group.country_id is not None else None
+        return data
+    if profile == "detail":
+        data["Persons"] = [{"id": p.id, "name": p.name} for p in group.people]
+        data["Communities"] = [{"id": c.id, "name": c.name} for c in group.communities]
+    data["Country"] = {"id": group.country.id, "name": group.country.name} if group.country else None
+    return data
+
+# Every table a group listing is built from, a write to any of them changes its ETag
+GROUP_TABLES = ("person_groups", "person_group_people", "person_group_communities", "persons", "communities", "countries")
+# Fields of a group listing, in the order of format=compact rows
+GROUP_FIELDS = ("id", "nombre", "Persons", "PersonsTotal", "Communities", "CommunitiesTotal", "Country")
+
 @app.get("/persons_groups")
-def get_person_groups(skip: int = Query(0, ge=0), limit: int = Query(5, ge=1), q: Optional[str] = Query(None, alias="q")):
-    groups = person_group_manager.get_all(eager=True)
-    if q:
-        q_lower = q.lower()
-        groups = [g for g in groups if q_lower in g.name.lower()]
-    total = len(groups)
-    paginated = groups[skip:skip + limit]
-    results = {}
-    for g in paginated:
-        results[str(g.id)] = {
-            "id": g.id,
-            "nombre": g.name,
-            "Persons": [{"id": p.id, "name": p.name} for p in g.people],
-            "Communities": [{"id": c.id, "name": c.name} for c in g.communities],
-            "Country": {"id": g.country.id, "name": g.country.name} if g.country else None
-        }
+def get_person_groups(request: Request, skip: int = Query(0, ge=0), limit: int = Query(5, ge=1),
+                      q: Optional[str] = Query(None, alias="q"), members_limit: int = Query(50, ge=0, le=500),
+                      fields: Optional[str] = Query(None),
+                      payload_format: str = Query("map", alias="format", pattern=RESULT_FORMATS)):
+    # Groups are paged in SQL and each member list is capped at members_limit.
+    # Member lists left out of `fields` are not queried
+    selected = parse_fields(fields, GROUP_FIELDS)
+    headers = validators(read_engine_versions(person_group_manager.dbm.engine, GROUP_TABLES))
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    if response_cache is not None:
+        cached = response_cache.lookup(request, headers)
+        if cached is not None:
+            return cached
+    members = [name for name, keys in (("people", ("Persons", "PersonsTotal")),
+                                       ("communities", ("Communities", "CommunitiesTotal")))
+               if any(key in selected for key in keys)]
+    groups = person_group_manager.get_page(q=q, skip=skip, limit=limit, members_limit=members_limit, members=members)
+    total = person_group_manager.count(q=q)
+    rows = [
+        (g["id"], g["name"], g.get("people"), g.get("people_total"), g.get("communities"),
+         g.get("communities_total"), g["country"])
+        for g in groups
+    ]
     more = skip + limit < total
-    return {"results": results, "pagination": {"more": more, "skip": skip, "limit": limit, "total": total}}
+    payload = {**shape_results(rows, GROUP_FIELDS, selected, payload_format),
+               "pagination": {"more": more, "skip": skip, "limit": limit, "total": total}}
+    if response_cache is not None:
+        return response_cache.respond(request, headers, payload)
+    return FastJSONResponse(payload, headers=headers)
 
 @app.get("/persons_groups/{group_id}")
-def get_person_group(group_id: int = Path(..., ge=1)):
-    group = person_group_manager.get_by_id(group_id, eager=True)
+def get_person_group(group_id: int = Path(..., ge=1), profile: str = Query("detail", pattern="^(summary|detail|ids)$")):
+    group = person_group_manager.get_by_id(group_id, profile=profile)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
-    return {
-        "id": group.id,
-        "nombre": group.name,
-        "Persons": [{"id": p.id, "name": p.name} for p in group.people],
-        "Communities": [{"id": c.id, "name": c.name} for c in group.communities],
-        "Country": {"id": group.country.id, "name": group.country.name} if group.country else None
-    }
+    # Only JSON types, returned as a response so it is encoded once
+    return FastJSONResponse(serialize_group(group, profile))
 
 @app.post("/persons_groups")
 def add_person_group(item: PersonGroupSchema):
@@ -75,13 +128,7 @@ def add_person_group(item: PersonGroupSchema):
             people_ids=item.people_ids,
             community_ids=item.community_ids
         )
-        return {
-            "id": group.id,
-            "nombre": group.name,
-            "Persons": [{"id": p.id, "name": p.name} for p in group.people],
-            "Communities": [{"id": c.id, "name": c.name} for c in group.communities],
-            "Country": {"id": group.country.id, "name": group.country.name} if group.country else None
-        }
+        return serialize_group(group)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -96,14 +143,28 @@ def update_person_group(group_id: int, item: PersonGroupSchema):
             community_ids=item.community_ids
         )
 
-        return {
-            "id": group.id,
-            "nombre": group.name,
-            "Persons": [{"id": p.id, "name": p.name} for p in group.people],
-            "Communities": [{"id": c.id, "name": c.name} for c in group.communities],
-            "Country": {"id": group.country.id, "name": group.country.name} if group.country else None
-        }
+        return serialize_group(group)
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+class PersonGroupMembersSchema(BaseModel):
+    people_ids: Optional[List[int]] = []
+    community_ids: Optional[List[int]] = []
 
+@app.post("/persons_groups/{group_id}/members")
+def add_person_group_members(group_id: int, item: PersonGroupMembersSchema):
+    try:
+        added = person_group_manager.add_members(group_id, item.people_ids, item.community_ids)
+        return {"added": added}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/persons_groups/{group_id}/members")
+def remove_person_group_members(group_id: int, item: PersonGroupMembersSchema):
+    try:
+        removed = person_group_manager.remove_members(group_id, item.people_ids, item.community_ids)
+        return {"removed": removed}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -115,6 +176,53 @@ def delete_person_group(group_id: int):
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+# -----------------------------
+# Batch endpoint
+# Several writes of a UI action in one request, one transaction and one commit
+# -----------------------------
+app.include_router(create_batch_router(
+    {
+        "countries": country_manager,
+        "persons": person_manager,
+        "communities": community_manager,
+        "abc": abc_manager,
+        "persons_groups": person_group_manager,
+    },
+    serializers={"persons_groups": serialize_group},
+))
+
+# -----------------------------
+# Login endpoint
+# bcrypt runs on the hashing pool (AsyncUserManager.login_user), the event loop keeps serving other requests
+# -----------------------------
+user_manager = AsyncUserManager()
+
+class LoginSchema(BaseModel):
+    email: str
+    password: str
+
+@app.post("/login")
+async def login(item: LoginSchema):
+    user = await user_manager.login_user(item.email, item.password)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    return {"id": user.id, "name": user.name, "email": user.email}
+
+@app.get("/metrics/cache")
+def get_cache_metrics():
+    """Hit/miss counters of the entity caches enabled through ENTITY_CACHE"""
+    return cache_stats()
+
+@app.get("/metrics/response_cache")
+def get_response_cache_metrics():
+    """Hit ratio of the list response cache, overall and per path (RESPONSE_CACHE_SIZE=0 turns it off)"""
+    return response_cache.stats() if response_cache is not None else {}
+
+@app.get("/metrics/queries")
+def get_query_metrics():
+    """Statements, SQL time, slowest statements and N+1 candidates per endpoint or manager method (SQL_INSTRUMENTATION=1)"""
+    return instrumentation.query_report()
+
 # -----------------------------
 # Insert presets
 # Example of use:
@@ -129,37 +237,22 @@ def init_countries():
         "Honduras", "México", "Nicaragua", "Panamá", "Paraguay",
         "Perú", "Puerto Rico", "Uruguay", "Venezuela"
     ]
-    inserted = []
-    for name in latin_countries:
-        try:
-            country = country_manager.create(name=name)
-            inserted.append({"id": country.id, "name": country.name})
-        except ValueError:
-            pass
+    # One INSERT ... ON CONFLICT DO NOTHING, existing names are skipped
+    inserted = [{"id": row["id"], "name": row["name"]} for row in country_manager.bulk_create(latin_countries)]
     return {"inserted": inserted, "message": "Paises latinoamericanos insertados"}
 
 @app.post("/persons/init")
 def init_persons():
     initial_persons = [f"Persona {i}" for i in range(1, 11)]
-    inserted = []
-    for name in initial_persons:
-        try:
-            person = person_manager.create(name=name)
-            inserted.append({"id": person.id, "name": person.name})
-        except ValueError:
-            pass
+    # One INSERT ... ON CONFLICT DO NOTHING, existing names are skipped
+    inserted = [{"id": row["id"], "name": row["name"]} for row in person_manager.bulk_create(initial_persons)]
     return {"inserted": inserted, "message": "Personas iniciales insertadas"}
 
 @app.post("/communities/init")
 def init_communities():
     initial_communities = [f"Community {i}" for i in range(1, 11)]
-    inserted = []
-    for name in initial_communities:
-        try:
-            community = community_manager.create(name=name)
-            inserted.append({"id": community.id, "name": community.name})
-        except ValueError:
-            pass
+    # One INSERT ... ON CONFLICT DO NOTHING, existing names are skipped
+    inserted = [{"id": row["id"], "name": row["name"]} for row in community_manager.bulk_create(initial_communities)]
     return {"inserted": inserted, "message": "Communities iniciales insertadas"}
 
 # -----------------------------
@@ -167,13 +260,16 @@ def init_communities():
 # -----------------------------
 def ensure_initial_data():
     """Verifica si las tablas country, person o community están vacías y las inicializa si es necesario."""
-    if not country_manager.get_all():
+    if not country_manager.exists():
         init_countries()
-    if not person_manager.get_all():
+    if not person_manager.exists():
         init_persons()
-    if not community_manager.get_all():
+    if not community_manager.exists():
         init_communities()
 
 @app.on_event("startup")
 def startup_event():
+    # A database created before the search indexes and version triggers existed gets them once here
+    ensure_fts(country_manager.dbm.engine)
+    ensure_versions(country_manager.dbm.engine)
     ensure_initial_data()
\ No newline at end of file
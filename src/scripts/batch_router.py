@@ -0,0 +1,79 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import SQLAlchemyError
+
+from data.manager.db_manager import transaction_scope
+from scripts.responses import FastJSONResponse
+
+# Operations a single batch may carry
+BATCH_MAX_OPERATIONS = 100
+
+
+class BatchOperation(BaseModel):
+    entity: str  # a registered entity, e.g. "countries" or "persons_groups"
+    action: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # row to update or delete
+    data: dict = {}  # keyword arguments of the manager's create() or update()
+
+
+class BatchSchema(BaseModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+    # All or nothing: the first failed operation rolls back the batch and skips the rest.
+    # Otherwise a failed operation only undoes itself and the others are committed
+    atomic: bool = True
+
+
+class _BatchAborted(Exception):
+    pass
+
+
+def create_batch_router(managers: dict, serializers: dict = None):
+    """
+    POST /batch: CRUD operations over the registered entities ({entity: sync manager}) run in
+    one transaction with one commit, each manager call on a savepoint of it (see transaction_scope).
+    Returns the result of every operation in order: {"index", "ok", "result"} or {"index", "ok", "error"}.
+    Results are model.to_dict(), or serializers[entity](result) when given.
+    A rolled back atomic batch answers 400 with the same body and "committed": false.
+    """
+    router = APIRouter()
+    serializers = serializers or {}
+
+    def run(index: int, operation: BatchOperation):
+        manager = managers.get(operation.entity)
+        if manager is None:
+            return {"index": index, "ok": False, "error": f"Unknown entity '{operation.entity}'"}
+        if operation.action != "create" and operation.id is None:
+            return {"index": index, "ok": False, "error": f"{operation.action} needs an id"}
+        try:
+            if operation.action == "create":
+                result = manager.create(**operation.data)
+            elif operation.action == "update":
+                result = manager.update(operation.id, **operation.data)
+            else:
+                manager.delete(operation.id)
+                return {"index": index, "ok": True, "result": None}
+        except (ValueError, TypeError, SQLAlchemyError) as e:
+            return {"index": index, "ok": False, "error": str(e)}
+        serialize = serializers.get(operation.entity)
+        return {"index": index, "ok": True, "result": serialize(result) if serialize else result.to_dict()}
+
+    @router.post("/batch")
+    def run_batch(batch: BatchSchema):
+        results = []
+        try:
+            with transaction_scope():
+                for index, operation in enumerate(batch.operations):
+                    results.append(run(index, operation))
+                    if batch.atomic and not results[-1]["ok"]:
+                        raise _BatchAborted()
+        except _BatchAborted:
+            results += [
+                {"index": index, "ok": False, "error": "Skipped, the batch was rolled back"}
+                for index in range(len(results), len(batch.operations))
+            ]
+            return FastJSONResponse({"committed": False, "results": results}, status_code=400)
+        return FastJSONResponse({"committed": True, "results": results})
+
+    return router
@@ -0,0 +1,891 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+
+from sqlalchemy import text, insert, select, event
+from sqlalchemy.orm import joinedload, lazyload
+
+from data.manager.db_base import Base
+from data.manager.db_manager import DatabaseManager, SQLITE_PROFILES, dispose_engines, thread_scope
+from data.models.product import Product
+from data.models.abc import ABC
+from data.manager.abc_manager import ABCManager
+from data.models.country import Country
+from data.models.person import Person
+from data.models.community import Community
+from data.models.person_group import PersonGroup, person_group_people, person_group_communities
+from data.manager.person_group_manager import PersonGroupManager, LOADER_PROFILES, loader_options
+from data.manager.product_manager import ProductManager
+from data.manager.country_manager import CountryManager
+from data.models.customer import Customer
+from data.manager.query_utils import encode_cursor
+from data.manager.cache import enable_cache, disable_cache
+from data.manager import instrumentation
+
+# Managers built by every session: Product, Customer, User, Country,
+# Person, Community, PersonGroup and ABC
+MANAGERS_PER_SESSION = 8
+
+
+def temp_db_url(name: str = "bench.db"):
+    """Return a URL for a throwaway SQLite file"""
+    path = os.path.join(tempfile.mkdtemp(prefix="fletbatteries_"), name)
+    return f"sqlite:///{path}"
+
+
+def _open_connections(engines):
+    return sum(e.pool.checkedin() + e.pool.checkedout() for e in engines)
+
+
+def _simulate_sessions(db_url: str, sessions: int, shared: bool):
+    """Build the managers of N sessions and run one query on each"""
+    managers = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(sessions):
+        for _ in range(MANAGERS_PER_SESSION):
+            dbm = DatabaseManager(db_url, shared=shared)
+            db = dbm.get_session()
+            db.execute(text("SELECT 1"))
+            dbm.close_session(db)
+            managers.append(dbm)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    engines = {id(m.engine): m.engine for m in managers}.values()
+    result = {
+        "engines": len(engines),
+        "connections": _open_connections(engines),
+        "peak_kb": peak / 1024,
+        "ms": elapsed * 1000,
+    }
+    for m in managers:
+        m.dispose()
+    return result
+
+
+def bench_engines(sessions: int = 20):
+    """Compare private engines per manager against the shared registry"""
+    db_url = temp_db_url()
+    print(f"{sessions} sessions x {MANAGERS_PER_SESSION} managers")
+    for label, shared in (("private", False), ("shared", True)):
+        r = _simulate_sessions(db_url, sessions, shared)
+        print(
+            f"  {label:<8} engines={r['engines']:<4} connections={r['connections']:<4} "
+            f"memory/session={r['peak_kb'] / sessions:8.1f} KB  time={r['ms']:8.1f} ms"
+        )
+    dispose_engines()
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_profiles(rows: int = 2000):
+    """Write-heavy (one commit per row) and read-heavy (point lookups) per profile"""
+    print(f"{rows} single-row commits, then {rows * 5} point lookups")
+    for profile in SQLITE_PROFILES:
+        dbm = DatabaseManager(temp_db_url(f"{profile}.db"), shared=False, profile=profile)
+        Base.metadata.create_all(bind=dbm.engine, tables=[Product.__table__])
+
+        def write():
+            for i in range(rows):
+                with dbm.engine.begin() as conn:
+                    conn.execute(insert(Product).values(code=f"P{i}", name=f"Product {i}", price=i, image=""))
+
+        def read():
+            with dbm.engine.connect() as conn:
+                for _ in range(rows * 5):
+                    conn.execute(select(Product.name).where(Product.id == random.randint(1, rows))).first()
+
+        write_ms = _timed(write)
+        read_ms = _timed(read)
+        print(
+            f"  {profile:<12} write={write_ms:9.1f} ms ({rows / write_ms * 1000:8.0f} rows/s)  "
+            f"read={read_ms:9.1f} ms ({rows * 5 / read_ms * 1000:8.0f} lookups/s)"
+        )
+        dbm.dispose()
+
+
+def _percentiles(samples):
+    """Return (p50, p99) in milliseconds"""
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def seed_named(dbm: DatabaseManager, model, rows: int):
+    """Create the model's table and fill it with `rows` named records"""
+    Base.metadata.create_all(bind=dbm.engine, tables=[model.__table__])
+    with dbm.engine.begin() as conn:
+        conn.execute(insert(model), [{"name": f"Item {i:06d}", "disabled": False} for i in range(rows)])
+
+
+def bench_search(rows: int = 100_000, requests: int = 50):
+    """Latency of one select search request: Python-side filtering vs SQL"""
+    manager = ABCManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_named(manager.dbm, ABC, rows)
+    terms = [f"{random.randint(0, 9999):04d}" for _ in range(requests)]
+
+    def before(q, skip=0, limit=10):
+        items = [i for i in manager.get_all() if q.lower() in i.name.lower()]
+        return len(items), items[skip:skip + limit]
+
+    def after(q, skip=0, limit=10):
+        return manager.count(q=q), manager.get_all(q=q, skip=skip, limit=limit)
+
+    print(f"{rows} rows, {requests} searches of limit=10")
+    for label, fn in (("python", before), ("sql", after)):
+        samples = [_timed(lambda: fn(q)) for q in terms]
+        p50, p99 = _percentiles(samples)
+        print(f"  {label:<8} p50={p50:9.2f} ms  p99={p99:9.2f} ms")
+    manager.dbm.dispose()
+
+
+def seed_groups(dbm: DatabaseManager, groups: int, people: int, communities: int):
+    """Create groups where every group has `people` persons and `communities` communities"""
+    Base.metadata.create_all(bind=dbm.engine)
+    with dbm.engine.begin() as conn:
+        conn.execute(insert(Country), [{"name": f"Country {i}"} for i in range(groups)])
+        conn.execute(insert(Person), [{"name": f"Person {i}"} for i in range(people)])
+        conn.execute(insert(Community), [{"name": f"Community {i}"} for i in range(communities)])
+        conn.execute(insert(PersonGroup), [{"name": f"Group {i}", "country_id": i + 1} for i in range(groups)])
+        conn.execute(insert(person_group_people), [
+            {"person_group_id": g + 1, "person_id": p + 1} for g in range(groups) for p in range(people)
+        ])
+        conn.execute(insert(person_group_communities), [
+            {"person_group_id": g + 1, "community_id": c + 1} for g in range(groups) for c in range(communities)
+        ])
+
+
+def _capture_statements(engine):
+    """Record (statement, parameters) of every query run on the engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _rows_returned(engine, statements):
+    """Re-run each captured SELECT as a COUNT(*) to know how many rows it produced"""
+    total = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                total += conn.exec_driver_sql(f"SELECT COUNT(*) FROM ({statement})", parameters).scalar()
+    return total
+
+
+def _load_groups(dbm: DatabaseManager, options):
+    """Load every group with the given options, return (rows returned, rows materialized)"""
+    statements, stop = _capture_statements(dbm.engine)
+    db = dbm.get_session()
+    try:
+        groups = db.query(PersonGroup).options(*options).all()
+        # One materialized row per entity plus one per loaded collection member
+        materialized = len(db.identity_map)
+        for group in groups:
+            state = group.__dict__
+            materialized += len(state.get("people", [])) + len(state.get("communities", []))
+    finally:
+        dbm.close_session(db)
+        stop()
+    return _rows_returned(dbm.engine, statements), materialized
+
+
+def bench_loaders(groups: int = 20, people: int = 30, communities: int = 10):
+    """
+    Rows returned by SQL versus rows materialized for each PersonGroup loader profile
+    (tests/test_regressions.py fails when a profile returns more than it materializes).
+    """
+    dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_groups(dbm, groups, people, communities)
+    print(f"{groups} groups x {people} people x {communities} communities")
+
+    joined = [joinedload(PersonGroup.country), joinedload(PersonGroup.people), joinedload(PersonGroup.communities)]
+    returned, materialized = _load_groups(dbm, joined)
+    print(f"  {'joined':<8} returned={returned:<7} materialized={materialized:<7} (previous lazy=\"joined\")")
+
+    for profile in LOADER_PROFILES:
+        returned, materialized = _load_groups(dbm, loader_options(profile))
+        print(f"  {profile:<8} returned={returned:<7} materialized={materialized:<7}")
+    dbm.dispose()
+
+
+def bench_members(members: int = 5000):
+    """Edit one member of a large group: clear and re-extend vs diff-based update"""
+    manager = PersonGroupManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_groups(manager.dbm, 1, members, 1)
+    people_ids = list(range(2, members + 2))  # drop person 1, add one new person
+    with manager.dbm.engine.begin() as conn:
+        conn.execute(insert(Person), [{"name": "New person"}])
+
+    def before():
+        db = manager.dbm.get_session()
+        try:
+            group = db.query(PersonGroup).options(joinedload(PersonGroup.people)).filter(PersonGroup.id == 1).first()
+            group.people.clear()
+            group.people.extend(db.query(Person).filter(Person.id.in_(people_ids)).all())
+            db.commit()
+        finally:
+            manager.dbm.close_session(db)
+
+    def after():
+        db = manager.dbm.get_session()
+        try:
+            manager._set_members(db, "people", 1, people_ids)
+            db.commit()
+        finally:
+            manager.dbm.close_session(db)
+
+    print(f"1 change in a {members}-member group")
+    for label, fn in (("replace", before), ("diff", after)):
+        # Restart from the original membership each time
+        with manager.dbm.engine.begin() as conn:
+            conn.execute(person_group_people.delete())
+            conn.execute(insert(person_group_people), [
+                {"person_group_id": 1, "person_id": p + 1} for p in range(members)
+            ])
+        statements, stop = _capture_statements(manager.dbm.engine)
+        elapsed = _timed(fn)
+        stop()
+        # executemany() passes a list with one parameter set per association row
+        writes = sum(
+            len(params) if isinstance(params, list) else 1
+            for st, params in statements if not st.lstrip().upper().startswith("SELECT")
+        )
+        print(f"  {label:<8} time={elapsed:8.1f} ms  statements={len(statements):<3} rows written={writes}")
+    manager.dbm.dispose()
+
+
+def bench_seed(rows: int = 2000):
+    """Seed named rows one create() at a time vs one bulk_create()"""
+    print(f"Seeding {rows} rows")
+    names = [f"Item {i:06d}" for i in range(rows)]
+    for label in ("create", "bulk"):
+        manager = ABCManager()
+        manager.dbm = DatabaseManager(temp_db_url(f"{label}.db"), shared=False)
+        Base.metadata.create_all(bind=manager.dbm.engine, tables=[ABC.__table__])
+        if label == "create":
+            elapsed = _timed(lambda: [manager.create(name=name) for name in names])
+        else:
+            elapsed = _timed(lambda: manager.bulk_create(names))
+        print(f"  {label:<8} time={elapsed:9.1f} ms ({rows / elapsed * 1000:9.0f} rows/s)")
+        manager.dbm.dispose()
+
+
+def bench_writes(rows: int = 2000):
+    """Product creates: pre-check SELECT + INSERT + refresh vs INSERT ... RETURNING"""
+    manager = ProductManager()
+    print(f"{rows} product creates")
+    for label in ("precheck", "returning"):
+        manager.dbm = DatabaseManager(temp_db_url(f"{label}.db"), shared=False)
+        Base.metadata.create_all(bind=manager.dbm.engine, tables=[Product.__table__])
+
+        def precheck_create(code):
+            db = manager.dbm.get_session()
+            try:
+                if db.query(Product).filter(Product.code == code).first():
+                    raise ValueError("Código ya registrado")
+                product = Product(code=code, name=code, price=1.0, image="")
+                db.add(product)
+                db.commit()
+                db.refresh(product)
+            finally:
+                manager.dbm.close_session(db)
+
+        create = precheck_create if label == "precheck" else \
+            lambda code: manager.create_product(code, code, 1.0, "")
+        statements, stop = _capture_statements(manager.dbm.engine)
+        elapsed = _timed(lambda: [create(f"P{i}") for i in range(rows)])
+        stop()
+        print(
+            f"  {label:<10} time={elapsed:9.1f} ms ({rows / elapsed * 1000:7.0f} writes/s)  "
+            f"statements/write={len(statements) / rows:.1f}"
+        )
+        manager.dbm.dispose()
+
+
+def bench_cache(rows: int = 5000, requests: int = 5000, write_percent: int = 5):
+    """Read-heavy mix (by-id reads, list pages, counts, some updates) without and with the entity cache"""
+    manager = CountryManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_named(manager.dbm, Country, rows)
+    hot_ids = list(range(1, min(rows, 200) + 1))
+    random.seed(7)
+    ops = [(random.randrange(100), random.choice(hot_ids), random.randrange(5)) for _ in range(requests)]
+
+    def run(label):
+        samples, stale = [], 0
+        for roll, item_id, page in ops:
+            if roll < write_percent:
+                name = f"Edited {item_id} {roll} {page}"
+                samples.append(_timed(lambda: manager.update(item_id, name=name)))
+                # A read right after the write must see it
+                stale += manager.get_by_id(item_id).name != name
+            elif roll < 60:
+                samples.append(_timed(lambda: manager.get_by_id(item_id)))
+            else:
+                samples.append(_timed(lambda: (manager.count(), manager.get_all(skip=page * 10, limit=10))))
+        p50, p99 = _percentiles(samples)
+        print(f"  {label:<9} p50={p50:7.3f} ms  p99={p99:7.3f} ms  total={sum(samples):8.1f} ms  stale={stale}")
+
+    print(f"{rows} countries, {requests} requests, {write_percent}% writes")
+    run("uncached")
+    cache = enable_cache(manager.cache_name)
+    run("cached")
+    stats = cache.stats()
+    print(f"  hit_ratio={stats['hit_ratio']:.2%}  invalidations={stats['invalidations']}  size={stats['size']}")
+    disable_cache(manager.cache_name)
+    manager.dbm.dispose()
+
+
+def bench_budgets(groups: int = 50, people: int = 20, communities: int = 5):
+    """
+    Statements and SQL time per call of the budgeted manager paths, next to the lazy per-group
+    walk the API used to do (the budgets themselves are checked by tests/test_regressions.py)
+    """
+    manager = PersonGroupManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_groups(manager.dbm, groups, people, communities)
+    instrumentation.reset_query_stats()
+
+    def lazy_walk():
+        db = manager.dbm.get_session()
+        try:
+            for g in db.query(PersonGroup).options(lazyload("*")).all():
+                [p.name for p in g.people], [c.name for c in g.communities], g.country
+        finally:
+            manager.dbm.close_session(db)
+
+    print(f"{groups} groups x {people} people x {communities} communities")
+    manager.get_page(limit=groups, members_limit=10)
+    manager.get_all(profile="detail")
+    manager.get_all()
+    with instrumentation.operation("lazy walk", strict=False):
+        lazy_walk()
+
+    for name, stats in instrumentation.query_report().items():
+        print(f"  {name:<32} statements/call={stats['statements_per_call']:6.1f}  "
+              f"sql={stats['total_ms']:8.2f} ms  n+1={max(stats['n_plus_one'].values(), default=0)}")
+    manager.dbm.dispose()
+
+
+def bench_fts(rows: int = 200_000, requests: int = 50):
+    """
+    Accent-insensitive name search: LIKE '%q%' substring scan vs the FTS5 shadow index.
+    Selective terms are 4-letter prefixes of rare words, broad ones of words in ~10% of the names.
+    """
+    cities = ["México", "Perú", "Panamá", "Bogotá", "Asunción", "Medellín", "Mérida", "Cancún", "Córdoba", "Potosí"]
+    syllables = ["ca", "fé", "lo", "mí", "ra", "són", "ta", "bu", "ñe", "xo", "di", "ga", "pá", "qui", "ve", "zu"]
+    manager = ABCManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    Base.metadata.create_all(bind=manager.dbm.engine, tables=[ABC.__table__])
+    random.seed(7)
+    rare = ["".join(random.choice(syllables) for _ in range(4)) for _ in range(rows // 50)]
+    with manager.dbm.engine.begin() as conn:
+        conn.execute(insert(ABC), [
+            {"name": f"{random.choice(cities)} {random.choice(rare)} {i}", "disabled": False} for i in range(rows)
+        ])
+
+    def ascii_prefix(word):
+        return unicodedata.normalize("NFD", word).encode("ascii", "ignore").decode()[:4].lower()
+
+    def like(q, limit=10):
+        db = manager.dbm.get_session()
+        try:
+            query = db.query(ABC).filter(ABC.name.like(f"%{q}%"))
+            return query.count(), query.order_by(ABC.id).limit(limit).all()
+        finally:
+            manager.dbm.close_session(db)
+
+    def fts(q, limit=10):
+        return manager.count(q=q), manager.get_all(q=q, limit=limit)
+
+    print(f"{rows} rows, {requests} searches of limit=10 per case, terms typed without accents")
+    for case, words in (("selective", rare), ("broad", cities)):
+        terms = [ascii_prefix(random.choice(words)) for _ in range(requests)]
+        for label, fn in (("like", like), ("fts", fts)):
+            found = []
+            samples = [_timed(lambda: found.append(fn(q)[0])) for q in terms]
+            p50, p99 = _percentiles(samples)
+            print(f"  {case:<9} {label:<5} p50={p50:8.2f} ms  p99={p99:8.2f} ms  avg matches={statistics.mean(found):8.0f}")
+    manager.dbm.dispose()
+
+def bench_keyset(pages: int = 10_000, page_size: int = 10, requests: int = 20):
+    """Product page at increasing depths: OFFSET (get_products_paginated) vs cursor (get_products_page)"""
+    rows = pages * page_size
+    manager = ProductManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    Base.metadata.create_all(bind=manager.dbm.engine, tables=[Product.__table__])
+    random.seed(7)
+    with manager.dbm.engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"code": f"P{i:07d}", "name": f"Producto {random.randrange(rows):07d}",
+             "price": random.randrange(1, 1000), "image": ""} for i in range(rows)
+        ])
+
+    def cursor_before(page, order_by_attr):
+        """Cursor a client holds after reading page - 1 pages"""
+        if page == 1:
+            return None
+        column = getattr(Product, order_by_attr)
+        with manager.dbm.engine.connect() as conn:
+            row = conn.execute(
+                select(column, Product.id).order_by(column, Product.id).offset((page - 1) * page_size - 1).limit(1)
+            ).one()
+        return encode_cursor(row[1:] if order_by_attr == "id" else row)
+
+    print(f"{rows} products, page_size={page_size}, {requests} requests per depth")
+    for order_by_attr in ("id", "name"):
+        for page in sorted({1, 10, 100, 1000, pages}):
+            cursor = cursor_before(page, order_by_attr)
+            offset = [_timed(lambda: manager.get_products_paginated(page, page_size, order_by_attr))
+                      for _ in range(requests)]
+            keyset = [_timed(lambda: manager.get_products_page(page_size, order_by_attr, False, cursor))
+                      for _ in range(requests)]
+            same = [p["id"] for p in manager.get_products_paginated(page, page_size, order_by_attr)] == \
+                [p["id"] for p in manager.get_products_page(page_size, order_by_attr, False, cursor)[0]]
+            print(
+                f"  order={order_by_attr:<5} page={page:<6} offset p50={_percentiles(offset)[0]:8.2f} ms  "
+                f"cursor p50={_percentiles(keyset)[0]:6.2f} ms  same rows={same}"
+            )
+    manager.dbm.dispose()
+
+
+def bench_projection(rows: int = 500_000):
+    """
+    Product listing: ORM instances copied into dicts (the previous get_all_products) vs
+    the Core column projection as dicts, as tuples and with only two fields. Time, then peak memory.
+    """
+    manager = ProductManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    Base.metadata.create_all(bind=manager.dbm.engine, tables=[Product.__table__])
+    with manager.dbm.engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"code": f"P{i:07d}", "name": f"Producto {i}", "price": i / 100, "image": f"https://img/{i}.png"}
+            for i in range(rows)
+        ])
+
+    def orm_dicts():
+        db = manager.dbm.get_session()
+        try:
+            return [
+                {"id": p.id, "code": p.code, "name": p.name, "price": p.price, "image": p.image}
+                for p in db.query(Product).all()
+            ]
+        finally:
+            manager.dbm.close_session(db)
+
+    cases = (
+        ("orm", orm_dicts),
+        ("dicts", lambda: manager.get_all_products()),
+        ("tuples", lambda: manager.get_all_products(as_tuples=True)),
+        ("2 fields", lambda: manager.get_all_products(("id", "name"), as_tuples=True)),
+    )
+    print(f"{rows} products, full listing")
+    for label, fn in cases:
+        elapsed = min(_timed(fn) for _ in range(3))
+        tracemalloc.start()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(result) == rows
+        del result
+        print(f"  {label:<9} time={elapsed:8.0f} ms  peak={peak / 2 ** 20:7.1f} MiB")
+    manager.dbm.dispose()
+
+
+def bench_serialize(rows: int = 100_000):
+    """Customers to dicts and JSON: per-row column loop + getattr (the previous to_dict) vs compiled serializer"""
+    import json
+    from controls import serializer
+
+    customers = [
+        Customer(id=i, name=f"Name {i}", last_name=f"Last {i}", phone=f"555-{i:04d}", email=f"c{i}@x.com")
+        for i in range(rows)
+    ]
+
+    def column_loop(objects):
+        return [{c.name: getattr(o, c.name) for c in o.__table__.columns} for o in objects]
+
+    print(f"{rows} customers" + ("" if serializer.orjson else " (orjson not installed)"))
+    dicts = {
+        "getattr loop": lambda: column_loop(customers),
+        "to_dict": lambda: [c.to_dict() for c in customers],
+        "serialize_many": lambda: Customer.serialize_many(customers),
+        "2 fields": lambda: Customer.serialize_many(customers, include=("id", "name")),
+    }
+    for label, fn in dicts.items():
+        print(f"  dicts  {label:<15} time={min(_timed(fn) for _ in range(3)):7.1f} ms")
+    data = Customer.serialize_many(customers)
+    encoders = {"json": lambda: json.dumps(data)}
+    if serializer.orjson:
+        encoders["orjson"] = lambda: serializer.orjson.dumps(data)
+    for label, fn in encoders.items():
+        print(f"  encode {label:<15} time={min(_timed(fn) for _ in range(3)):7.1f} ms")
+
+
+def bench_bcrypt(min_rounds: int = 10, max_rounds: int = 14, logins: int = 8):
+    """
+    Cost of each bcrypt work factor, then `logins` concurrent verifications on an event loop:
+    inline (the loop stalls) vs the async wrappers on the hashing pool. A 5 ms ticker measures the stall.
+    """
+    import asyncio
+    from controls import encrypt
+
+    print(f"bcrypt cost (BCRYPT_ROUNDS={encrypt.BCRYPT_ROUNDS}, PASSWORD_HASH_WORKERS={encrypt.PASSWORD_HASH_WORKERS})")
+    for rounds in range(min_rounds, max_rounds + 1):
+        hashed = encrypt.hash_password("secret", rounds)
+        elapsed = min(_timed(lambda: encrypt.verify_password("secret", hashed)) for _ in range(3))
+        print(f"  rounds={rounds:<3} verify={elapsed:8.1f} ms  ({1000 / elapsed:6.1f} logins/s per core)")
+
+    hashed = encrypt.hash_password("secret")
+
+    async def inline():
+        encrypt.verify_password("secret", hashed)
+
+    async def pooled():
+        await encrypt.verify_password_async("secret", hashed)
+
+    async def run(login):
+        ticks = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                ticks.append((now - last) * 1000 - 5)
+                last = now
+
+        tick_task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.02)
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = (time.perf_counter() - start) * 1000
+        await asyncio.sleep(0.02)  # lets the ticker record a stall that ended with the logins
+        tick_task.cancel()
+        return elapsed, max(ticks)
+
+    print(f"{logins} concurrent logins at rounds={encrypt.BCRYPT_ROUNDS}")
+    for label, login in (("inline", inline), ("pool", pooled)):
+        elapsed, stall = asyncio.run(run(login))
+        print(f"  {label:<7} total={elapsed:8.1f} ms  longest event loop stall={stall:8.1f} ms")
+
+
+def bench_threads(rows: int = 50_000, seconds: int = 3, max_threads: int = 8):
+    """
+    Read throughput of 1..max_threads reader threads (each in its own thread_scope()), while one
+    writer thread keeps committing, per SQLite profile. Readers run name searches of CountryManager.get_page.
+    """
+    import threading
+
+    print(f"{rows} countries, {seconds} s per run, {os.cpu_count()} CPU(s), one writer committing meanwhile")
+    for profile in SQLITE_PROFILES:
+        manager = CountryManager()
+        manager.dbm = DatabaseManager(temp_db_url(f"{profile}.db"), pool_size=max_threads + 1, shared=False,
+                                      profile=profile)
+        Base.metadata.create_all(bind=manager.dbm.engine, tables=[Country.__table__])
+        with manager.dbm.engine.begin() as conn:
+            conn.execute(insert(Country), [{"name": f"Country {i:06d}"} for i in range(rows)])
+        threads = 1
+        while threads <= max_threads:
+            stop = threading.Event()
+            reads, latencies, errors, writes = [0] * threads, [[] for _ in range(threads)], [], [0]
+
+            def reader(n):
+                with thread_scope():
+                    while not stop.is_set():
+                        q = f"{random.randrange(rows):06d}"
+                        try:
+                            latencies[n].append(_timed(lambda: manager.get_page(q=q, limit=10)))
+                            reads[n] += 1
+                        except Exception as e:
+                            errors.append(e)
+
+            def writer():
+                i = 0
+                while not stop.is_set():
+                    try:
+                        manager.update(random.randrange(1, rows), name=f"Renamed {threads}-{i}")
+                        writes[0] += 1
+                    except Exception as e:
+                        errors.append(e)
+                    i += 1
+
+            workers = [threading.Thread(target=reader, args=(n,)) for n in range(threads)]
+            workers.append(threading.Thread(target=writer))
+            for worker in workers:
+                worker.start()
+            time.sleep(seconds)
+            stop.set()
+            for worker in workers:
+                worker.join()
+            _, p99 = _percentiles([ms for samples in latencies for ms in samples])
+            print(
+                f"  {profile:<12} readers={threads:<2} reads/s={sum(reads) / seconds:8.0f}  "
+                f"read p99={p99:7.2f} ms  writes/s={writes[0] / seconds:6.0f}  errors={len(errors)}"
+            )
+            threads *= 2
+        manager.dbm.dispose()
+
+
+def bench_etag(rows: int = 100_000, requests: int = 200, limit: int = 50):
+    """
+    /abc list served in full vs revalidated with If-None-Match (304 from the table version, rows untouched),
+    then what the version triggers add to writes.
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from scripts.crud_router import create_crud_router
+
+    manager = ABCManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    Base.metadata.create_all(bind=manager.dbm.engine, tables=[ABC.__table__])
+    manager.bulk_create([f"Item {i:07d}" for i in range(rows)])
+    app = FastAPI()
+    app.include_router(create_crud_router("abc", manager))
+
+    print(f"{rows} abc rows, limit={limit}, {requests} requests")
+    with TestClient(app) as client:
+        for params in ({"limit": limit}, {"limit": limit, "q": "item 00"}):
+            etag = client.get("/abc", params=params).headers["ETag"]
+            full = [_timed(lambda: client.get("/abc", params=params)) for _ in range(requests)]
+            revalidated = [_timed(lambda: client.get("/abc", params=params, headers={"If-None-Match": etag}))
+                           for _ in range(requests)]
+            status = client.get("/abc", params=params, headers={"If-None-Match": etag}).status_code
+            print(
+                f"  q={params.get('q', ''):<8} 200 p50={_percentiles(full)[0]:7.2f} ms  "
+                f"{status} p50={_percentiles(revalidated)[0]:7.2f} ms"
+            )
+    manager.dbm.dispose()
+
+    names = [f"Item {i:07d}" for i in range(rows)]
+    for label in ("triggers", "none"):
+        manager = ABCManager()
+        manager.dbm = DatabaseManager(temp_db_url(f"{label}.db"), shared=False)
+        Base.metadata.create_all(bind=manager.dbm.engine, tables=[ABC.__table__])
+        if label == "none":
+            with manager.dbm.engine.begin() as conn:
+                for suffix in ("ai", "au", "ad"):
+                    conn.exec_driver_sql(f"DROP TRIGGER abc_version_{suffix}")
+        elapsed = _timed(lambda: manager.bulk_create(names))
+        print(f"  bulk_create {label:<9} time={elapsed:9.1f} ms ({rows / elapsed * 1000:9.0f} rows/s)")
+        manager.dbm.dispose()
+
+
+def bench_response_cache(rows: int = 10_000, requests: int = 2000, write_every: int = 100):
+    """
+    Load test of the /countries list: every session opening a select sends one of a few hot queries
+    (first pages, short searches), with a country created every write_every requests.
+    SQL statements and latency without vs with the response cache.
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from scripts.crud_router import create_crud_router
+    from scripts.response_cache import ResponseCache
+
+    random.seed(3)
+    hot = [{"skip": 0, "limit": 10, "q": ""}, {"skip": 10, "limit": 10, "q": ""}] + \
+        [{"skip": 0, "limit": 10, "q": q} for q in ("item 00", "item 01", "0002", "0003", "0004")]
+    # First pages dominate: each select opens on page one with an empty search
+    weights = [50, 10] + [8] * 5
+    plan = random.choices(hot, weights, k=requests)
+
+    print(f"{rows} countries, {requests} requests over {len(hot)} distinct queries, a write every {write_every}")
+    for label in ("no cache", "cache"):
+        manager = CountryManager()
+        manager.dbm = DatabaseManager(temp_db_url(f"{label.replace(' ', '_')}.db"), shared=False)
+        Base.metadata.create_all(bind=manager.dbm.engine, tables=[Country.__table__])
+        seed_named(manager.dbm, Country, rows)
+        cache = ResponseCache(64) if label == "cache" else None
+        app = FastAPI()
+        app.include_router(create_crud_router("countries", manager, cache))
+        statements, stop = _capture_statements(manager.dbm.engine)
+        latencies = []
+        with TestClient(app) as client:
+            for i, params in enumerate(plan):
+                if i and i % write_every == 0:
+                    before = len(statements)
+                    manager.create(f"Nuevo {i}")
+                    del statements[before:]  # only the reads are compared
+                latencies.append(_timed(lambda: client.get("/countries", params=params)))
+        hit_ratio = f"  hit ratio={cache.stats()['hit_ratio']:.1%}" if cache else ""
+        p50, p99 = _percentiles(latencies)
+        print(
+            f"  {label:<9} statements={len(statements):6d} ({len(statements) / requests:4.2f} per request)  "
+            f"p50={p50:6.2f} ms  p99={p99:6.2f} ms{hit_ratio}"
+        )
+        stop()
+        manager.dbm.dispose()
+
+
+def bench_encode(groups: int = 200, people: int = 100, communities: int = 20, repeats: int = 20):
+    """
+    /persons_groups payload: encode time of FastAPI's default path (jsonable_encoder + JSONResponse)
+    vs FastJSONResponse, with and without the encoder pass, then its bytes on the wire per content coding.
+    """
+    import gzip
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from scripts import responses
+    from controls import serializer
+
+    manager = PersonGroupManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_groups(manager.dbm, groups, people, communities)
+    payload = {"results": {
+        str(g["id"]): {
+            "id": g["id"], "nombre": g["name"], "Persons": g["people"], "PersonsTotal": g["people_total"],
+            "Communities": g["communities"], "CommunitiesTotal": g["communities_total"], "Country": g["country"]
+        }
+        for g in manager.get_page(limit=groups, members_limit=people)
+    }, "pagination": {"more": False, "skip": 0, "limit": groups, "total": groups}}
+    manager.dbm.dispose()
+
+    print(f"{groups} groups x {people} people x {communities} communities" +
+          ("" if serializer.orjson else " (orjson not installed)"))
+    cases = (
+        ("JSONResponse + encoder", lambda: JSONResponse(jsonable_encoder(payload)).body),
+        ("FastJSON + encoder", lambda: responses.FastJSONResponse(jsonable_encoder(payload)).body),
+        ("FastJSON returned", lambda: responses.FastJSONResponse(payload).body),
+    )
+    for label, fn in cases:
+        print(f"  encode {label:<23} time={min(_timed(fn) for _ in range(repeats)):7.2f} ms")
+    print("  cached body             time=   0.00 ms (sent as stored)")
+
+    body = responses.FastJSONResponse(payload).body
+    codings = [("identity", lambda: body), ("gzip", lambda: gzip.compress(body, responses.GZIP_LEVEL, mtime=0))]
+    if responses.brotli is not None:
+        codings.append(("br", lambda: responses.brotli.compress(body, quality=responses.BROTLI_QUALITY)))
+    for label, fn in codings:
+        elapsed = min(_timed(fn) for _ in range(repeats))
+        print(f"  wire   {label:<23} bytes={len(fn()):9d}  compress={elapsed:7.2f} ms")
+
+
+def bench_compact(rows: int = 10_000, repeats: int = 200):
+    """
+    /countries pages as the default id-keyed map vs format=compact (with and without fields=):
+    bytes of the payload and the select-side cost, json parse plus index_results() (the store set_data builds).
+    """
+    import json
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from components.shared.selects import index_results
+    from scripts.crud_router import create_crud_router
+
+    manager = CountryManager()
+    manager.dbm = DatabaseManager(temp_db_url(), shared=False)
+    seed_named(manager.dbm, Country, rows)
+    app = FastAPI()
+    app.include_router(create_crud_router("countries", manager))
+    variants = (
+        ("map", {}),
+        ("compact", {"format": "compact"}),
+        ("compact id,text", {"format": "compact", "fields": "id,text"}),
+    )
+    with TestClient(app) as client:
+        for limit in (6, 100):
+            print(f"{rows} countries, pages of {limit}")
+            for label, params in variants:
+                body = client.get("/countries", params={"limit": limit, **params}).content
+                assert len(index_results(json.loads(body))) == limit
+                parse = min(_timed(lambda: json.loads(body)) for _ in range(repeats))
+                total = min(_timed(lambda: index_results(json.loads(body))) for _ in range(repeats))
+                print(f"  {label:<16} bytes={len(body):7d}  parse={parse * 1000:7.1f} us  "
+                      f"parse+index={total * 1000:7.1f} us")
+    manager.dbm.dispose()
+
+
+def bench_batch(operations: int = 20, repeats: int = 5):
+    """
+    A compound UI action of `operations` country renames per SQLite profile: one PUT per
+    operation (a commit each) vs one POST /batch (one transaction, one commit).
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from scripts.batch_router import create_batch_router
+    from scripts.crud_router import create_crud_router
+
+    print(f"{operations} updates per action, best of {repeats}")
+    for profile in SQLITE_PROFILES:
+        manager = CountryManager()
+        manager.dbm = DatabaseManager(temp_db_url(f"{profile}.db"), shared=False, profile=profile)
+        seed_named(manager.dbm, Country, operations)
+        app = FastAPI()
+        app.include_router(create_crud_router("countries", manager))
+        app.include_router(create_batch_router({"countries": manager}))
+        commits = []
+        event.listen(manager.dbm.engine, "commit", lambda conn: commits.append(1))
+
+        with TestClient(app) as client:
+            def one_by_one(run):
+                for i in range(operations):
+                    assert client.put(f"/countries/{i + 1}", params={"name": f"Put {run} {i}"}).status_code == 200
+
+            def batched(run):
+                body = {"operations": [
+                    {"entity": "countries", "action": "update", "id": i + 1, "data": {"name": f"Batch {run} {i}"}}
+                    for i in range(operations)
+                ]}
+                assert client.post("/batch", json=body).json()["committed"]
+
+            for label, action in (("one by one", one_by_one), ("batch", batched)):
+                del commits[:]
+                elapsed = min(_timed(lambda: action(run)) for run in range(repeats))
+                print(f"  {profile:<12} {label:<11} time={elapsed:8.2f} ms  commits/action={len(commits) / repeats:5.1f}")
+        raw = manager.dbm.engine.raw_connection()
+        assert raw.driver_connection.isolation_level is not None, "batch connection left in autocommit"
+        raw.close()
+        manager.dbm.dispose()
+
+
+COMMANDS = {
+    "engines": bench_engines,
+    "profiles": bench_profiles,
+    "search": bench_search,
+    "loaders": bench_loaders,
+    "members": bench_members,
+    "seed": bench_seed,
+    "writes": bench_writes,
+    "cache": bench_cache,
+    "budgets": bench_budgets,
+    "fts": bench_fts,
+    "keyset": bench_keyset,
+    "projection": bench_projection,
+    "serialize": bench_serialize,
+    "bcrypt": bench_bcrypt,
+    "threads": bench_threads,
+    "etag": bench_etag,
+    "response_cache": bench_response_cache,
+    "encode": bench_encode,
+    "compact": bench_compact,
+    "batch": bench_batch,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"Uso: python benchmark.py [{' | '.join(COMMANDS)}]")
+        return
+
+    COMMANDS[sys.argv[1]](*[int(arg) for arg in sys.argv[2:]])
+
+
+if __name__ == "__main__":
+    main()
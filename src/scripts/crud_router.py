@@ -1,44 +1,150 @@
-from fastapi import APIRouter, Query, HTTPException
+import inspect
 
+from email.utils import parsedate_to_datetime
+from typing import List
 
-def create_crud_router(entity_name: str, manager):
+from fastapi import APIRouter, Query, HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from data.manager.versions import read_versions, read_engine_versions, etag, last_modified
+from scripts.responses import FastJSONResponse
+
+
+class NamedItemSchema(BaseModel):
+    name: str
+    disabled: bool = False
+
+
+# Fields of a select item, in the order of format=compact rows
+ITEM_FIELDS = ("id", "text", "disabled")
+RESULT_FORMATS = "^(map|compact)$"
+
+
+async def call_manager(method, *args, **kwargs):
+    """Await async manager methods, run sync ones on the threadpool"""
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await run_in_threadpool(method, *args, **kwargs)
+
+
+async def table_versions(engine, tables):
+    """read_versions() through a sync engine (on the threadpool) or an async one"""
+    if isinstance(engine, AsyncEngine):
+        async with engine.connect() as conn:
+            return await conn.run_sync(read_versions, tables)
+    return await run_in_threadpool(read_engine_versions, engine, tables)
+
+
+def validators(versions) -> dict:
+    """ETag and Last-Modified headers of a response built from tables at these versions, {} when unversioned"""
+    if versions is None:
+        return {}
+    # no-cache: clients may keep the response but must revalidate it, which costs a 304 at most
+    return {"ETag": etag(versions), "Last-Modified": last_modified(versions), "Cache-Control": "no-cache"}
+
+
+def not_modified(request: Request, headers: dict) -> bool:
+    """
+    The client copy is current: If-None-Match lists the ETag or, when the client sent no ETag,
+    If-Modified-Since is later than Last-Modified. Both have one-second resolution and two writes
+    can share a second, so a date equal to Last-Modified counts as modified; only the ETag can
+    confirm that copy (If-Modified-Since is ignored when If-None-Match is sent).
+    """
+    if not headers:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or headers["ETag"].removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since) > parsedate_to_datetime(headers["Last-Modified"])
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_fields(fields: str | None, allowed: tuple) -> tuple:
+    """Fields asked for by a `fields=text,disabled` parameter in the order of allowed, id always first; all when None"""
+    if not fields:
+        return allowed
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in allowed if name == "id" or name in requested)
+
+
+def shape_results(rows: list, allowed: tuple, fields: tuple, payload_format: str) -> dict:
+    """
+    Payload part of result rows (tuples in the order of allowed, id first) restricted to fields:
+    {"results": {"<id>": {field: value}}} by default, or with format=compact
+    {"fields": [...], "results": [[value, ...], ...]}, the rows as parallel tuples without keys.
+    """
+    if fields != allowed:
+        indexes = [allowed.index(name) for name in fields]
+        rows = [tuple(row[i] for i in indexes) for row in rows]
+    if payload_format == "compact":
+        return {"fields": fields, "results": rows}
+    return {"results": {str(row[0]): dict(zip(fields, row)) for row in rows}}
+
+
+def create_crud_router(entity_name: str, manager, response_cache=None):
     """
     Generic router for GET, POST, PUT, and DELETE of simple tables.
-    The manager must have the following methods: get_all(), get_by_id(), create(), update(), delete()
+    The manager must have the following methods: get_page(q, limit, cursor, skip), count(q), get_by_id(), create(), update(), delete(),
+    bulk_create() and bulk_upsert()
+    Both sync managers and their async counterparts (data.manager.async_managers) are supported.
+    Lists carry an ETag from the table version and answer If-None-Match with a 304 without reading rows.
+    With a response_cache (scripts.response_cache.ResponseCache) repeated list requests are served
+    from their encoded body until the table is written.
+    Lists take `fields=` (subset of id, text and disabled) and `format=compact` (see shape_results).
     """
     router = APIRouter()
 
     @router.get(f"/{entity_name}")
-    def get_items(skip: int = Query(0, ge=0), limit: int = Query(5, ge=1), q: str | None = Query(None, alias="q")):
-        items = manager.get_all()
-        if q:
-            q_lower = q.lower()
-            items = [i for i in items if q_lower in i.name.lower()]
-        total = len(items)
-        paginated = items[skip:skip + limit]
-        results = {
-            str(i.id): {
-                "id": i.id,
-                "text": i.name,
-                "disabled": getattr(i, "disabled", False)
-            }
-            for i in paginated
-        }
-        more = skip + limit < total
-        return {
-            "results": results,
+    async def get_items(request: Request, skip: int = Query(0, ge=0), limit: int = Query(5, ge=1),
+                        q: str | None = Query(None, alias="q"), cursor: str | None = Query(None),
+                        fields: str | None = Query(None),
+                        payload_format: str = Query("map", alias="format", pattern=RESULT_FORMATS)):
+        # Search runs on the FTS5 shadow index (accent-insensitive, best matches first), counting and paging in SQL.
+        # Pages are keyset based: pass pagination.next_cursor back as `cursor`, skip is still honoured without one.
+        # The version is read before the rows, a write in between only makes the next revalidation miss
+        selected = parse_fields(fields, ITEM_FIELDS)
+        headers = validators(await table_versions(manager.dbm.engine, (manager.cache_name,)))
+        if not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        if response_cache is not None:
+            cached = response_cache.lookup(request, headers)
+            if cached is not None:
+                return cached
+        try:
+            paginated, next_cursor = await call_manager(manager.get_page, q=q, limit=limit, cursor=cursor, skip=skip)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        total = await call_manager(manager.count, q=q)
+        rows = [(i.id, i.name, getattr(i, "disabled", False)) for i in paginated]
+        payload = {
+            **shape_results(rows, ITEM_FIELDS, selected, payload_format),
             "pagination": {
-                "more": more,
+                "more": next_cursor is not None,
                 "skip": skip,
                 "limit": limit,
-                "total": total
+                "total": total,
+                "next_cursor": next_cursor
             }
         }
+        if response_cache is not None:
+            return response_cache.respond(request, headers, payload)
+        return FastJSONResponse(payload, headers=headers)
 
     @router.post(f"/{entity_name}")
-    def add_item(name: str, disabled: bool = False):
+    async def add_item(name: str, disabled: bool = False):
         try:
-            item = manager.create(name=name, disabled=disabled)
+            item = await call_manager(manager.create, name=name, disabled=disabled)
             return {
                 "id": item.id,
                 "name": item.name,
@@ -47,8 +153,20 @@ def create_crud_router(entity_name: str, manager):
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    @router.post(f"/{entity_name}/bulk")
+    async def add_items(items: List[NamedItemSchema]):
+        """Insert many items at once, names that already exist are skipped"""
+        inserted = await call_manager(manager.bulk_create, [dict(item) for item in items])
+        return {"inserted": inserted}
+
+    @router.put(f"/{entity_name}/bulk")
+    async def upsert_items(items: List[NamedItemSchema]):
+        """Insert many items at once, updating the ones whose name already exists"""
+        written = await call_manager(manager.bulk_upsert, [dict(item) for item in items])
+        return {"written": written}
+
     @router.put(f"/{entity_name}/{{item_id}}")
-    def update_item(item_id: int, name: str = None, disabled: bool = None):
+    async def update_item(item_id: int, name: str = None, disabled: bool = None):
         try:
             update_kwargs = {}
             if name is not None:
@@ -56,7 +174,7 @@ def create_crud_router(entity_name: str, manager):
             if disabled is not None:
                 update_kwargs['disabled'] = disabled
 
-            updated = manager.update(item_id, **update_kwargs)
+            updated = await call_manager(manager.update, item_id, **update_kwargs)
             return {
                 "id": updated.id,
                 "name": updated.name,
@@ -66,11 +184,11 @@ def create_crud_router(entity_name: str, manager):
             raise HTTPException(status_code=404, detail=str(e))
 
     @router.delete(f"/{entity_name}/{{item_id}}")
-    def delete_item(item_id: int):
+    async def delete_item(item_id: int):
         try:
-            manager.delete(item_id)
+            await call_manager(manager.delete, item_id)
             return {"message": f"{entity_name[:-1]} deleted successfully"}
         except ValueError as e:
             raise HTTPException(status_code=404, detail=str(e))
 
-    return router
\ No newline at end of file
+    return router
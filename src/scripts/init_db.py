@@ -2,6 +2,8 @@
 
 import sys
 from data.manager.db_manager import DatabaseManager
+from data.manager.db_base import Base
+from data.manager.index_advisor import read_query_log, advise, apply_indexes
 
 # importar los modelos
 from data.models.user import User
@@ -15,9 +17,25 @@ from data.models.abc import ABC
 
 db = DatabaseManager()
 
+def advise_indexes(log_path: str, apply: bool = False):
+    """Propone índices a partir de un log de consultas (SQL_QUERY_LOG) y, con --apply, los crea"""
+    proposals = advise(db.engine, read_query_log(log_path), set(Base.metadata.tables))
+    if not proposals:
+        print("No se encontraron índices faltantes.")
+        return
+    for proposal in proposals:
+        print(f"{proposal.ddl};  -- {sum(proposal.statements.values())} consultas")
+        print(f"    antes:   {' | '.join(proposal.plan_before)}")
+        print(f"    después: {' | '.join(proposal.plan_after)}")
+    if apply:
+        apply_indexes(db.engine, proposals)
+        print(f"{len(proposals)} índices aplicados.")
+    else:
+        print("Ejecuta de nuevo con --apply para crearlos.")
+
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python manage.py [create_db | reset_db | update_schema]")
+    if len(sys.argv) < 2:
+        print("Uso: python manage.py [create_db | reset_db | update_schema | advise_indexes <query_log> [--apply]]")
         return
 
     cmd = sys.argv[1]
@@ -30,6 +48,8 @@ def main():
             db.reset_db()
     elif cmd == "update_schema":
         db.update_schema()
+    elif cmd == "advise_indexes" and len(sys.argv) >= 3:
+        advise_indexes(sys.argv[2], "--apply" in sys.argv[3:])
     else:
         print(f"Comando desconocido: {cmd}")
 
@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+
+from controls.serializer import dumpb
+
+load_dotenv()
+
+# Encoded responses kept by the API, 0 turns the cache off
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 512))
+
+
+def cache_key(request: Request) -> str:
+    """Path plus the query with its parameters sorted and the empty ones dropped ("?q=&limit=10" == "?limit=10")"""
+    params = sorted((name, value) for name, value in request.query_params.multi_items() if value != "")
+    return request.url.path + ("?" + urlencode(params) if params else "")
+
+
+class ResponseCache:
+    """
+    LRU cache of encoded list responses, keyed by cache_key().
+    Each entry keeps the ETag of the table versions it was built from (see crud_router.validators).
+    A lookup under any other ETag means one of those tables was written, by this process or
+    another one, and drops the entry, so a cached body is never served after a write.
+    Responses without an ETag (unversioned database) are not cached.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (etag, body)
+        self._lock = threading.Lock()
+        self._paths = {}  # path -> [hits, misses]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _count(self, path: str, hit: bool):
+        counters = self._paths.setdefault(path, [0, 0])
+        counters[0 if hit else 1] += 1
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get(self, key: str, etag: str):
+        """Cached body of key built at etag, None on a miss"""
+        path = key.partition("?")[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == etag:
+                    self._entries.move_to_end(key)
+                    self._count(path, True)
+                    return entry[1]
+                del self._entries[key]
+                self.invalidations += 1
+            self._count(path, False)
+            return None
+
+    def put(self, key: str, etag: str, body: bytes):
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, request: Request, headers: dict):
+        """Cached response of the request carrying the validator headers, None on a miss. The body is sent as stored"""
+        if not headers:
+            return None
+        body = self.get(cache_key(request), headers["ETag"])
+        if body is None:
+            return None
+        return Response(body, media_type="application/json", headers=headers)
+
+    def respond(self, request: Request, headers: dict, payload) -> Response:
+        """Encode a payload once, store it when it has an ETag and return it as the response"""
+        body = dumpb(payload)
+        if headers:
+            self.put(cache_key(request), headers["ETag"], body)
+        return Response(body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": sum(len(body) for _, body in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "paths": {
+                    path: {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses)}
+                    for path, (hits, misses) in self._paths.items()
+                },
+            }
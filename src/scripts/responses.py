@@ -0,0 +1,111 @@
+import gzip
+import os
+
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from controls.serializer import dumpb
+
+try:
+    import brotli
+except ImportError:  # optional, responses are only gzipped without it
+    brotli = None
+
+load_dotenv()
+
+# Smaller bodies are sent as they are, compressing them costs more than the bytes it saves
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# Brotli above ~5 gets much slower for a few % less, too slow for per-request compression
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by orjson when installed (stdlib json otherwise), the default response class of the API.
+    Endpoints that return one directly skip FastAPI's jsonable_encoder pass, which is
+    safe for payloads that only hold JSON types (the list and group payloads).
+    """
+
+    def render(self, content) -> bytes:
+        return dumpb(content)
+
+
+def accepted_encoding(accept_encoding: str):
+    """"br" when the client accepts it and brotli is installed, else "gzip", else None"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that brotli or gzip compresses JSON and text responses of at least
+    minimum_size bytes for clients that accept it. Streamed responses pass through as they are.
+    Every JSON or text response (and every 304) carries Vary: Accept-Encoding, compressed or not,
+    so a shared cache never hands the identity body to a gzip client or the other way round.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    @staticmethod
+    def _varies(start) -> bool:
+        headers = Headers(raw=start["headers"])
+        return start["status"] == 304 or headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    def _compressible(self, headers: Headers, body: bytes) -> bool:
+        return len(body) >= self.minimum_size and "content-encoding" not in headers and \
+            headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+
+        async def send_varied(message):
+            if message["type"] == "http.response.start" and self._varies(message):
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            await send(message)
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until the body shows whether it is worth compressing
+                return
+            if message["type"] == "http.response.body" and start is not None:
+                body = message.get("body", b"")
+                headers = MutableHeaders(raw=start["headers"])
+                if not message.get("more_body") and self._compressible(headers, body):
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    message = {"type": "http.response.body", "body": body}
+                await send_varied(start)
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_varied if encoding is None else send_compressed)
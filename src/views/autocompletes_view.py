@@ -1,3 +1,6 @@
+import threading
+from collections import OrderedDict
+
 import flet as ft
 import requests
 from components.shared.selects import AutoCompleteSelect, AutoCompleteSelectMultiple
@@ -15,19 +18,43 @@ GET_PERSON_GROUPS_URL = API_URL + "persons_groups"
 
 person_group_manager = PersonGroupManager()
 
-def fetch_data(url: str, skip=0, limit=10, q: str = ""):
-    response = requests.get(
-        url,
-        params={"skip": skip, "limit": limit, "q": q},
-    )
+# Last pages fetched with their ETag, revalidated with If-None-Match so an unchanged page costs a 304
+_FETCH_CACHE_SIZE = 128
+_fetched = OrderedDict()  # (url, params) -> (etag, payload)
+_fetched_lock = threading.Lock()  # loaders run on background threads
+
+def fetch_data(url: str, skip=0, limit=10, q: str = "", cursor: str = None, compact: bool = False):
+    params = {"skip": skip, "limit": limit, "q": q}
+    if cursor:
+        params["cursor"] = cursor
+    if compact:
+        # Select pages as "fields" + row tuples, the selects decode them in set_data/append_data
+        params["format"] = "compact"
+    key = (url, tuple(params.items()))
+    with _fetched_lock:
+        cached = _fetched.get(key)
+        if cached:
+            _fetched.move_to_end(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(url, params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[1]
     if response.status_code == 200:
-        return response.json()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            with _fetched_lock:
+                _fetched[key] = (etag, data)
+                _fetched.move_to_end(key)
+                if len(_fetched) > _FETCH_CACHE_SIZE:
+                    _fetched.popitem(last=False)
+        return data
     return {"results": {}, "pagination": {"more": False}}
 
 
 def make_loader(url: str, default_limit: int):
-    def loader(skip: int, limit: int = default_limit, filter_text: str = ""):
-        return fetch_data(url, skip=skip, limit=limit, q=filter_text)
+    def loader(skip: int, limit: int = default_limit, filter_text: str = "", cursor: str = None):
+        return fetch_data(url, skip=skip, limit=limit, q=filter_text, cursor=cursor, compact=True)
     return loader
 
 
@@ -43,7 +70,7 @@ def build_view_autocompletes(page: ft.Page, forms: []) -> ft.Container:
         if input.type == "SelectField" and input.name == "country":
             select = AutoCompleteSelect(
                 page,
-                data=fetch_data(GET_COUNTRIES_URL, limit=10),
+                data=fetch_data(GET_COUNTRIES_URL, limit=10, compact=True),
                 label=input.label,
                 on_change=on_select_change,
                 on_load_more=make_loader(GET_COUNTRIES_URL, 6),
@@ -55,7 +82,7 @@ def build_view_autocompletes(page: ft.Page, forms: []) -> ft.Container:
         elif input.type == "SelectMultipleField" and input.name == "people":
             select_multi = AutoCompleteSelectMultiple(
                 page,
-                data=fetch_data(GET_PERSONS_URL, limit=5),
+                data=fetch_data(GET_PERSONS_URL, limit=5, compact=True),
                 label=input.label,
                 on_change=on_select_change,
                 on_load_more=make_loader(GET_PERSONS_URL, 6),
@@ -67,7 +94,7 @@ def build_view_autocompletes(page: ft.Page, forms: []) -> ft.Container:
         elif input.type == "SelectMultipleField" and input.name == "communities":
             select_multi = AutoCompleteSelectMultiple(
                 page,
-                data=fetch_data(GET_COMMUNITIES_URL, limit=5),
+                data=fetch_data(GET_COMMUNITIES_URL, limit=5, compact=True),
                 label=input.label,
                 on_change=on_select_change,
                 on_load_more=make_loader(GET_COMMUNITIES_URL, 6),
@@ -172,6 +199,13 @@ def build_view_autocompletes(page: ft.Page, forms: []) -> ft.Container:
         )
 
     def on_edit_item(item):
+        # Card payloads cap the member lists, the form needs all of them
+        if item.get("PersonsTotal", 0) > len(item.get("Persons", [])) or \
+                item.get("CommunitiesTotal", 0) > len(item.get("Communities", [])):
+            response = requests.get(f"{GET_PERSON_GROUPS_URL}/{item['id']}")
+            if response.status_code == 200:
+                item = response.json()
+
         for input in form.inputs:
             if input.name == "name":
                 input.set_value(item["nombre"])
@@ -11,7 +11,7 @@ def build_view_customer(page: ft.Page, forms: []) -> ft.Container:
     form_dialog = CrudModal(page)
     control = CustomerControl()
     customers = control.get_all_customers()
-    data = [c.to_dict() for c in customers]
+    data = Customer.serialize_many(customers)
 
     def create_method():
         form.clean()
@@ -45,9 +45,8 @@ def build_view_customer(page: ft.Page, forms: []) -> ft.Container:
 
     def confirm_delete(item):
         customer = Customer.from_dict(item)
+        # The row is removed by the "deleted" change event of the manager
         control.delete_customer(customer.id)
-        data.remove(item)
-        datatable.reload(data)
         return True
 
     def delete_method(item):
@@ -66,17 +65,12 @@ def build_view_customer(page: ft.Page, forms: []) -> ft.Container:
         if form.is_valid():
             try:
                 customer = Customer.from_dict(form.get_item())
+                # The table applies the row through the change event of the manager
                 if customer.id == 0 or customer.id is None:
-                    customer = control.create_customer(customer.name, customer.last_name, customer.phone,
-                                                       customer.email)
-                    data.append(customer.to_dict())
+                    control.create_customer(customer.name, customer.last_name, customer.phone, customer.email)
                 else:
-                    customer = control.update_customer(customer.id, customer.name, customer.last_name, customer.phone,
-                                                       customer.email)
-                    for i, item in enumerate(data):  # actualizar en la tabla
-                        if item["id"] == customer.id:
-                            data[i] = customer.to_dict()
-                datatable.reload(data)
+                    control.update_customer(customer.id, customer.name, customer.last_name, customer.phone,
+                                            customer.email)
                 return True
             except Exception as ex:
                 print(f"Error al agregar producto: {ex}")
@@ -105,7 +99,7 @@ def build_view_customer(page: ft.Page, forms: []) -> ft.Container:
     ]
 
     datatable = FBDataTable(data, form, title="Customers",
-                            actions=actions, top_actions=top_actions)
+                            actions=actions, top_actions=top_actions, entity="customers")
 
     return ft.Container(
         expand=True,
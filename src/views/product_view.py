@@ -71,9 +71,9 @@ class ProductView:
     def confirm_delete(self, item):
         if item:
             try:
+                # The card is removed by the "deleted" change event of the manager
                 result = self.delete_product(item)
                 self.page.update()
-                self.crud_view.reload(self.get_all_products())
                 return result
             except Exception as ex:
                 print(f"Error al eliminar producto: {ex}")
@@ -119,8 +119,8 @@ class ProductView:
                 else:
                     item = self.update_product(item)
                 self.form.activate_on_upload()
+                # The card is added or replaced by the change event of the manager
                 self.page.update()
-                self.crud_view.reload(self.get_all_products())
                 return True
             except Exception as ex:
                 print(f"Error al agregar producto: {ex}")
@@ -152,6 +152,7 @@ class ProductView:
             top_actions=self.top_actions,
             card_width=500,
             card_height=400,
+            entity="products",
 
         )
         return self.crud_view.build_view()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+# Managers built without an explicit dbm, and the API, must never touch the project database.
+# A file, so the sync and aiosqlite engines of the API see the same database
+os.environ.setdefault("DB_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'api.db')}")
+
+import pytest
+from sqlalchemy import insert, event
+
+from data.manager.db_base import Base
+from data.manager.db_manager import DatabaseManager
+from data.models.community import Community
+from data.models.country import Country
+from data.models.person import Person
+from data.models.person_group import PersonGroup, person_group_people, person_group_communities
+
+
+@pytest.fixture
+def dbm(tmp_path):
+    """Private engine over a throwaway SQLite file, disposed after the test"""
+    manager = DatabaseManager(f"sqlite:///{tmp_path / 'test.db'}", shared=False)
+    yield manager
+    manager.dispose()
+
+
+@pytest.fixture
+def client():
+    """API client over an emptied DB_URL database, the startup seeding included"""
+    from fastapi.testclient import TestClient
+    from scripts.api import app, response_cache
+
+    DatabaseManager().reset_db()
+    if response_cache is not None:
+        response_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def seed_named(dbm: DatabaseManager, model, rows: int):
+    """Create the model's table and fill it with `rows` named records"""
+    Base.metadata.create_all(bind=dbm.engine, tables=[model.__table__])
+    with dbm.engine.begin() as conn:
+        conn.execute(insert(model), [{"name": f"Item {i:06d}", "disabled": False} for i in range(rows)])
+
+
+def seed_groups(dbm: DatabaseManager, groups: int, people: int, communities: int):
+    """Create groups where every group has `people` persons and `communities` communities"""
+    Base.metadata.create_all(bind=dbm.engine)
+    with dbm.engine.begin() as conn:
+        conn.execute(insert(Country), [{"name": f"Country {i}"} for i in range(groups)])
+        conn.execute(insert(Person), [{"name": f"Person {i}"} for i in range(people)])
+        conn.execute(insert(Community), [{"name": f"Community {i}"} for i in range(communities)])
+        conn.execute(insert(PersonGroup), [{"name": f"Group {i}", "country_id": i + 1} for i in range(groups)])
+        conn.execute(insert(person_group_people), [
+            {"person_group_id": g + 1, "person_id": p + 1} for g in range(groups) for p in range(people)
+        ])
+        conn.execute(insert(person_group_communities), [
+            {"person_group_id": g + 1, "community_id": c + 1} for g in range(groups) for c in range(communities)
+        ])
+
+
+def _capture_statements(engine):
+    """Record (statement, parameters) of every query run on the engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _rows_returned(engine, statements):
+    """Re-run each captured SELECT as a COUNT(*) to know how many rows it produced"""
+    total = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                total += conn.exec_driver_sql(f"SELECT COUNT(*) FROM ({statement})", parameters).scalar()
+    return total
+
+
+def load_groups(dbm: DatabaseManager, options):
+    """Load every group with the given options, return (rows returned, rows materialized)"""
+    statements, stop = _capture_statements(dbm.engine)
+    db = dbm.get_session()
+    try:
+        groups = db.query(PersonGroup).options(*options).all()
+        # One materialized row per entity plus one per loaded collection member
+        materialized = len(db.identity_map)
+        for group in groups:
+            state = group.__dict__
+            materialized += len(state.get("people", [])) + len(state.get("communities", []))
+    finally:
+        dbm.close_session(db)
+        stop()
+    return _rows_returned(dbm.engine, statements), materialized
@@ -0,0 +1,63 @@
+"""
+POST /batch: every operation in one transaction, all or nothing by default, or committed per
+operation (each on its own savepoint) with atomic=false.
+"""
+
+def names(client, entity: str) -> list:
+    payload = client.get(f"/{entity}", params={"limit": 100, "format": "compact", "fields": "text"}).json()
+    return [text for _, text in payload["results"]]
+
+
+def test_batch_commits_every_operation(client):
+    response = client.post("/batch", json={"operations": [
+        {"entity": "countries", "action": "create", "data": {"name": "Canadá"}},
+        {"entity": "countries", "action": "update", "id": 1, "data": {"name": "Argentina (AR)"}},
+        {"entity": "persons", "action": "delete", "id": 10},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True and [r["ok"] for r in body["results"]] == [True, True, True]
+    assert body["results"][0]["result"]["name"] == "Canadá"
+    assert "Canadá" in names(client, "countries") and "Argentina (AR)" in names(client, "countries")
+    assert "Persona 10" not in names(client, "persons")
+
+
+def test_atomic_batch_rolls_back_everything(client):
+    etag = client.get("/countries").headers["ETag"]
+    response = client.post("/batch", json={"operations": [
+        {"entity": "countries", "action": "create", "data": {"name": "Canadá"}},
+        {"entity": "countries", "action": "create", "data": {"name": "México"}},  # already exists
+        {"entity": "countries", "action": "delete", "id": 1},
+    ]})
+    assert response.status_code == 400
+    body = response.json()
+    assert body["committed"] is False
+    assert [r["ok"] for r in body["results"]] == [True, False, False]
+    assert body["results"][2]["error"] == "Skipped, the batch was rolled back"
+    assert "Canadá" not in names(client, "countries") and "Argentina" in names(client, "countries")
+    # Nothing was written, so the listing is still current
+    assert client.get("/countries", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_non_atomic_batch_only_undoes_the_failed_operation(client):
+    response = client.post("/batch", json={"atomic": False, "operations": [
+        {"entity": "countries", "action": "create", "data": {"name": "Canadá"}},
+        {"entity": "countries", "action": "update", "id": 999, "data": {"name": "Nowhere"}},
+        {"entity": "countries", "action": "create", "data": {"name": "México"}},  # its failed INSERT is undone
+        {"entity": "unknown", "action": "create"},
+        {"entity": "countries", "action": "delete"},
+        {"entity": "countries", "action": "delete", "id": 1},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True
+    assert [r["ok"] for r in body["results"]] == [True, False, False, False, False, True]
+    assert body["results"][3]["error"] == "Unknown entity 'unknown'"
+    assert body["results"][4]["error"] == "delete needs an id"
+    countries = names(client, "countries")
+    assert "Canadá" in countries and "Nowhere" not in countries and "Argentina" not in countries
+    assert countries.count("México") == 1
+
+
+def test_batch_size_is_bounded(client):
+    assert client.post("/batch", json={"operations": []}).status_code == 422
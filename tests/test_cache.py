@@ -0,0 +1,40 @@
+"""
+The entity cache must never serve stale rows, nor rows shared between callers.
+"""
+import pytest
+
+from conftest import seed_named
+from data.manager.cache import enable_cache, disable_cache
+from data.manager.country_manager import CountryManager
+from data.models.country import Country
+
+
+@pytest.fixture
+def cached_countries(dbm):
+    manager = CountryManager()
+    manager.dbm = dbm
+    seed_named(dbm, Country, 50)
+    enable_cache(manager.cache_name)
+    yield manager
+    disable_cache(manager.cache_name)
+
+
+def test_cached_reads_see_every_write(cached_countries):
+    manager = cached_countries
+    for item_id in (1, 2, 1):
+        manager.get_by_id(item_id), manager.count(), manager.get_all(limit=10)
+        name = f"Edited {item_id}"
+        manager.update(item_id, name=name)
+        assert manager.get_by_id(item_id).name == name
+        assert name in [country.name for country in manager.get_all(limit=10)]
+
+
+def test_cache_hits_are_copies(cached_countries):
+    manager = cached_countries
+    manager.get_all(limit=10)
+    first = manager.get_all(limit=10)  # a hit
+    first.append(None)
+    first[0].name = "Mutated"
+    second = manager.get_all(limit=10)
+    assert len(second) == 10
+    assert second[0].name == "Item 000000"
@@ -0,0 +1,88 @@
+"""
+Row changes published on the in-process bus, so views patch the rows they show.
+"""
+import gc
+
+import pytest
+
+from conftest import seed_named
+from data.manager.changes import ChangeBus, ChangeEvent, subscribe, CREATED, UPDATED, DELETED
+from data.manager.country_manager import CountryManager
+from data.manager.db_base import Base
+from data.manager.db_manager import transaction_scope
+from data.models.country import Country
+
+
+@pytest.fixture
+def countries(dbm):
+    manager = CountryManager()
+    manager.dbm = dbm
+    Base.metadata.create_all(bind=dbm.engine)
+    seed_named(dbm, Country, 3)
+    events = []
+    unsubscribe = subscribe("countries", events.append)
+    yield manager, events
+    unsubscribe()
+
+
+def test_writes_publish_their_row(countries):
+    manager, events = countries
+    created = manager.create(name="New")
+    manager.update(created.id, name="Renamed")
+    manager.delete(created.id)
+    assert [(e.kind, e.id, e.row and e.row["name"]) for e in events] == [
+        (CREATED, 4, "New"), (UPDATED, 4, "Renamed"), (DELETED, 4, None),
+    ]
+
+
+def test_failed_writes_publish_nothing(countries):
+    manager, events = countries
+    with pytest.raises(ValueError):
+        manager.create(name="Item 000000")
+    with pytest.raises(ValueError):
+        manager.delete(99)
+    assert events == []
+
+
+def test_events_wait_for_the_transaction(countries):
+    manager, events = countries
+    with pytest.raises(RuntimeError):
+        with transaction_scope():
+            manager.create(name="Rolled back")
+            assert events == []
+            raise RuntimeError("abort")
+    with transaction_scope():
+        manager.create(name="Committed")
+        assert events == []
+    assert [e.row["name"] for e in events] == ["Committed"]
+
+
+def test_bound_methods_are_held_weakly():
+    class View:
+        def __init__(self):
+            self.events = []
+
+        def apply(self, event):
+            self.events.append(event)
+
+    bus = ChangeBus()
+    view = View()
+    bus.subscribe("countries", view.apply)
+    bus.publish(ChangeEvent("countries", UPDATED, 1, {"id": 1}))
+    assert len(view.events) == 1
+    del view
+    gc.collect()
+    bus.publish(ChangeEvent("countries", UPDATED, 1, {"id": 1}))
+    assert bus._subscribers["countries"] == []
+
+
+def test_a_failing_subscriber_does_not_stop_the_others():
+    bus, received = ChangeBus(), []
+
+    def broken(event):
+        raise RuntimeError("view gone")
+
+    bus.subscribe("countries", broken)
+    bus.subscribe("countries", received.append)
+    bus.publish(ChangeEvent("countries", DELETED, 1))
+    assert [e.id for e in received] == [1]
@@ -0,0 +1,45 @@
+"""
+The index advisor keeps only the indexes that make a logged statement cheaper, and hands its
+connection back to the pool the way it found it.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from data.manager import index_advisor
+
+STATEMENT = "SELECT users.id FROM users WHERE users.email = ?"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'advisor.db'}", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR)")
+    yield engine
+    engine.dispose()
+
+
+def isolation_level(engine):
+    raw = engine.raw_connection()
+    try:
+        return raw.driver_connection.isolation_level
+    finally:
+        raw.close()
+
+
+def test_proposes_the_index_of_a_scanned_filter(engine):
+    proposals = index_advisor.advise(engine, {STATEMENT: 3}, {"users"})
+    assert [(p.name, p.statements[STATEMENT]) for p in proposals] == [("ix_users_email", 3)]
+
+
+def test_restores_the_isolation_level_when_it_fails(engine, monkeypatch):
+    before = isolation_level(engine)
+
+    def fail(*args):
+        raise RuntimeError("planner")
+
+    monkeypatch.setattr(index_advisor, "full_scans", fail)
+    with pytest.raises(RuntimeError):
+        index_advisor.advise(engine, {STATEMENT: 1}, {"users"})
+    assert isolation_level(engine) == before
@@ -0,0 +1,90 @@
+"""
+Keyset pages: following next_cursor walks every row exactly once, even when rows are written
+between two pages, and cursors that were not produced by a page are rejected.
+"""
+import pytest
+from sqlalchemy import insert
+
+from conftest import seed_named
+from data.manager.country_manager import CountryManager
+from data.manager.db_base import Base
+from data.manager.product_manager import ProductManager
+from data.models.country import Country
+from data.models.product import Product
+
+
+@pytest.fixture
+def products(dbm):
+    Base.metadata.create_all(bind=dbm.engine, tables=[Product.__table__])
+    with dbm.engine.begin() as conn:
+        # Repeated names, so the id has to break the ties of the order column
+        conn.execute(insert(Product), [
+            {"code": f"P{i:02d}", "name": f"Product {i % 4}", "price": i, "image": ""} for i in range(23)
+        ])
+    manager = ProductManager()
+    manager.dbm = dbm
+    return manager
+
+
+@pytest.mark.parametrize("order_by_attr, descending", [("id", False), ("name", False), ("name", True)])
+def test_product_pages_walk_every_row_once(products, order_by_attr, descending):
+    seen, cursor = [], None
+    while True:
+        page, cursor = products.get_products_page(5, order_by_attr, descending, cursor)
+        seen += [row["code"] for row in page]
+        if cursor is None:
+            break
+    assert sorted(seen) == [f"P{i:02d}" for i in range(23)]
+    assert len(page) == 3
+
+
+def test_product_pages_do_not_shift_when_rows_are_written(products):
+    first, cursor = products.get_products_page(5, "name")
+    # An offset would now skip a row (delete before the cursor) and repeat one (insert before it)
+    products.delete_product(first[0]["id"])
+    products.create_product(code="P99", name="Product 0", price=1, image="")
+    second, _ = products.get_products_page(5, "name", cursor=cursor)
+    assert [row["code"] for row in first] == ["P00", "P04", "P08", "P12", "P16"]
+    assert [row["code"] for row in second] == ["P20", "P99", "P01", "P05", "P09"]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "WzEsMl0", "eyJhIjoxfQ"])  # garbage, [1,2], {"a":1}
+def test_product_pages_reject_foreign_cursors(products, cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        products.get_products_page(5, cursor=cursor)
+
+
+def test_search_pages_walk_every_match_once(dbm):
+    seed_named(dbm, Country, 30)
+    manager = CountryManager()
+    manager.dbm = dbm
+    seen, cursor = [], None
+    while True:
+        page, cursor = manager.get_page(q="item 00001", limit=4, cursor=cursor)
+        seen += [country.name for country in page]
+        # A match inserted before the cursor, an offset would repeat the last row of the page
+        manager.create(name=f"Item 00001 new {len(seen)}")
+        if cursor is None:
+            break
+    assert seen == [f"Item {i:06d}" for i in range(10, 20)]
+
+
+def test_api_next_cursor_round_trip(client):
+    pages, params = [], {"limit": 6}
+    while True:
+        pagination = client.get("/countries", params=params).json()
+        pages.append(list(pagination["results"]))
+        pagination = pagination["pagination"]
+        if not pagination["more"]:
+            assert pagination["next_cursor"] is None
+            break
+        params = {"limit": 6, "cursor": pagination["next_cursor"]}
+    ids = [item_id for page in pages for item_id in page]
+    assert ids == [str(i) for i in range(1, 21)]  # the 20 countries seeded at startup
+    assert [len(page) for page in pages] == [6, 6, 6, 2]
+
+
+def test_api_rejects_a_bad_cursor(client):
+    response = client.get("/countries", params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
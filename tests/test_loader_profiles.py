@@ -0,0 +1,25 @@
+"""
+Loader profiles must not bring back the cartesian JOINs of the former lazy="joined"
+relationships. scripts/benchmark.py measures the same paths.
+"""
+import pytest
+from sqlalchemy.orm import joinedload
+
+from conftest import seed_groups, load_groups
+from data.manager.person_group_manager import LOADER_PROFILES, loader_options
+from data.models.person_group import PersonGroup
+
+
+def test_joined_collections_blow_up_rows(dbm):
+    """The check below must catch the cartesian JOIN of the former lazy="joined" relationships"""
+    seed_groups(dbm, 20, 30, 10)
+    joined = [joinedload(PersonGroup.country), joinedload(PersonGroup.people), joinedload(PersonGroup.communities)]
+    returned, materialized = load_groups(dbm, joined)
+    assert returned > materialized
+
+
+@pytest.mark.parametrize("profile", LOADER_PROFILES)
+def test_loader_profile_returns_no_more_rows_than_it_materializes(dbm, profile):
+    seed_groups(dbm, 20, 30, 10)
+    returned, materialized = load_groups(dbm, loader_options(profile))
+    assert returned <= materialized
@@ -0,0 +1,99 @@
+"""
+Password storage: bcrypt hashes at BCRYPT_ROUNDS, upgraded on login when the stored value is a
+hash of another cost or the plain text of a row saved before passwords were hashed.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import insert, select
+
+from controls import encrypt
+from data.manager.async_managers import AsyncUserManager
+from data.manager.db_base import Base
+from data.manager.db_manager import DatabaseManager
+from data.manager.user_manager import UserManager
+from data.models.user import User
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt(monkeypatch):
+    monkeypatch.setattr(encrypt, "BCRYPT_ROUNDS", 4)
+
+
+@pytest.fixture
+def users(dbm):
+    Base.metadata.create_all(bind=dbm.engine, tables=[User.__table__])
+    manager = UserManager()
+    manager.dbm = dbm
+    return manager
+
+
+def add_user(engine, email: str, stored_password: str):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"name": "Legacy", "email": email, "password": stored_password}])
+
+
+def stored_password(engine, email: str) -> str:
+    with engine.connect() as conn:
+        return conn.scalar(select(User.password).where(User.email == email))
+
+
+def test_created_users_store_a_hash(users):
+    users.create_user("Ana", "ana@x.com", "secret")
+    stored = stored_password(users.dbm.engine, "ana@x.com")
+    assert encrypt.is_hash(stored) and stored != "secret"
+    assert users.login_user("ana@x.com", "secret").email == "ana@x.com"
+    assert users.login_user("ana@x.com", "wrong") is None
+
+
+def test_legacy_plain_text_password_is_upgraded_on_login(users):
+    add_user(users.dbm.engine, "old@x.com", "secret")
+    assert users.login_user("old@x.com", "wrong") is None
+    assert stored_password(users.dbm.engine, "old@x.com") == "secret"
+
+    assert users.login_user("old@x.com", "secret") is not None
+    stored = stored_password(users.dbm.engine, "old@x.com")
+    assert encrypt.is_hash(stored) and encrypt.verify_password("secret", stored)
+    assert users.login_user("old@x.com", "secret") is not None
+
+
+def test_hash_of_another_cost_is_upgraded_on_login(users):
+    add_user(users.dbm.engine, "cost@x.com", encrypt.hash_password("secret", rounds=5))
+    users.login_user("cost@x.com", "secret")
+    assert encrypt.hash_rounds(stored_password(users.dbm.engine, "cost@x.com")) == 4
+
+
+def test_empty_password_never_verifies():
+    assert encrypt.verify_and_update("", "") == (False, None)
+    assert encrypt.verify_and_update("", None) == (False, None)
+
+
+def test_async_login_upgrades_legacy_rows(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'users.db'}"
+    dbm = DatabaseManager(db_url, shared=False)
+    Base.metadata.create_all(bind=dbm.engine, tables=[User.__table__])
+    add_user(dbm.engine, "old@x.com", "secret")
+    manager = AsyncUserManager()
+    manager.dbm = type(manager.dbm)(db_url)
+
+    async def login():
+        try:
+            return await manager.login_user("old@x.com", "wrong"), await manager.login_user("old@x.com", "secret")
+        finally:
+            await manager.dbm.engine.dispose()
+
+    wrong, right = asyncio.run(login())
+    assert wrong is None and right.email == "old@x.com"
+    assert encrypt.is_hash(stored_password(dbm.engine, "old@x.com"))
+    dbm.dispose()
+
+
+def test_api_login(client):
+    add_user(DatabaseManager().engine, "api@x.com", encrypt.hash_password("secret"))
+    response = client.post("/login", json={"email": "api@x.com", "password": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "name": "Legacy", "email": "api@x.com"}
+    for credentials in ({"email": "api@x.com", "password": "wrong"}, {"email": "nobody@x.com", "password": "secret"}):
+        response = client.post("/login", json=credentials)
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Invalid email or password"}
@@ -0,0 +1,42 @@
+"""
+Product and user listings must project only the requested columns and never return
+passwords.
+"""
+import pytest
+from sqlalchemy import insert
+
+from data.manager.db_base import Base
+from data.manager.product_manager import ProductManager
+from data.manager.user_manager import UserManager
+from data.models.product import Product
+from data.models.user import User
+
+
+@pytest.fixture
+def listings(dbm):
+    Base.metadata.create_all(bind=dbm.engine, tables=[Product.__table__, User.__table__])
+    with dbm.engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"code": f"P{i}", "name": f"Product {i}", "price": i, "image": f"{i}.png"} for i in range(3)
+        ])
+        conn.execute(insert(User), [{"name": f"User {i}", "email": f"u{i}@x.com", "password": "x"} for i in range(2)])
+    products, users = ProductManager(), UserManager()
+    products.dbm = users.dbm = dbm
+    return products, users
+
+
+def test_product_listing_projects_the_requested_columns(listings):
+    products, _ = listings
+    assert products.get_all_products()[1] == {"id": 2, "code": "P1", "name": "Product 1", "price": 1.0, "image": "1.png"}
+    assert products.get_all_products(("id", "name"), as_tuples=True) == [(1, "Product 0"), (2, "Product 1"), (3, "Product 2")]
+    with pytest.raises(ValueError):
+        products.get_all_products(("id", "missing"))
+
+
+def test_user_listing_never_returns_passwords(listings):
+    _, users = listings
+    assert users.get_all_users() == [
+        {"name": "User 0", "email": "u0@x.com", "id": 1}, {"name": "User 1", "email": "u1@x.com", "id": 2},
+    ]
+    with pytest.raises(ValueError):
+        users.get_all_users(("id", "password"))
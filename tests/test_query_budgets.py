@@ -0,0 +1,50 @@
+"""
+PersonGroup reads must stay within their statement budgets whatever the page, filter or
+loader profile, and the lazy per-group walk they replaced must be flagged as an N+1.
+"""
+import pytest
+from sqlalchemy.orm import lazyload
+
+from conftest import seed_groups
+from data.manager import instrumentation
+from data.manager.person_group_manager import PersonGroupManager
+from data.models.person_group import PersonGroup
+
+
+@pytest.fixture
+def groups(dbm):
+    manager = PersonGroupManager()
+    manager.dbm = dbm
+    seed_groups(dbm, 50, 20, 5)
+    return manager
+
+
+@pytest.mark.parametrize("call", [
+    lambda manager: manager.get_page(limit=50, members_limit=10),
+    lambda manager: manager.get_page(q="Group 1", skip=2, limit=5),
+    lambda manager: manager.get_all(profile="detail"),
+    lambda manager: manager.get_all(),
+    lambda manager: manager.get_all(eager=True, limit=5),
+    lambda manager: manager.get_all(q="Group"),
+    lambda manager: manager.get_all(profile="ids", skip=1),
+], ids=["get_page", "get_page paged", "get_all detail", "get_all summary",
+        "get_all detail paged", "get_all filtered", "get_all ids paged"])
+def test_group_reads_stay_within_budget(groups, monkeypatch, call):
+    monkeypatch.setattr(instrumentation, "STRICT", True)
+    assert call(groups)  # QueryBudgetExceeded is an AssertionError
+
+
+def test_paged_get_all_returns_the_page(groups):
+    assert [g.id for g in groups.get_all(eager=True, skip=3, limit=5)] == [4, 5, 6, 7, 8]
+    assert [g.name for g in groups.get_all(q="Group 4", limit=3)] == ["Group 4", "Group 40", "Group 41"]
+
+
+def test_lazy_walk_is_flagged_as_n_plus_one(groups):
+    with pytest.raises(instrumentation.QueryBudgetExceeded, match=r"N\+1"):
+        with instrumentation.operation("lazy walk", strict=True):
+            db = groups.dbm.get_session()
+            try:
+                for g in db.query(PersonGroup).options(lazyload("*")).all():
+                    [p.name for p in g.people], [c.name for c in g.communities], g.country
+            finally:
+                groups.dbm.close_session(db)
@@ -0,0 +1,64 @@
+"""
+Encoded list responses served from the response cache until one of their tables is written.
+"""
+import pytest
+from starlette.requests import Request
+
+from scripts import api
+from scripts.response_cache import ResponseCache, cache_key
+
+
+def request(query: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/countries", "query_string": query.encode(), "headers": []})
+
+
+@pytest.fixture
+def response_cache(client):
+    if api.response_cache is None:
+        pytest.skip("RESPONSE_CACHE_SIZE=0")
+    return api.response_cache
+
+
+def test_key_ignores_parameter_order_and_empty_values():
+    assert cache_key(request("q=&limit=10&skip=0")) == cache_key(request("skip=0&limit=10")) == \
+        "/countries?limit=10&skip=0"
+    assert cache_key(request("")) == "/countries"
+
+
+def test_entries_are_evicted_least_recently_used_first():
+    cache = ResponseCache(2)
+    cache.put("/a", "e", b"a"), cache.put("/b", "e", b"b")
+    cache.get("/a", "e")
+    cache.put("/c", "e", b"c")
+    assert (cache.get("/a", "e"), cache.get("/b", "e"), cache.get("/c", "e")) == (b"a", None, b"c")
+    assert cache.evictions == 1
+
+
+def test_repeated_list_is_a_hit(client, response_cache):
+    first = client.get("/countries", params={"limit": 10, "q": ""})
+    hits = response_cache.hits
+    second = client.get("/countries", params={"limit": 10})
+    assert response_cache.hits == hits + 1
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+def test_write_invalidates_the_entry(client, response_cache):
+    client.get("/countries", params={"limit": 50})
+    client.post("/countries", params={"name": "Canadá"})
+    invalidations = response_cache.invalidations
+    response = client.get("/countries", params={"limit": 50})
+    assert response_cache.invalidations == invalidations + 1
+    assert "Canadá" in [row["text"] for row in response.json()["results"].values()]
+    # The rebuilt body is cached again
+    hits = response_cache.hits
+    assert client.get("/countries", params={"limit": 50}).content == response.content
+    assert response_cache.hits == hits + 1
+
+
+def test_group_listing_is_invalidated_by_its_member_tables(client, response_cache):
+    client.get("/persons_groups")
+    client.put("/countries/1", params={"name": "Renamed"})
+    invalidations = response_cache.invalidations
+    client.get("/persons_groups")
+    assert response_cache.invalidations == invalidations + 1
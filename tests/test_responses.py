@@ -0,0 +1,62 @@
+"""
+API responses: compressed past COMPRESSION_MIN_SIZE for clients that accept it, and always
+marked Vary: Accept-Encoding so shared caches keep the encodings apart.
+"""
+import gzip
+
+import pytest
+
+from scripts.responses import accepted_encoding, brotli, COMPRESSION_MIN_SIZE
+
+
+@pytest.fixture
+def large_list(client):
+    client.post("/countries/bulk", json=[{"name": f"Country {i:04d}"} for i in range(100)])
+    params = {"limit": 120}
+    assert len(client.get("/countries", params=params, headers={"Accept-Encoding": "identity"}).content) \
+        >= COMPRESSION_MIN_SIZE
+    return params
+
+
+def test_accepted_encoding():
+    assert accepted_encoding("gzip, deflate") == "gzip"
+    assert accepted_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert accepted_encoding("identity") is None
+    assert accepted_encoding("*") == ("br" if brotli is not None else "gzip")
+    assert accepted_encoding("gzip;q=0") is None
+
+
+def test_large_list_is_compressed(client, large_list):
+    plain = client.get("/countries", params=large_list, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    response = client.get("/countries", params=large_list, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(plain.content)
+    assert response.content == plain.content  # decoded by the client
+    assert response.headers["ETag"] == plain.headers["ETag"]
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli not installed")
+def test_brotli_is_preferred(client, large_list):
+    response = client.get("/countries", params=large_list, headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_small_and_uncompressed_responses_vary(client, large_list):
+    small = client.get("/countries", params={"limit": 1}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+    plain = client.get("/countries", params=large_list, headers={"Accept-Encoding": "identity"})
+    assert plain.headers["vary"] == "Accept-Encoding"
+    not_modified = client.get("/countries", params=large_list, headers={"If-None-Match": plain.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["vary"] == "Accept-Encoding"
+
+
+def test_gzip_body_is_the_json_body(client, large_list):
+    # Read the raw bytes, without the client's decoding
+    with client.stream("GET", "/countries", params=large_list, headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw) == client.get("/countries", params=large_list,
+                                              headers={"Accept-Encoding": "identity"}).content
@@ -0,0 +1,51 @@
+"""
+List payload shapes: results keyed by id by default, parallel rows with format=compact, and only
+the columns asked for by fields= (id always first).
+"""
+import pytest
+
+
+@pytest.fixture
+def group(client):
+    response = client.post("/persons_groups", json={
+        "name": "Group", "country_id": 1, "people_ids": [1, 2, 3], "community_ids": [4],
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_default_map_shape(client):
+    payload = client.get("/countries", params={"limit": 2}).json()
+    assert payload["results"] == {
+        "1": {"id": 1, "text": "Argentina", "disabled": False},
+        "2": {"id": 2, "text": "Bolivia", "disabled": False},
+    }
+
+
+def test_compact_shape(client):
+    payload = client.get("/countries", params={"limit": 2, "format": "compact"}).json()
+    assert payload["fields"] == ["id", "text", "disabled"]
+    assert payload["results"] == [[1, "Argentina", False], [2, "Bolivia", False]]
+    assert payload["pagination"]["total"] == 20
+
+
+def test_fields_keep_id_first_and_the_allowed_order(client):
+    payload = client.get("/countries", params={"limit": 2, "fields": "disabled,text", "format": "compact"}).json()
+    assert payload["fields"] == ["id", "text", "disabled"]
+    payload = client.get("/countries", params={"limit": 2, "fields": "text"}).json()
+    assert payload["results"] == {"1": {"id": 1, "text": "Argentina"}, "2": {"id": 2, "text": "Bolivia"}}
+
+
+def test_unknown_field_or_format_is_rejected(client):
+    response = client.get("/countries", params={"fields": "text,password"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Unknown fields: password"}
+    assert client.get("/countries", params={"format": "xml"}).status_code == 422
+
+
+def test_group_fields_leave_out_member_lists(client, group):
+    payload = client.get("/persons_groups", params={"fields": "nombre,PersonsTotal", "format": "compact"}).json()
+    assert payload["fields"] == ["id", "nombre", "PersonsTotal"]
+    assert payload["results"] == [[group["id"], "Group", 3]]
+    payload = client.get("/persons_groups", params={"fields": "Communities"}).json()
+    assert payload["results"] == {str(group["id"]): {"id": group["id"], "Communities": [{"id": 4, "name": "Community 4"}]}}
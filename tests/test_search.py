@@ -0,0 +1,105 @@
+"""
+Name search over the FTS5 shadow indexes: word prefixes accent and case insensitive,
+substrings inside words, and a LIKE fallback for databases created before the indexes.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.schema import CreateTable
+
+from data.manager.async_managers import AsyncCountryManager
+from data.manager.country_manager import CountryManager
+from data.manager.db_base import Base
+from data.manager.db_manager import DatabaseManager
+from data.manager.fts import FTS_AVAILABLE, TRIGRAM_AVAILABLE, ensure_fts
+from data.models.country import Country
+
+NAMES = ["México", "Nicaragua", "Mexicali", "Costa Rica", "Perú"]
+
+needs_fts = pytest.mark.skipif(not (FTS_AVAILABLE and TRIGRAM_AVAILABLE), reason="SQLite without FTS5 trigram")
+
+
+def create_without_indexes(engine):
+    """Tables as an older version created them: plain DDL, no shadow indexes or triggers"""
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            conn.exec_driver_sql(str(CreateTable(table).compile(dialect=engine.dialect)))
+        conn.execute(insert(Country), [{"name": name} for name in NAMES])
+
+
+@pytest.fixture
+def countries(dbm):
+    Base.metadata.create_all(bind=dbm.engine)
+    with dbm.engine.begin() as conn:
+        conn.execute(insert(Country), [{"name": name} for name in NAMES])
+    manager = CountryManager()
+    manager.dbm = dbm
+    return manager
+
+
+def names(rows):
+    return [row.name for row in rows]
+
+
+@needs_fts
+def test_words_match_accent_and_case_insensitive(countries):
+    assert names(countries.get_all(q="mexico")) == ["México"]
+    assert names(countries.get_all(q="PERU")) == ["Perú"]
+    assert countries.count(q="mexico") == 1
+
+
+@needs_fts
+def test_word_prefixes_rank_before_substrings(countries):
+    # "Mexicali" and "México" start with "mex", "Costa Rica" and "Nicaragua" only contain "ica"
+    assert names(countries.get_all(q="mex")) == ["Mexicali", "México"]
+    assert names(countries.get_all(q="ica")) == ["Costa Rica", "Mexicali", "Nicaragua"]
+    rows, _ = countries.get_page(q="ica", limit=10)
+    assert names(rows) == ["Costa Rica", "Mexicali", "Nicaragua"]
+
+
+def test_search_on_a_database_created_before_the_indexes(dbm):
+    create_without_indexes(dbm.engine)
+    manager = CountryManager()
+    manager.dbm = dbm
+    assert names(manager.get_all(q="xic")) == ["México", "Mexicali"]
+    assert manager.count(q="xic") == 2
+    rows, _ = manager.get_page(q="xic", limit=10)
+    assert names(rows) == ["México", "Mexicali"]
+
+    ensure_fts(dbm.engine)
+    if FTS_AVAILABLE and TRIGRAM_AVAILABLE:
+        assert names(manager.get_all(q="mexico")) == ["México"]
+
+
+def test_async_search_on_a_database_created_before_the_indexes(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'old.db'}"
+    dbm = DatabaseManager(db_url, shared=False)
+    create_without_indexes(dbm.engine)
+    dbm.dispose()
+    manager = AsyncCountryManager()
+    manager.dbm = type(manager.dbm)(db_url)
+
+    async def search():
+        try:
+            rows, _ = await manager.get_page(q="xic", limit=10)
+            return names(rows), await manager.count(q="xic")
+        finally:
+            await manager.dbm.engine.dispose()
+
+    assert asyncio.run(search()) == (["México", "Mexicali"], 2)
+
+
+def test_api_search_on_a_database_created_before_the_indexes():
+    from fastapi.testclient import TestClient
+    from scripts.api import app, response_cache
+
+    create_without_indexes(DatabaseManager().engine)
+    if response_cache is not None:
+        response_cache.clear()
+    with TestClient(app) as client:
+        response = client.get("/countries", params={"q": "mex"})
+        assert response.status_code == 200
+        assert "México" in [row["text"] for row in response.json()["results"].values()]
+        assert client.get("/persons_groups", params={"q": "mex"}).status_code == 200
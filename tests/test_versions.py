@@ -0,0 +1,58 @@
+"""
+Conditional list requests: the ETag and Last-Modified of a listing come from per-table versions,
+bumped by every write and by recreating the table.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+
+from data.manager.db_manager import DatabaseManager
+from data.manager.versions import read_engine_versions
+
+
+def test_matching_etag_is_not_modified(client):
+    first = client.get("/countries")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    response = client.get("/countries", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["ETag"] == etag
+    assert client.get("/countries", headers={"If-None-Match": 'W/"other", ' + etag}).status_code == 304
+
+
+def test_write_changes_the_etag(client):
+    etag = client.get("/countries").headers["ETag"]
+    assert client.post("/countries", params={"name": "Canadá"}).status_code == 200
+    response = client.get("/countries", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    # Other tables keep theirs
+    etag = client.get("/persons").headers["ETag"]
+    client.post("/countries", params={"name": "Belice"})
+    assert client.get("/persons", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_group_listing_etag_follows_its_member_tables(client):
+    etag = client.get("/persons_groups").headers["ETag"]
+    assert client.get("/persons_groups", headers={"If-None-Match": etag}).status_code == 304
+    client.put("/persons/1", params={"name": "Renamed"})
+    assert client.get("/persons_groups", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_reset_changes_the_etag(client):
+    etag = client.get("/countries").headers["ETag"]
+    engine = DatabaseManager().engine
+    before = read_engine_versions(engine, ("countries",))
+    DatabaseManager().reset_db()
+    assert read_engine_versions(engine, ("countries",))["countries"][0] > before["countries"][0]
+    response = client.get("/countries", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["pagination"]["total"] == 0
+
+
+def test_if_modified_since(client):
+    last_modified = client.get("/countries").headers["Last-Modified"]
+    later = formatdate(parsedate_to_datetime(last_modified).timestamp() + 1, usegmt=True)
+    assert client.get("/countries", headers={"If-Modified-Since": later}).status_code == 304
+    # Another write may share that second, only the ETag can confirm an equal date
+    assert client.get("/countries", headers={"If-Modified-Since": last_modified}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    assert client.get("/countries", headers={"If-Modified-Since": later, "If-None-Match": '"other"'}).status_code == 200